@@ -0,0 +1,32 @@
+"""add dataset store_path column
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import text
+    conn = op.get_bind()
+
+    result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='datasets' AND column_name='store_path'"))
+    if not result.fetchone():
+        op.add_column('datasets', sa.Column('store_path', sa.String(), nullable=True))
+        print("✓ Added store_path column")
+    else:
+        print("✓ store_path column already exists, skipping")
+
+
+def downgrade() -> None:
+    op.drop_column('datasets', 'store_path')
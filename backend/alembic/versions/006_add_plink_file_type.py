@@ -0,0 +1,29 @@
+"""add plink file type
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import text
+    conn = op.get_bind()
+
+    conn.execute(text("ALTER TYPE filetype ADD VALUE IF NOT EXISTS 'plink'"))
+    print("✓ Added plink to filetype enum")
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop a value from an enum type
+    pass
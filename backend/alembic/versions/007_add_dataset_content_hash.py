@@ -0,0 +1,34 @@
+"""add dataset content_hash column
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import text
+    conn = op.get_bind()
+
+    result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='datasets' AND column_name='content_hash'"))
+    if not result.fetchone():
+        op.add_column('datasets', sa.Column('content_hash', sa.String(), nullable=True))
+        op.create_index(op.f('ix_datasets_content_hash'), 'datasets', ['content_hash'], unique=False)
+        print("✓ Added content_hash column")
+    else:
+        print("✓ content_hash column already exists, skipping")
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_datasets_content_hash'), table_name='datasets')
+    op.drop_column('datasets', 'content_hash')
@@ -0,0 +1,49 @@
+"""add dataset ingest status
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import text
+    conn = op.get_bind()
+
+    conn.execute(text("""
+        DO $$ BEGIN
+            CREATE TYPE datasetstatus AS ENUM ('ingesting', 'ready', 'failed');
+        EXCEPTION
+            WHEN duplicate_object THEN null;
+        END $$;
+    """))
+
+    result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='datasets' AND column_name='status'"))
+    if not result.fetchone():
+        op.add_column('datasets', sa.Column(
+            'status',
+            postgresql.ENUM('ingesting', 'ready', 'failed', name='datasetstatus', create_type=False),
+            nullable=False,
+            server_default='ready'
+        ))
+        op.add_column('datasets', sa.Column('error_message', sa.Text(), nullable=True))
+        print("✓ Added status and error_message columns")
+    else:
+        print("✓ status column already exists, skipping")
+
+
+def downgrade() -> None:
+    op.drop_column('datasets', 'error_message')
+    op.drop_column('datasets', 'status')
+    op.execute("DROP TYPE IF EXISTS datasetstatus")
@@ -0,0 +1,65 @@
+"""add upload_sessions table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import text
+    conn = op.get_bind()
+
+    conn.execute(text("""
+        DO $$ BEGIN
+            CREATE TYPE uploadsessionstatus AS ENUM ('active', 'completed');
+        EXCEPTION
+            WHEN duplicate_object THEN null;
+        END $$;
+    """))
+
+    result = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_name='upload_sessions'"))
+    if not result.fetchone():
+        op.create_table(
+            'upload_sessions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('status', postgresql.ENUM('active', 'completed', name='uploadsessionstatus', create_type=False), nullable=False),
+            sa.Column('filename', sa.String(), nullable=False),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('variant_major', sa.Boolean(), nullable=False),
+            sa.Column('store_backend', sa.String(), nullable=True),
+            sa.Column('genotype_field', sa.String(), nullable=False),
+            sa.Column('temp_path', sa.String(), nullable=False),
+            sa.Column('total_size', sa.BigInteger(), nullable=False),
+            sa.Column('received_ranges', sa.JSON(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('dataset_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['dataset_id'], ['datasets.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_upload_sessions_id'), 'upload_sessions', ['id'], unique=False)
+        print("✓ Created upload_sessions table")
+    else:
+        print("✓ upload_sessions table already exists, skipping")
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_upload_sessions_id'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
+    op.execute("DROP TYPE IF EXISTS uploadsessionstatus")
@@ -0,0 +1,32 @@
+"""add dataset file_paths column
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import text
+    conn = op.get_bind()
+
+    result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='datasets' AND column_name='file_paths'"))
+    if not result.fetchone():
+        op.add_column('datasets', sa.Column('file_paths', sa.JSON(), nullable=True))
+        print("✓ Added file_paths column")
+    else:
+        print("✓ file_paths column already exists, skipping")
+
+
+def downgrade() -> None:
+    op.drop_column('datasets', 'file_paths')
@@ -0,0 +1,26 @@
+"""allow datasets without a source file
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Merged datasets only exist as a genotype store
+    op.alter_column('datasets', 'file_path', existing_type=sa.String(), nullable=True)
+    print("✓ Made file_path nullable")
+
+
+def downgrade() -> None:
+    op.alter_column('datasets', 'file_path', existing_type=sa.String(), nullable=False)
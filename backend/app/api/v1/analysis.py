@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from app.core.dependencies import get_db, get_current_active_user
 from app.core.config import settings
 from app.models.user import User
-from app.models.dataset import Dataset
+from app.models.dataset import Dataset, DatasetStatus
 from app.models.job import Job, JobStatus, AnalysisType
 from app.schemas.job import JobCreate, JobResponse
 from app.worker.tasks import (
@@ -46,6 +46,15 @@ def check_daily_job_limit(user: User, db: Session) -> None:
         )
 
 
+def check_dataset_ready(dataset: Dataset) -> None:
+    """Check that a dataset has finished ingesting."""
+    if dataset.status != DatasetStatus.READY:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset is not ready for analysis (status: {dataset.status.value})"
+        )
+
+
 @router.post("/pca", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 async def create_pca_job(
     job_data: JobCreate,
@@ -71,6 +80,8 @@ async def create_pca_job(
             detail="Not authorized to use this dataset"
         )
 
+    check_dataset_ready(dataset)
+
     # Create job
     job = Job(
         name=job_data.name,
@@ -121,6 +132,8 @@ async def create_clustering_job(
             detail="Not authorized to use this dataset"
         )
 
+    check_dataset_ready(dataset)
+
     job = Job(
         name=job_data.name,
         analysis_type=AnalysisType.CLUSTERING,
@@ -167,6 +180,8 @@ async def create_kinship_job(
             detail="Not authorized to use this dataset"
         )
 
+    check_dataset_ready(dataset)
+
     job = Job(
         name=job_data.name,
         analysis_type=AnalysisType.KINSHIP,
@@ -213,6 +228,8 @@ async def create_full_analysis_job(
             detail="Not authorized to use this dataset"
         )
 
+    check_dataset_ready(dataset)
+
     job = Job(
         name=job_data.name,
         analysis_type=AnalysisType.FULL_ANALYSIS,
@@ -1,115 +1,484 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import String, cast
 from sqlalchemy.orm import Session
-from typing import Optional
+from starlette.datastructures import UploadFile
+from typing import List, Optional
 from app.core.dependencies import get_db, get_current_active_user
 from app.core.config import settings
 from app.models.user import User
-from app.models.dataset import Dataset, FileType
-from app.schemas.dataset import DatasetResponse, DatasetList
+from app.models.dataset import Dataset, DatasetStatus, FileType
+from app.schemas.dataset import DatasetMerge, DatasetResponse, DatasetList, DatasetSummary
 from app.utils.file_utils import (
     get_file_size_mb,
     generate_unique_filename,
     save_upload_file,
     validate_file_extension,
     get_file_type,
-    delete_file
+    delete_file,
+    delete_directory,
+    save_upload_stream,
+    combine_hashes,
+    content_addressed_filename,
+    adopt_blob,
+    FileTooLargeError
 )
-from app.utils.vcf_parser import get_genotype_matrix
+from app.utils.genotype_store import STORE_BACKENDS, open_genotype_store, store_key, zarr_available
+from app.utils.plink_reader import plink_fileset_paths
+from app.utils.store_merge import VARIANT_JOINS
+from app.utils.vcf_parser import (
+    GENOTYPE_FIELDS,
+    order_vcf_files,
+    probe_dimensions,
+    probe_vcf_set_dimensions,
+    tabix_index_path
+)
+from app.worker.tasks import ingest_dataset, merge_datasets
+import numpy as np
 import os
 
 router = APIRouter()
 
+# Bin edges of the MAF histogram in dataset summaries
+MAF_HISTOGRAM_BINS = [0.0, 0.01, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5]
 
-@router.post("/", response_model=DatasetResponse, status_code=status.HTTP_201_CREATED)
-async def upload_dataset(
-    file: UploadFile = File(...),
-    name: str = Form(...),
-    description: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Upload a new dataset (VCF or CSV file)."""
-    # Validate file extension
-    if not validate_file_extension(file.filename, settings.ALLOWED_EXTENSIONS):
+# Most datasets one merge can combine (sources are tracked as a per-variant bitmask)
+MAX_MERGE_DATASETS = 16
+
+# Allowance for multipart boundaries, part headers and form fields on top of
+# the file size limit when checking an upload's Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Check if we should run ingest synchronously (for free tiers without workers)
+RUN_JOBS_SYNC = os.getenv("RUN_JOBS_SYNC", "false").lower() == "true"
+
+
+def check_store_backend(store_backend: Optional[str]) -> str:
+    """Check a requested genotype store backend and resolve the default."""
+    store_backend = store_backend or settings.GENOTYPE_STORE_BACKEND
+    if store_backend not in STORE_BACKENDS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+            detail=f"Invalid store backend. Allowed: {', '.join(STORE_BACKENDS)}"
         )
+    if store_backend == "zarr" and not zarr_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The zarr store backend is not available on this server"
+        )
+    return store_backend
 
-    # Read file content
-    file_content = await file.read()
-    file_size_mb = len(file_content) / (1024 * 1024)
 
-    # Check file size limits based on subscription
-    max_size = (
-        settings.PREMIUM_MAX_FILE_SIZE_MB
-        if current_user.subscription_tier.value == "premium"
-        else settings.FREE_MAX_FILE_SIZE_MB
-    )
-
-    if file_size_mb > max_size:
+def check_genotype_field(genotype_field: str, filename: str) -> None:
+    """Check that genotypes can be read from the field of this file."""
+    if genotype_field not in GENOTYPE_FIELDS:
         raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds {max_size}MB limit for {current_user.subscription_tier.value} tier"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid genotype field. Allowed: {', '.join(GENOTYPE_FIELDS)}"
+        )
+    if genotype_field != "GT" and get_file_type(filename) != "vcf":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="DS and GP dosages can only be read from VCF files"
         )
 
-    # Generate unique filename
-    unique_filename = generate_unique_filename(file.filename, current_user.id)
-    file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
 
-    # Save file
+def check_content_length(request: Request, max_bytes: int, detail: str) -> None:
+    """
+    Reject an upload by its Content-Length before any of the body is read.
+
+    Starlette spools a whole multipart body to disk when the form is read,
+    so oversized requests have to be turned away on their headers. Chunked
+    requests, which declare no length, are refused.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is None:
+        raise HTTPException(
+            status_code=status.HTTP_411_LENGTH_REQUIRED,
+            detail="Uploads must declare a Content-Length"
+        )
     try:
-        with open(file_path, "wb") as f:
-            f.write(file_content)
-    except Exception as e:
+        content_length = int(content_length)
+    except ValueError:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save file: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid Content-Length"
+        )
+
+    if content_length > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=detail
         )
 
+
+def form_file(form, field: str) -> Optional[UploadFile]:
+    """Get an uploaded file from a multipart form, None if it was not sent."""
+    value = form.get(field)
+    return value if isinstance(value, UploadFile) else None
+
+
+def delete_unshared_dataset_files(
+    db: Session,
+    file_path: Optional[str],
+    file_type: str,
+    store_path: Optional[str],
+    exclude_dataset_id: Optional[int] = None,
+    file_paths: Optional[list] = None
+) -> None:
+    """Delete a dataset's stored file(s) and genotype store if no other dataset uses them."""
+    others = db.query(Dataset)
+    if exclude_dataset_id is not None:
+        others = others.filter(Dataset.id != exclude_dataset_id)
+
+    for path in file_paths or ([file_path] if file_path else []):
+        # Paths are content hashes, so a substring match on the JSON list is exact
+        in_use = others.filter(
+            (Dataset.file_path == path) | cast(Dataset.file_paths, String).contains(path)
+        ).count()
+        if in_use:
+            continue
+
+        if file_type == FileType.PLINK.value:
+            for plink_path in plink_fileset_paths(path):
+                delete_file(plink_path)
+        else:
+            delete_file(path)
+            delete_file(tabix_index_path(path))
+
+    if store_path and others.filter(Dataset.store_path == store_path).count() == 0:
+        delete_directory(store_path)
+
+
+async def register_uploaded_dataset(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    current_user: User,
+    name: str,
+    description: Optional[str],
+    filename: str,
+    temp_paths: list,
+    file_hashes: list,
+    total_bytes: int,
+    variant_major: bool = False,
+    filenames: Optional[list] = None,
+    store_backend: Optional[str] = None,
+    genotype_field: str = "GT"
+) -> Dataset:
+    """
+    Turn fully received upload file(s) into a dataset.
+
+    Moves the files to their content-addressed paths, probes their
+    dimensions, creates the Dataset row and queues ingest unless an
+    identical dataset is already ingested.
+
+    Args:
+        temp_paths: main file first, then any companion files (.bim, .fam)
+            or the other files of a multi-file VCF dataset
+        file_hashes: SHA-256 digests of temp_paths
+        total_bytes: combined size of the files
+        filenames: original names of all files of a multi-file VCF dataset
+        store_backend: genotype store backend, settings.GENOTYPE_STORE_BACKEND by default
+        genotype_field: VCF field genotypes are read from, "GT", "DS" or "GP"
+    """
+    is_file_set = filenames is not None and len(filenames) > 1
+    store_backend = store_backend or settings.GENOTYPE_STORE_BACKEND
+    file_size_mb = total_bytes / (1024 * 1024)
+    # The files of a multi-file VCF dataset may arrive in any order; they
+    # are read in contig order, so the same set is the same content
+    content_hash = combine_hashes(sorted(file_hashes) if is_file_set else file_hashes)
+
     # Determine file type
-    file_type_str = get_file_type(file.filename)
+    file_type_str = get_file_type(filename)
     if not file_type_str:
-        delete_file(file_path)
+        for path in temp_paths:
+            delete_file(path)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Could not determine file type"
         )
 
-    # Parse file to get dimensions
+    # Keep uploads content-addressed so duplicates share one stored copy
+    file_path = os.path.join(
+        settings.UPLOAD_DIR,
+        content_addressed_filename(content_hash, filename)
+    )
+    if is_file_set:
+        # Each file of a multi-file dataset is stored under its own hash
+        blob_paths = [
+            os.path.join(settings.UPLOAD_DIR, content_addressed_filename(file_hash, original))
+            for file_hash, original in zip(file_hashes, filenames)
+        ]
+    else:
+        blob_paths = [file_path] + [
+            os.path.splitext(file_path)[0] + os.path.splitext(path)[1] for path in temp_paths[1:]
+        ]
+    for temp_path, blob_path in zip(temp_paths, blob_paths):
+        adopt_blob(temp_path, blob_path)
+
+    file_paths = None
+    if is_file_set:
+        file_paths = await run_in_threadpool(order_vcf_files, blob_paths)
+        file_path = file_paths[0]
+
+    # Probe headers for dimensions so malformed files are rejected early
     try:
-        genotype_matrix, sample_names, variant_ids = get_genotype_matrix(
-            file_path,
-            file_type_str
-        )
-        n_samples = len(sample_names)
-        n_variants = len(variant_ids)
+        if is_file_set:
+            n_samples, n_variants = await run_in_threadpool(probe_vcf_set_dimensions, file_paths)
+        else:
+            n_samples, n_variants = await run_in_threadpool(
+                probe_dimensions,
+                file_path,
+                file_type_str,
+                variant_major
+            )
+        if n_samples < 2 or n_variants < 2:
+            raise ValueError("at least 2 samples and 2 variants are required")
     except Exception as e:
-        delete_file(file_path)
+        delete_unshared_dataset_files(db, file_path, file_type_str, None, file_paths=file_paths)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to parse file: {str(e)}"
         )
 
-    # Create dataset record
+    # Derived artifacts are keyed on the content hash too
+    store_path = os.path.join(
+        settings.STORE_DIR,
+        store_key(content_hash, variant_major, store_backend, genotype_field)
+    )
+
+    # Create dataset record; the ingest task builds the genotype store
     dataset = Dataset(
         name=name,
         description=description,
         file_type=FileType(file_type_str),
         file_path=file_path,
+        file_paths=file_paths,
         file_size_mb=file_size_mb,
+        content_hash=content_hash,
+        store_path=store_path,
         n_samples=n_samples,
         n_variants=n_variants,
+        status=DatasetStatus.INGESTING,
         owner_id=current_user.id
     )
 
+    # Reuse the store of an identical dataset that is already ingested
+    existing = (
+        db.query(Dataset)
+        .filter(Dataset.store_path == store_path, Dataset.status == DatasetStatus.READY)
+        .first()
+    )
+    if existing and open_genotype_store(store_path) is not None:
+        dataset.status = DatasetStatus.READY
+        dataset.n_samples = existing.n_samples
+        dataset.n_variants = existing.n_variants
+
     db.add(dataset)
     db.commit()
     db.refresh(dataset)
 
+    # Parse and build the genotype store outside the request
+    if dataset.status == DatasetStatus.INGESTING:
+        if RUN_JOBS_SYNC:
+            background_tasks.add_task(
+                ingest_dataset, dataset.id, variant_major, store_backend, genotype_field
+            )
+        else:
+            ingest_dataset.delay(dataset.id, variant_major, store_backend, genotype_field)
+
     return dataset
 
 
+@router.post("/", response_model=DatasetResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_dataset(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Upload a new dataset (VCF, CSV or PLINK fileset).
+
+    The multipart form has the fields file, name, description, bim_file,
+    fam_file, extra_files, variant_major, store_backend and genotype_field.
+    It is only read once the request's Content-Length is within the tier's
+    size limit, so an oversized upload is rejected before its body is read.
+
+    The file is saved and the dataset is returned right away in the
+    "ingesting" state; a background task parses it and marks it "ready"
+    (or "failed").
+
+    PLINK filesets are uploaded as the .bed file with its .bim and .fam
+    companions in bim_file and fam_file. CSVs with variants as rows and
+    samples as columns are uploaded with variant_major=true.
+
+    A cohort split into several VCFs with the same samples (e.g. one per
+    chromosome) is uploaded as one dataset: the first VCF in file and the
+    rest in extra_files. The files are ingested in parallel and analysed
+    as one genotype matrix in contig order.
+
+    store_backend selects how genotypes are stored after ingest: "memmap"
+    (raw int8, fastest to read) or "zarr" (chunked and compressed, for very
+    large cohorts).
+
+    For imputed VCFs, genotype_field="DS" or "GP" reads dosages (DS, or
+    the expected allele count from GP) instead of GT hard calls; they are
+    stored as float16.
+    """
+    # Check file size limits based on subscription
+    max_size = (
+        settings.PREMIUM_MAX_FILE_SIZE_MB
+        if current_user.subscription_tier.value == "premium"
+        else settings.FREE_MAX_FILE_SIZE_MB
+    )
+    size_limit_detail = (
+        f"File size exceeds {max_size}MB limit for {current_user.subscription_tier.value} tier"
+    )
+    max_bytes = max_size * 1024 * 1024
+
+    check_content_length(request, max_bytes, size_limit_detail)
+
+    async with request.form() as form:
+        file = form_file(form, "file")
+        name = form.get("name")
+        if file is None or not name:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="The file and name fields are required"
+            )
+
+        return await save_dataset_upload(
+            db,
+            background_tasks,
+            current_user,
+            file,
+            name,
+            form.get("description") or None,
+            form_file(form, "bim_file"),
+            form_file(form, "fam_file"),
+            [upload for upload in form.getlist("extra_files") if isinstance(upload, UploadFile)],
+            str(form.get("variant_major", "false")).lower() in ("true", "1", "yes", "on"),
+            form.get("store_backend") or None,
+            form.get("genotype_field") or "GT",
+            max_bytes,
+            size_limit_detail
+        )
+
+
+async def save_dataset_upload(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    current_user: User,
+    file: UploadFile,
+    name: str,
+    description: Optional[str],
+    bim_file: Optional[UploadFile],
+    fam_file: Optional[UploadFile],
+    extra_files: List[UploadFile],
+    variant_major: bool,
+    store_backend: Optional[str],
+    genotype_field: str,
+    max_bytes: int,
+    size_limit_detail: str
+) -> Dataset:
+    """Validate the files of a dataset upload form, stream them to disk and register them."""
+    # Validate file extension
+    if not validate_file_extension(file.filename, settings.ALLOWED_EXTENSIONS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+
+    is_plink = get_file_type(file.filename) == "plink"
+    if is_plink and (bim_file is None or fam_file is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="PLINK .bed uploads require the matching .bim and .fam files"
+        )
+
+    store_backend = check_store_backend(store_backend)
+
+    check_genotype_field(genotype_field, file.filename)
+
+    file_set = [file] + extra_files
+    if extra_files and any(
+        not validate_file_extension(upload.filename, settings.ALLOWED_EXTENSIONS)
+        or get_file_type(upload.filename) != "vcf"
+        for upload in file_set
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Multi-file datasets must consist of VCF files only"
+        )
+
+    uploads = file_set + ([bim_file, fam_file] if is_plink else [])
+
+    # The spooled parts' sizes are known; check their total before copying
+    declared_sizes = [getattr(upload, "size", None) for upload in uploads]
+    if None not in declared_sizes and sum(declared_sizes) > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=size_limit_detail
+        )
+
+    # Stream to a unique temporary name; it is renamed to its content hash below
+    unique_filename = generate_unique_filename(file.filename, current_user.id)
+    file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
+
+    companion_paths = [
+        os.path.splitext(file_path)[0] + ext for ext in ([".bim", ".fam"] if is_plink else [])
+    ]
+    companion_paths += [
+        os.path.join(settings.UPLOAD_DIR, f"{i}_{generate_unique_filename(upload.filename, current_user.id)}")
+        for i, upload in enumerate(extra_files, start=1)
+    ]
+
+    # Stream file(s) to disk, hashing as we go
+    total_bytes = 0
+    file_hashes = []
+    try:
+        for upload, path in zip(uploads, [file_path] + companion_paths):
+            size_bytes, file_hash = await save_upload_stream(
+                upload,
+                path,
+                max_bytes - total_bytes,
+                chunk_size=settings.UPLOAD_CHUNK_SIZE
+            )
+            total_bytes += size_bytes
+            file_hashes.append(file_hash)
+    except FileTooLargeError:
+        for path in [file_path] + companion_paths:
+            delete_file(path)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=size_limit_detail
+        )
+    except Exception as e:
+        for path in [file_path] + companion_paths:
+            delete_file(path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save file: {str(e)}"
+        )
+
+    return await register_uploaded_dataset(
+        db,
+        background_tasks,
+        current_user,
+        name,
+        description,
+        file.filename,
+        [file_path] + companion_paths,
+        file_hashes,
+        total_bytes,
+        variant_major,
+        filenames=[upload.filename for upload in file_set] if extra_files else None,
+        store_backend=store_backend,
+        genotype_field=genotype_field
+    )
+
+
 @router.get("/", response_model=DatasetList)
 async def list_datasets(
     page: int = 1,
@@ -139,6 +508,103 @@ async def list_datasets(
     }
 
 
+@router.post("/merge", response_model=DatasetResponse, status_code=status.HTTP_202_ACCEPTED)
+async def merge_dataset(
+    merge: DatasetMerge,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Create a dataset combining the samples of existing datasets.
+
+    Use it to append a new batch of samples to a cohort: upload the batch
+    as its own dataset, then merge it after the cohort. Variants are
+    matched by chrom and position and either intersected or unioned
+    (variant_join). The merged store is built from the sources' genotype
+    stores without re-parsing any files, and records which samples and
+    variants each source contributed.
+    """
+    if merge.variant_join not in VARIANT_JOINS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid variant join. Allowed: {', '.join(VARIANT_JOINS)}"
+        )
+    if not 2 <= len(merge.dataset_ids) <= MAX_MERGE_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 2 and {MAX_MERGE_DATASETS} datasets can be merged"
+        )
+    if len(set(merge.dataset_ids)) != len(merge.dataset_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A dataset can only be merged once"
+        )
+
+    store_backend = check_store_backend(merge.store_backend)
+
+    sources = []
+    for source_id in merge.dataset_ids:
+        source = db.query(Dataset).filter(Dataset.id == source_id).first()
+        if not source:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Dataset {source_id} not found"
+            )
+        if source.owner_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this dataset"
+            )
+        if source.status != DatasetStatus.READY or open_genotype_store(source.store_path) is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Dataset {source_id} is not ready (status: {source.status.value})"
+            )
+        sources.append(source)
+
+    # Merges of the same stores share one merged store
+    content_hash = combine_hashes(
+        [os.path.basename(source.store_path) for source in sources] + [merge.variant_join]
+    )
+    store_path = os.path.join(settings.STORE_DIR, store_key(content_hash, backend=store_backend))
+
+    # The merged dataset has no source file of its own; its genotypes
+    # only live in the merged store
+    dataset = Dataset(
+        name=merge.name,
+        description=merge.description,
+        file_type=sources[0].file_type,
+        file_path=None,
+        file_size_mb=sum(source.file_size_mb for source in sources),
+        content_hash=content_hash,
+        store_path=store_path,
+        n_samples=sum(source.n_samples or 0 for source in sources),
+        status=DatasetStatus.INGESTING,
+        owner_id=current_user.id
+    )
+
+    existing_store = open_genotype_store(store_path)
+    if existing_store is not None:
+        dataset.status = DatasetStatus.READY
+        dataset.n_samples = existing_store.n_samples
+        dataset.n_variants = existing_store.n_variants
+
+    db.add(dataset)
+    db.commit()
+    db.refresh(dataset)
+
+    if dataset.status == DatasetStatus.INGESTING:
+        if RUN_JOBS_SYNC:
+            background_tasks.add_task(
+                merge_datasets, dataset.id, merge.dataset_ids, merge.variant_join, store_backend
+            )
+        else:
+            merge_datasets.delay(dataset.id, merge.dataset_ids, merge.variant_join, store_backend)
+
+    return dataset
+
+
 @router.get("/{dataset_id}", response_model=DatasetResponse)
 async def get_dataset(
     dataset_id: int,
@@ -163,6 +629,62 @@ async def get_dataset(
     return dataset
 
 
+def summarize_variant_stats(store_path: str) -> dict:
+    """Summarize a genotype store's per-variant stats without touching the genotypes."""
+    stats = open_genotype_store(store_path).get_variant_stats()
+    called_counts = stats.called_counts
+    called = called_counts > 0
+    maf = stats.maf[called]
+
+    return {
+        "n_samples": stats.n_samples,
+        "n_variants": stats.n_variants,
+        "call_rate": float(called_counts.sum() / (stats.n_samples * stats.n_variants)),
+        "mean_heterozygosity": float(stats.het_counts.sum() / max(called_counts.sum(), 1)),
+        "mean_maf": float(maf.mean()) if len(maf) else 0.0,
+        "n_monomorphic": int((maf == 0).sum()),
+        "n_uncalled": int((~called).sum()),
+        "maf_bins": MAF_HISTOGRAM_BINS,
+        "maf_histogram": np.histogram(maf, bins=MAF_HISTOGRAM_BINS)[0].tolist()
+    }
+
+
+@router.get("/{dataset_id}/summary", response_model=DatasetSummary)
+async def get_dataset_summary(
+    dataset_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get summary statistics of a dataset.
+
+    Served from the per-variant counts recorded at ingest, so it is
+    instant regardless of dataset size.
+    """
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dataset not found"
+        )
+
+    if dataset.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this dataset"
+        )
+
+    if dataset.status != DatasetStatus.READY or open_genotype_store(dataset.store_path) is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Dataset summary is not available (status: {dataset.status.value})"
+        )
+
+    summary = await run_in_threadpool(summarize_variant_stats, dataset.store_path)
+    return {"dataset_id": dataset.id, **summary}
+
+
 @router.delete("/{dataset_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_dataset(
     dataset_id: int,
@@ -184,8 +706,15 @@ async def delete_dataset(
             detail="Not authorized to delete this dataset"
         )
 
-    # Delete file from disk
-    delete_file(dataset.file_path)
+    # Delete file(s) and genotype store unless another dataset shares them
+    delete_unshared_dataset_files(
+        db,
+        dataset.file_path,
+        dataset.file_type.value,
+        dataset.store_path,
+        exclude_dataset_id=dataset.id,
+        file_paths=dataset.file_paths
+    )
 
     # Delete from database
     db.delete(dataset)
@@ -0,0 +1,333 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.dependencies import get_db, get_current_active_user
+from app.core.config import settings
+from app.models.user import User
+from app.models.upload_session import UploadSession, UploadSessionStatus
+from app.schemas.dataset import DatasetResponse
+from app.schemas.upload import UploadSessionCreate, UploadSessionResponse
+from app.api.v1.datasets import (
+    check_genotype_field,
+    check_store_backend,
+    register_uploaded_dataset
+)
+from app.utils.file_utils import (
+    generate_unique_filename,
+    validate_file_extension,
+    get_file_type,
+    delete_file,
+    parse_content_range,
+    merge_byte_ranges,
+    missing_byte_ranges,
+    preallocate_file,
+    write_stream_at,
+    hash_file,
+    FileTooLargeError
+)
+from app.worker.tasks import delete_expired_upload_sessions
+from datetime import datetime, timedelta, timezone
+import os
+
+router = APIRouter()
+
+PARTIAL_UPLOAD_DIR = os.path.join(settings.UPLOAD_DIR, "partial")
+
+
+def upload_expiry() -> datetime:
+    """Expiry of an upload session that has just been created or sent a chunk."""
+    return datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+
+def session_response(upload: UploadSession) -> dict:
+    """Describe an upload session with its received and missing byte ranges."""
+    ranges = upload.received_ranges or []
+    return {
+        "id": upload.id,
+        "status": upload.status.value,
+        "filename": upload.filename,
+        "total_size": upload.total_size,
+        "received_bytes": sum(end - start for start, end in ranges),
+        "received_ranges": ranges,
+        "missing_ranges": missing_byte_ranges(ranges, upload.total_size),
+        "dataset_id": upload.dataset_id,
+        "expires_at": upload.expires_at,
+        "created_at": upload.created_at,
+        "updated_at": upload.updated_at
+    }
+
+
+def get_user_upload(
+    db: Session,
+    upload_id: int,
+    user: User,
+    for_update: bool = False
+) -> UploadSession:
+    """
+    Get an upload session owned by the user, optionally locking its row.
+
+    A locked read overwrites the attributes of a session already loaded in
+    this db session, so callers see the row as of the lock, not a stale copy.
+    """
+    query = db.query(UploadSession).filter(UploadSession.id == upload_id)
+    if for_update:
+        query = query.with_for_update().populate_existing()
+    upload = query.first()
+
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+
+    if upload.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this upload session"
+        )
+
+    return upload
+
+
+def check_upload_active(upload: UploadSession) -> None:
+    """Check that an upload session still accepts chunks and has not expired."""
+    if upload.status != UploadSessionStatus.ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session is {upload.status.value}"
+        )
+    if upload.expires_at < datetime.now(timezone.utc):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload session has expired"
+        )
+
+
+@router.post("/", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    upload_data: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Start a resumable upload.
+
+    The file is preallocated at its full size; chunks are then sent with
+    PUT /uploads/{id} in any order (and in parallel), each with a
+    Content-Range header, and the upload is turned into a dataset with
+    POST /uploads/{id}/complete. Single-file formats only; PLINK filesets
+    go through POST /datasets/.
+
+    A session expires UPLOAD_SESSION_TTL_HOURS after its last chunk and is
+    then deleted with its partial file. Each user can have at most
+    MAX_ACTIVE_UPLOAD_SESSIONS active sessions.
+    """
+    if not validate_file_extension(upload_data.filename, settings.ALLOWED_EXTENSIONS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+
+    if get_file_type(upload_data.filename) == "plink":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="PLINK filesets must be uploaded with POST /datasets/"
+        )
+
+    max_size = (
+        settings.PREMIUM_MAX_FILE_SIZE_MB
+        if current_user.subscription_tier.value == "premium"
+        else settings.FREE_MAX_FILE_SIZE_MB
+    )
+    if upload_data.total_size > max_size * 1024 * 1024:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds {max_size}MB limit for {current_user.subscription_tier.value} tier"
+        )
+
+    check_store_backend(upload_data.store_backend)
+    check_genotype_field(upload_data.genotype_field, upload_data.filename)
+
+    # Every session preallocates its full size, so cap how many a user holds
+    delete_expired_upload_sessions(db, current_user.id)
+    n_active = db.query(UploadSession).filter(
+        UploadSession.user_id == current_user.id,
+        UploadSession.status == UploadSessionStatus.ACTIVE
+    ).count()
+    if n_active >= settings.MAX_ACTIVE_UPLOAD_SESSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=(
+                f"At most {settings.MAX_ACTIVE_UPLOAD_SESSIONS} uploads can be in progress; "
+                "complete or abort one first"
+            )
+        )
+
+    temp_path = os.path.join(
+        PARTIAL_UPLOAD_DIR,
+        generate_unique_filename(upload_data.filename, current_user.id) + ".part"
+    )
+    await run_in_threadpool(preallocate_file, temp_path, upload_data.total_size)
+
+    upload = UploadSession(
+        filename=upload_data.filename,
+        name=upload_data.name,
+        description=upload_data.description,
+        variant_major=upload_data.variant_major,
+        store_backend=upload_data.store_backend,
+        genotype_field=upload_data.genotype_field,
+        temp_path=temp_path,
+        total_size=upload_data.total_size,
+        received_ranges=[],
+        expires_at=upload_expiry(),
+        user_id=current_user.id
+    )
+
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    return session_response(upload)
+
+
+@router.put("/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: int,
+    request: Request,
+    content_range: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Upload one byte range of the file.
+
+    The request body is the raw chunk and Content-Range gives its position
+    ("bytes start-end/total", end inclusive). The chunk is streamed straight
+    to its offset in the partial file. Re-sending a range is harmless.
+    """
+    upload = get_user_upload(db, upload_id, current_user)
+    check_upload_active(upload)
+
+    try:
+        start, end, total = parse_content_range(content_range)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if total != upload.total_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Content-Range total does not match upload size {upload.total_size}"
+        )
+
+    try:
+        written = await write_stream_at(request.stream(), upload.temp_path, start, end - start)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if written != end - start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Received {written} of {end - start} bytes for this range"
+        )
+
+    # Lock the row so concurrent chunks don't lose each other's ranges
+    upload = get_user_upload(db, upload_id, current_user, for_update=True)
+    check_upload_active(upload)
+    upload.received_ranges = merge_byte_ranges(upload.received_ranges or [], start, end)
+    upload.expires_at = upload_expiry()
+    db.commit()
+    db.refresh(upload)
+
+    return session_response(upload)
+
+
+@router.get("/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    upload_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the received and missing byte ranges of an upload, e.g. to resume it."""
+    upload = get_user_upload(db, upload_id, current_user)
+    return session_response(upload)
+
+
+@router.post("/{upload_id}/complete", response_model=DatasetResponse, status_code=status.HTTP_202_ACCEPTED)
+async def complete_upload(
+    upload_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Finish an upload once every byte has been received.
+
+    The file becomes a dataset exactly as with POST /datasets/: it is
+    returned in the "ingesting" state while a background task parses it.
+    """
+    upload = get_user_upload(db, upload_id, current_user, for_update=True)
+    check_upload_active(upload)
+
+    missing = missing_byte_ranges(upload.received_ranges or [], upload.total_size)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete, missing byte ranges: {missing}"
+        )
+
+    # Claim the session so a repeated request doesn't register it twice
+    upload.status = UploadSessionStatus.COMPLETED
+    db.commit()
+
+    try:
+        file_hash = await run_in_threadpool(hash_file, upload.temp_path, settings.UPLOAD_CHUNK_SIZE)
+        dataset = await register_uploaded_dataset(
+            db,
+            background_tasks,
+            current_user,
+            upload.name,
+            upload.description,
+            upload.filename,
+            [upload.temp_path],
+            [file_hash],
+            upload.total_size,
+            upload.variant_major,
+            store_backend=upload.store_backend,
+            genotype_field=upload.genotype_field
+        )
+    except Exception:
+        # The partial file has been consumed or removed; the session can't be retried
+        delete_file(upload.temp_path)
+        db.delete(upload)
+        db.commit()
+        raise
+
+    upload.dataset_id = dataset.id
+    db.commit()
+
+    return dataset
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Abort an upload and discard the data received so far."""
+    upload = get_user_upload(db, upload_id, current_user, for_update=True)
+
+    if upload.status == UploadSessionStatus.ACTIVE:
+        delete_file(upload.temp_path)
+
+    db.delete(upload)
+    db.commit()
+
+    return None
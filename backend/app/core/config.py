@@ -46,7 +46,30 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE_MB: int = 100
     UPLOAD_DIR: str = "./app/static/uploads"
     RESULTS_DIR: str = "./app/static/results"
-    ALLOWED_EXTENSIONS: List[str] = [".vcf", ".vcf.gz", ".csv", ".txt"]
+    STORE_DIR: str = "./app/static/stores"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes streamed to disk per read
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # Resumable uploads expire this long after their last chunk
+    UPLOAD_SESSION_CLEANUP_MINUTES: int = 30  # How often expired upload sessions are deleted
+    MAX_ACTIVE_UPLOAD_SESSIONS: int = 5  # Per user
+    ALLOWED_EXTENSIONS: List[str] = [
+        ".vcf", ".vcf.gz", ".vcf.bgz", ".vcf.zst",
+        ".csv", ".csv.gz", ".csv.zst",
+        ".txt", ".bed"
+    ]
+
+    # Genotype processing
+    GENOTYPE_BLOCK_SIZE: int = 10000  # Variants decoded per block
+    TABIX_PATH: str = os.getenv("TABIX_PATH", "tabix")  # Used for indexed region queries
+    CSV_ENGINE: str = os.getenv("CSV_ENGINE", "c")  # "c" (chunked) or "pyarrow" (multithreaded)
+    # Processes decoding the files of a multi-file VCF dataset, or the contigs of an indexed VCF;
+    # the ingest queue's solo-pool worker can start them (prefork children cannot, and ingest serially)
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+    GENOTYPE_STORE_BACKEND: str = os.getenv("GENOTYPE_STORE_BACKEND", "memmap")  # "memmap" or "zarr" (needs zarr)
+
+    # Preview jobs run on a variant subsample of about this many genotypes
+    PREVIEW_TARGET_GENOTYPES: int = int(os.getenv("PREVIEW_TARGET_GENOTYPES", 20_000_000))
+    PREVIEW_MIN_VARIANTS: int = 1000
+    PREVIEW_MAX_VARIANTS: int = 50000
 
     # Razorpay (for UPI and other Indian payment methods)
     RAZORPAY_KEY_ID: str = os.getenv("RAZORPAY_KEY_ID", "")
@@ -83,3 +106,4 @@ settings = Settings()
 # Create upload directories if they don't exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.RESULTS_DIR, exist_ok=True)
+os.makedirs(settings.STORE_DIR, exist_ok=True)
@@ -3,7 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.core.database import init_db
-from app.api.v1 import auth, datasets, jobs, analysis, users, results, subscription
+from app.api.v1 import auth, datasets, uploads, jobs, analysis, users, results, subscription
 import traceback
 
 # Create FastAPI app
@@ -70,6 +70,12 @@ app.include_router(
     tags=["Datasets"]
 )
 
+app.include_router(
+    uploads.router,
+    prefix=f"{settings.API_V1_STR}/uploads",
+    tags=["Uploads"]
+)
+
 app.include_router(
     analysis.router,
     prefix=f"{settings.API_V1_STR}/analysis",
@@ -2,5 +2,6 @@ from app.models.user import User
 from app.models.dataset import Dataset
 from app.models.job import Job
 from app.models.result import Result
+from app.models.upload_session import UploadSession
 
-__all__ = ["User", "Dataset", "Job", "Result"]
+__all__ = ["User", "Dataset", "Job", "Result", "UploadSession"]
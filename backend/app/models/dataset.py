@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -9,6 +9,13 @@ class FileType(str, enum.Enum):
     VCF = "vcf"
     CSV = "csv"
     TXT = "txt"
+    PLINK = "plink"  # .bed/.bim/.fam fileset, file_path points at the .bed
+
+
+class DatasetStatus(str, enum.Enum):
+    INGESTING = "ingesting"
+    READY = "ready"
+    FAILED = "failed"
 
 
 class Dataset(Base):
@@ -18,8 +25,17 @@ class Dataset(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     file_type = Column(Enum(FileType), nullable=False)
-    file_path = Column(String, nullable=False)
+    file_path = Column(String, nullable=True)  # None for datasets merged from other datasets
+    file_paths = Column(JSON, nullable=True)  # All files of a multi-file (per-chromosome) VCF dataset, in contig order
     file_size_mb = Column(Float, nullable=False)
+    content_hash = Column(String, nullable=True, index=True)  # SHA-256 of uploaded content
+
+    # Binary genotype store built at ingest (see app.utils.genotype_store)
+    store_path = Column(String, nullable=True)
+
+    # Ingest state (uploads are parsed by a background task)
+    status = Column(Enum(DatasetStatus), default=DatasetStatus.READY, nullable=False)
+    error_message = Column(Text, nullable=True)
 
     # Genotype matrix info
     n_samples = Column(Integer, nullable=True)
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Text, Enum, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+import enum
+
+
+class UploadSessionStatus(str, enum.Enum):
+    ACTIVE = "active"
+    COMPLETED = "completed"
+
+
+class UploadSession(Base):
+    """A resumable upload: byte ranges are PUT into a preallocated file."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(Enum(UploadSessionStatus), default=UploadSessionStatus.ACTIVE, nullable=False)
+
+    # Dataset details applied when the upload is completed
+    filename = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    variant_major = Column(Boolean, default=False, nullable=False)
+    store_backend = Column(String, nullable=True)  # None: settings.GENOTYPE_STORE_BACKEND
+    genotype_field = Column(String, default="GT", nullable=False)  # "GT", "DS" or "GP"
+
+    # Partial file and the sorted [start, end) byte ranges received so far
+    temp_path = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_ranges = Column(JSON, nullable=False, default=list)
+
+    # Abandoned sessions are deleted with their partial file after this
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Foreign keys
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    dataset_id = Column(Integer, ForeignKey("datasets.id", ondelete="SET NULL"), nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<UploadSession(id={self.id}, filename={self.filename})>"
@@ -13,12 +13,23 @@ class DatasetUpdate(BaseModel):
     description: Optional[str] = None
 
 
+class DatasetMerge(BaseModel):
+    name: str
+    description: Optional[str] = None
+    dataset_ids: list[int]  # first dataset's samples come first
+    variant_join: str = "intersect"  # "intersect" or "union"
+    store_backend: Optional[str] = None
+
+
 class DatasetResponse(BaseModel):
     id: int
     name: str
     description: Optional[str]
     file_type: str
     file_size_mb: float
+    content_hash: Optional[str] = None
+    status: str
+    error_message: Optional[str] = None
     n_samples: Optional[int]
     n_variants: Optional[int]
     owner_id: int
@@ -34,3 +45,16 @@ class DatasetList(BaseModel):
     total: int
     page: int
     page_size: int
+
+
+class DatasetSummary(BaseModel):
+    dataset_id: int
+    n_samples: int
+    n_variants: int
+    call_rate: float
+    mean_heterozygosity: float
+    mean_maf: float
+    n_monomorphic: int
+    n_uncalled: int
+    maf_bins: list[float]
+    maf_histogram: list[int]
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional, Dict, Any
 from datetime import datetime
+from app.utils.selection import PREVIEW_MAX_SEED, PREVIEW_SAMPLINGS, SELECTION_PARAMETERS
+from app.utils.qc import QC_THRESHOLDS
+from app.utils.vcf_parser import parse_region
 
 
 class JobCreate(BaseModel):
@@ -9,6 +12,89 @@ class JobCreate(BaseModel):
     analysis_type: str  # "pca", "clustering", "kinship", "full_analysis"
     parameters: Optional[Dict[str, Any]] = None
 
+    @field_validator('parameters')
+    @classmethod
+    def validate_regions(cls, v):
+        # "regions": ["chr1", "chr2:100000-200000", ...]
+        if v and v.get("regions") is not None:
+            regions = v["regions"]
+            if not isinstance(regions, list) or not all(isinstance(r, str) for r in regions):
+                raise ValueError("regions must be a list of chrom:start-end strings")
+            for region in regions:
+                parse_region(region)
+        return v
+
+    @field_validator('parameters')
+    @classmethod
+    def validate_selection(cls, v):
+        # "samples" / "exclude_samples": sample IDs; "variants": variant IDs
+        for key in SELECTION_PARAMETERS:
+            if v and v.get(key) is not None:
+                ids = v[key]
+                if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+                    raise ValueError(f"{key} must be a list of ID strings")
+                if not ids and key != "exclude_samples":
+                    raise ValueError(f"{key} must not be empty")
+        return v
+
+    @field_validator('parameters')
+    @classmethod
+    def validate_preview(cls, v):
+        # "preview": run on a variant subsample; "preview_variants" overrides its size
+        if not v:
+            return v
+        if v.get("preview") is not None and not isinstance(v["preview"], bool):
+            raise ValueError("preview must be true or false")
+        if v.get("preview_variants") is not None:
+            n = v["preview_variants"]
+            if not isinstance(n, int) or isinstance(n, bool) or n < 2:
+                raise ValueError("preview_variants must be an integer of at least 2")
+        if v.get("preview_sampling", "random") not in PREVIEW_SAMPLINGS:
+            raise ValueError(f"preview_sampling must be one of: {', '.join(PREVIEW_SAMPLINGS)}")
+        if v.get("preview_seed") is not None:
+            seed = v["preview_seed"]
+            if not isinstance(seed, int) or isinstance(seed, bool):
+                raise ValueError("preview_seed must be an integer")
+            if not 0 <= seed <= PREVIEW_MAX_SEED:
+                raise ValueError(f"preview_seed must be an integer from 0 to {PREVIEW_MAX_SEED}")
+        return v
+
+    @field_validator('parameters')
+    @classmethod
+    def validate_ld_prune(cls, v):
+        # "ld_prune": true, or {"window_size": 50, "step": 5, "r2_threshold": 0.2}
+        ld_prune = v.get("ld_prune") if v else None
+        if isinstance(ld_prune, dict):
+            for key in ("window_size", "step"):
+                n = ld_prune.get(key, 1)
+                if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+                    raise ValueError(f"ld_prune.{key} must be a positive integer")
+            r2 = ld_prune.get("r2_threshold", 0.2)
+            if not isinstance(r2, (int, float)) or not 0 < r2 <= 1:
+                raise ValueError("ld_prune.r2_threshold must be in (0, 1]")
+        elif ld_prune is not None and not isinstance(ld_prune, bool):
+            raise ValueError("ld_prune must be true, false or an options object")
+        return v
+
+    @field_validator('parameters')
+    @classmethod
+    def validate_qc(cls, v):
+        # "qc": {"min_call_rate": 0.95, "min_maf": 0.01, "min_hwe_p": 1e-6, ...}
+        qc = v.get("qc") if v else None
+        if qc is not None:
+            if not isinstance(qc, dict):
+                raise ValueError("qc must be an object of thresholds")
+            for key, value in qc.items():
+                if key not in QC_THRESHOLDS:
+                    raise ValueError(f"qc thresholds must be among: {', '.join(QC_THRESHOLDS)}")
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise ValueError(f"qc.{key} must be a number")
+                low, high = QC_THRESHOLDS[key]
+                if value < low or (high is not None and value > high):
+                    bounds = f"in [{low}, {high}]" if high is not None else f"at least {low}"
+                    raise ValueError(f"qc.{key} must be {bounds}")
+        return v
+
 
 class JobUpdate(BaseModel):
     name: Optional[str] = None
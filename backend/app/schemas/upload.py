@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int = Field(..., gt=0)
+    name: str
+    description: Optional[str] = None
+    variant_major: bool = False
+    store_backend: Optional[str] = None
+    genotype_field: str = "GT"
+
+
+class UploadSessionResponse(BaseModel):
+    id: int
+    status: str
+    filename: str
+    total_size: int
+    received_bytes: int
+    received_ranges: list[list[int]]
+    missing_ranges: list[list[int]]
+    dataset_id: Optional[int] = None
+    expires_at: datetime
+    created_at: datetime
+    updated_at: Optional[datetime]
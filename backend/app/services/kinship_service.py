@@ -2,8 +2,10 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import List
+from typing import List, Optional, Union
 import os
+from app.utils.genotype_operator import StandardizedGenotypeOperator
+from app.utils.genotype_packing import PackedGenotypes, ibs_counts, pack_genotypes
 
 
 class KinshipService:
@@ -19,55 +21,68 @@ class KinshipService:
         self.method = method
         self.kinship_matrix = None
 
-    def compute_ibs(self, genotype_matrix: np.ndarray) -> np.ndarray:
+    def compute_ibs(
+        self,
+        genotype_matrix: Union[np.ndarray, PackedGenotypes]
+    ) -> np.ndarray:
         """
         Compute Identity-By-State (IBS) matrix.
 
-        IBS measures the proportion of shared alleles between samples.
+        IBS measures the proportion of shared alleles between samples:
+        (IBS2 + IBS1 / 2) / variants called in both. Genotypes are packed
+        to 2 bits and IBS0/IBS1/IBS2 are counted with bitwise kernels, so
+        missing calls are left out of each pair rather than imputed.
 
         Args:
             genotype_matrix: shape (n_samples, n_variants), values 0, 1, 2
+                and -1 (or NaN dosages) for missing, or PackedGenotypes
 
         Returns:
             IBS matrix: shape (n_samples, n_samples), values in [0, 1]
+            (NaN for pairs with no variant called in both)
         """
-        n_samples, n_variants = genotype_matrix.shape
-
-        # Initialize IBS matrix
-        ibs_matrix = np.zeros((n_samples, n_samples))
-
-        for i in range(n_samples):
-            for j in range(i, n_samples):
-                # Count shared alleles
-                gt_i = genotype_matrix[i, :]
-                gt_j = genotype_matrix[j, :]
+        if not isinstance(genotype_matrix, PackedGenotypes):
+            genotype_matrix = pack_genotypes(genotype_matrix)
 
-                # IBS = 1 - (proportion of different alleles)
-                # For diploid: max difference is 2, so we normalize by 2
-                differences = np.abs(gt_i - gt_j)
-                ibs = 1 - (np.mean(differences) / 2)
-
-                ibs_matrix[i, j] = ibs
-                ibs_matrix[j, i] = ibs
+        counts = ibs_counts(genotype_matrix)
+        n_called = counts.n_called
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ibs_matrix = (counts.ibs2 + 0.5 * counts.ibs1) / n_called
+        ibs_matrix[n_called == 0] = np.nan
 
         return ibs_matrix
 
-    def compute_grm(self, genotype_matrix: np.ndarray) -> np.ndarray:
+    def compute_grm(
+        self,
+        genotype_matrix: Union[np.ndarray, StandardizedGenotypeOperator],
+        allele_freqs: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Compute Genomic Relationship Matrix (GRM).
 
         GRM is similar to IBS but accounts for allele frequencies.
 
         Args:
-            genotype_matrix: shape (n_samples, n_variants)
+            genotype_matrix: shape (n_samples, n_variants), or a centered
+                StandardizedGenotypeOperator, whose blocks are accumulated
+                into the GRM without building the centered matrix
+            allele_freqs: alternate allele frequency per variant (e.g. from
+                the dataset's VariantStats); computed from the matrix if not given
 
         Returns:
             GRM matrix: shape (n_samples, n_samples)
         """
+        if isinstance(genotype_matrix, StandardizedGenotypeOperator):
+            if allele_freqs is None:
+                allele_freqs = genotype_matrix.means.astype(np.float64) / 2
+            normalizer = 2 * np.sum(allele_freqs * (1 - allele_freqs))
+            return genotype_matrix.gram() / normalizer
+
         n_samples, n_variants = genotype_matrix.shape
 
         # Center genotype matrix by subtracting mean allele frequency
-        allele_freqs = np.mean(genotype_matrix, axis=0) / 2  # Divide by 2 for diploid
+        if allele_freqs is None:
+            allele_freqs = np.mean(genotype_matrix, axis=0) / 2  # Divide by 2 for diploid
         centered_matrix = genotype_matrix - (2 * allele_freqs)
 
         # Compute GRM
@@ -79,17 +94,25 @@ class KinshipService:
 
         return grm
 
-    def fit(self, genotype_matrix: np.ndarray) -> None:
+    def fit(
+        self,
+        genotype_matrix: np.ndarray,
+        allele_freqs: Optional[np.ndarray] = None
+    ) -> None:
         """
         Compute kinship matrix.
 
         Args:
-            genotype_matrix: shape (n_samples, n_variants)
+            genotype_matrix: shape (n_samples, n_variants); IBS also
+                accepts PackedGenotypes and the GRM a StandardizedGenotypeOperator
+            allele_freqs: precomputed allele frequencies, used by the GRM
         """
         if self.method == "ibs":
+            if isinstance(genotype_matrix, StandardizedGenotypeOperator):
+                raise ValueError("IBS kinship needs the raw genotype matrix")
             self.kinship_matrix = self.compute_ibs(genotype_matrix)
         elif self.method == "grm":
-            self.kinship_matrix = self.compute_grm(genotype_matrix)
+            self.kinship_matrix = self.compute_grm(genotype_matrix, allele_freqs)
         else:
             raise ValueError(f"Unknown method: {self.method}")
 
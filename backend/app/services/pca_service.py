@@ -1,10 +1,12 @@
 import numpy as np
 import pandas as pd
+from scipy.sparse.linalg import svds
 from sklearn.decomposition import PCA
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import Tuple, List
+from typing import Tuple, List, Union
 import os
+from app.utils.genotype_operator import StandardizedGenotypeOperator
 
 
 class PCAService:
@@ -16,20 +18,52 @@ class PCAService:
         self.components = None
         self.variance_explained = None
 
-    def fit(self, genotype_matrix: np.ndarray) -> None:
+    def fit(self, genotype_matrix: Union[np.ndarray, StandardizedGenotypeOperator]) -> None:
         """
         Fit PCA on genotype matrix.
 
         Args:
-            genotype_matrix: shape (n_samples, n_variants)
+            genotype_matrix: shape (n_samples, n_variants), or a
+                StandardizedGenotypeOperator over the raw genotypes
         """
         n_samples = genotype_matrix.shape[0]
         n_components = min(self.n_components, n_samples)
 
+        if isinstance(genotype_matrix, StandardizedGenotypeOperator):
+            # ARPACK needs k < min(shape); tiny inputs are cheap to materialize
+            if n_components >= min(genotype_matrix.shape) - 1:
+                genotype_matrix = genotype_matrix.to_dense()
+            else:
+                self.fit_operator(genotype_matrix, n_components)
+                return
+
         self.pca = PCA(n_components=n_components)
         self.components = self.pca.fit_transform(genotype_matrix)
         self.variance_explained = self.pca.explained_variance_ratio_.tolist()
 
+    def fit_operator(self, operator: StandardizedGenotypeOperator, n_components: int) -> None:
+        """
+        Fit PCA with a truncated SVD of a genotype operator.
+
+        The operator's columns are already centered, so its top singular
+        vectors are the principal components; only matrix products with it
+        are needed, never the dense standardized matrix.
+        """
+        v0 = np.random.default_rng(0).uniform(-1, 1, min(operator.shape))
+        u, s, vt = svds(operator, k=n_components, v0=v0)
+
+        order = np.argsort(s)[::-1]
+        u, s, vt = u[:, order], s[order], vt[order]
+
+        # Same sign convention as sklearn's full-SVD PCA (svd_flip on u, as in
+        # the pinned 1.3.2): each component's largest-magnitude score is positive
+        signs = np.sign(u[np.argmax(np.abs(u), axis=0), np.arange(len(s))])
+        u *= signs
+
+        self.components = u * s
+        total_variance = operator.column_sum_squares().sum()
+        self.variance_explained = (s ** 2 / total_variance).tolist()
+
     def get_components(self) -> np.ndarray:
         """Get principal components."""
         return self.components
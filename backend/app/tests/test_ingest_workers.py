@@ -0,0 +1,107 @@
+import multiprocessing
+import re
+from pathlib import Path
+import numpy as np
+import pytest
+from app.utils import genotype_store
+from app.utils.genotype_store import build_genotype_store, process_pool_available
+
+
+DOCKER_COMPOSE_FILE = Path(__file__).resolve().parents[3] / "docker-compose.yml"
+
+# Pools that run tasks in the worker's main process, which may start a process pool
+MAIN_PROCESS_POOLS = ("solo", "threads")
+
+VCF_HEADER = """\
+##fileformat=VCFv4.2
+##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\ts1\ts2\ts3
+"""
+
+
+@pytest.fixture
+def vcf_set(tmp_path):
+    paths = []
+    for chrom, calls in (("1", ["0/0", "0/1", "1/1"]), ("2", ["1/1", "./.", "0/1"])):
+        path = tmp_path / f"chr{chrom}.vcf"
+        records = "".join(
+            f"{chrom}\t{pos}\t.\tA\tG\t.\tPASS\t.\tGT\t" + "\t".join(calls) + "\n"
+            for pos in (100, 200, 300)
+        )
+        path.write_text(VCF_HEADER + records)
+        paths.append(str(path))
+    return paths
+
+
+def _worker_commands() -> list:
+    text = DOCKER_COMPOSE_FILE.read_text()
+    return [
+        command for command in re.findall(r"^\s*command:\s*(.+)$", text, re.MULTILINE)
+        if "celery" in command and " worker" in command
+    ]
+
+
+def test_ingest_task_is_routed_to_ingest_queue():
+    from app.worker.celery import INGEST_QUEUE, celery_app
+
+    route = celery_app.conf.task_routes["app.worker.tasks.ingest_dataset"]
+    assert route["queue"] == INGEST_QUEUE
+
+
+def test_deployed_ingest_worker_runs_tasks_in_main_process():
+    from app.worker.celery import INGEST_QUEUE
+
+    if not DOCKER_COMPOSE_FILE.exists():
+        pytest.skip("docker-compose.yml is not part of this checkout")
+
+    ingest_workers = [
+        command for command in _worker_commands()
+        if re.search(rf"(-Q|--queues)[ =]\S*\b{INGEST_QUEUE}\b", command)
+    ]
+    assert len(ingest_workers) == 1
+
+    pool = re.search(r"(?:-P|--pool)[ =](\w+)", ingest_workers[0])
+    assert pool is not None and pool.group(1) in MAIN_PROCESS_POOLS
+
+
+def test_main_process_ingests_files_in_process_pool(vcf_set, tmp_path, monkeypatch):
+    # A solo-pool worker runs the task in its main process, as here
+    pools = []
+
+    class RecordingProcessPoolExecutor(genotype_store.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(genotype_store, "ProcessPoolExecutor", RecordingProcessPoolExecutor)
+
+    assert process_pool_available()
+    parallel = build_genotype_store(
+        vcf_set[0], "vcf", str(tmp_path / "parallel"), n_workers=2, file_paths=vcf_set
+    )
+    serial = build_genotype_store(
+        vcf_set[0], "vcf", str(tmp_path / "serial"), n_workers=1, file_paths=vcf_set
+    )
+
+    assert len(pools) == 1
+    np.testing.assert_array_equal(parallel.to_matrix(), serial.to_matrix())
+
+
+def _build_in_daemon(vcf_paths: list, store_dir: str, results) -> None:
+    results.put(process_pool_available())
+    store = build_genotype_store(vcf_paths[0], "vcf", store_dir, n_workers=2, file_paths=vcf_paths)
+    results.put(store.n_variants)
+
+
+def test_daemonic_process_ingests_serially(vcf_set, tmp_path):
+    # Prefork pool children are daemonic and may not start processes
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_build_in_daemon, args=(vcf_set, str(tmp_path / "store"), results), daemon=True
+    )
+    process.start()
+    process.join(timeout=60)
+
+    assert process.exitcode == 0
+    assert results.get(timeout=1) is False
+    assert results.get(timeout=1) == 6
@@ -0,0 +1,34 @@
+import numpy as np
+from sklearn.decomposition import PCA
+from app.services.pca_service import PCAService
+from app.utils.genotype_operator import prepare_genotype_operator
+
+
+def structured_genotypes(n_samples: int = 60, n_variants: int = 400) -> np.ndarray:
+    """Hard calls of two populations with diverged allele frequencies."""
+    rng = np.random.default_rng(1)
+    base = rng.uniform(0.05, 0.95, n_variants)
+    freqs = np.clip(base + rng.normal(0, 0.2, (2, n_variants)), 0.01, 0.99)
+    population = np.arange(n_samples) % 2
+    genotypes = rng.binomial(2, freqs[population]).astype(np.int8)
+    genotypes[rng.random(genotypes.shape) < 0.02] = -1
+    return genotypes
+
+
+def test_operator_pca_matches_sklearn_full_svd_signs():
+    operator = prepare_genotype_operator(structured_genotypes())
+    n_components = 4
+
+    pca_service = PCAService(n_components=n_components)
+    pca_service.fit(operator)
+    components = pca_service.get_components()
+
+    expected = PCA(n_components=n_components, svd_solver="full").fit_transform(operator.to_dense())
+
+    # Same sign for every component, not just the same axes
+    scale = np.abs(expected).max()
+    np.testing.assert_allclose(components, expected, atol=1e-3 * scale)
+    np.testing.assert_array_equal(
+        np.sign(components[np.argmax(np.abs(components), axis=0), np.arange(n_components)]),
+        np.ones(n_components)
+    )
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user, get_db
+from app.main import app
+from app.models.user import SubscriptionTier
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FREE_MAX_FILE_SIZE_MB", 1)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+
+    async def form_not_read(self, *args, **kwargs):
+        raise AssertionError("the upload form was read")
+
+    # Oversized uploads must be rejected before Starlette spools the body
+    monkeypatch.setattr(Request, "form", form_not_read)
+
+    user = SimpleNamespace(id=1, is_active=True, subscription_tier=SubscriptionTier.FREE)
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_oversized_upload_is_rejected_on_content_length(client, tmp_path):
+    response = client.post(
+        f"{settings.API_V1_STR}/datasets/",
+        data={"name": "too big"},
+        files={"file": ("big.vcf", b"0" * (2 * 1024 * 1024), "text/plain")}
+    )
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_without_content_length_is_rejected(client):
+    response = client.post(
+        f"{settings.API_V1_STR}/datasets/",
+        content=iter([b"--boundary\r\n"]),
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"}
+    )
+
+    assert response.status_code == 411
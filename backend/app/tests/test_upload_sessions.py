@@ -0,0 +1,74 @@
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.v1.uploads import create_upload_session
+from app.core.config import settings
+from app.core.database import Base
+from app.models.user import SubscriptionTier, User
+from app.models.upload_session import UploadSession, UploadSessionStatus
+from app.schemas.upload import UploadSessionCreate
+from app.worker.tasks import delete_expired_upload_sessions
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="user@example.com", hashed_password="x"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_session(db, tmp_path, expires_in: timedelta, status=UploadSessionStatus.ACTIVE):
+    temp_path = tmp_path / f"{len(list(tmp_path.iterdir()))}.part"
+    temp_path.write_bytes(b"\0" * 16)
+    upload = UploadSession(
+        status=status,
+        filename="data.vcf",
+        name="data",
+        variant_major=False,
+        genotype_field="GT",
+        temp_path=str(temp_path),
+        total_size=16,
+        received_ranges=[],
+        expires_at=datetime.now(timezone.utc) + expires_in,
+        user_id=1
+    )
+    db.add(upload)
+    db.commit()
+    return upload
+
+
+def test_expired_sessions_are_deleted_with_their_partial_files(db, tmp_path):
+    expired = add_session(db, tmp_path, timedelta(hours=-1))
+    expired_path = expired.temp_path
+    active = add_session(db, tmp_path, timedelta(hours=1))
+
+    assert delete_expired_upload_sessions(db) == 1
+
+    assert [upload.id for upload in db.query(UploadSession)] == [active.id]
+    assert not os.path.exists(expired_path)
+    assert os.path.exists(active.temp_path)
+
+
+@pytest.mark.asyncio
+async def test_active_sessions_per_user_are_capped(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_ACTIVE_UPLOAD_SESSIONS", 2)
+    monkeypatch.setattr("app.api.v1.uploads.PARTIAL_UPLOAD_DIR", str(tmp_path / "partial"))
+    user = SimpleNamespace(id=1, subscription_tier=SubscriptionTier.FREE)
+    request = UploadSessionCreate(filename="data.vcf", total_size=16, name="data")
+
+    # An expired session no longer counts against the cap
+    add_session(db, tmp_path, timedelta(hours=-1))
+    for _ in range(2):
+        await create_upload_session(request, db=db, current_user=user)
+
+    with pytest.raises(HTTPException) as error:
+        await create_upload_session(request, db=db, current_user=user)
+    assert error.value.status_code == 429
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from app.utils.genotype_store import build_genotype_store
+from app.utils.vcf_parser import ds_to_dosage, parse_vcf_file
+
+
+# Beagle declares DS per alternate allele
+BEAGLE_DS_VCF = """\
+##fileformat=VCFv4.2
+##contig=<ID=1>
+##FORMAT=<ID=DS,Number=A,Type=Float,Description="Estimated ALT dose">
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\ts1\ts2\ts3
+1\t100\t.\tA\tG\t.\tPASS\t.\tDS\t0.1\t1.2\t2
+1\t200\t.\tC\tT\t.\tPASS\t.\tDS\t0.5\t.\t1.9
+"""
+
+
+@pytest.fixture
+def beagle_vcf(tmp_path):
+    path = tmp_path / "beagle.vcf"
+    path.write_text(BEAGLE_DS_VCF)
+    return str(path)
+
+
+def test_number_a_ds_reads_one_dosage_per_call(beagle_vcf):
+    genotypes, samples, variants = parse_vcf_file(beagle_vcf, genotype_field="DS")
+
+    assert samples == ["s1", "s2", "s3"]
+    assert genotypes.shape == (3, 2)
+    np.testing.assert_allclose(
+        genotypes,
+        [[0.1, 0.5], [1.2, np.nan], [2.0, 1.9]],
+        atol=1e-3
+    )
+
+
+def test_number_a_ds_store_has_file_dimensions(beagle_vcf, tmp_path):
+    store = build_genotype_store(
+        beagle_vcf, "vcf", str(tmp_path / "store"), genotype_field="DS"
+    )
+
+    assert (store.n_samples, store.n_variants) == (3, 2)
+    assert not np.isnan(store.to_matrix()[[0, 2]]).any()
+
+
+def test_ds_to_dosage_rejects_multi_valued_blocks():
+    with pytest.raises(ValueError):
+        ds_to_dosage(np.zeros((2, 3, 3), dtype=np.float32))
@@ -0,0 +1,170 @@
+import gzip
+import io
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd input is optional
+    zstandard = None
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Filename suffixes of the supported codecs
+COMPRESSION_SUFFIXES = (".gz", ".bgz", ".zst")
+
+# Fixed part of a BGZF block header: gzip header with FEXTRA, XLEN=6 and
+# the "BC" subfield holding the block size
+BGZF_HEADER_SIZE = 18
+
+# BGZF blocks decompressed ahead of the reader, per thread
+BGZF_BLOCKS_PER_THREAD = 4
+
+# zlib releases the GIL, so threads are enough to decompress BGZF blocks in parallel
+DEFAULT_DECOMPRESS_THREADS = min(4, os.cpu_count() or 1)
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """
+    Detect the codec of a file from its magic bytes.
+
+    Returns:
+        "bgzf", "gzip", "zstd", or None for uncompressed files
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(BGZF_HEADER_SIZE)
+
+    if header[:2] == GZIP_MAGIC:
+        # BGZF is gzip with a "BC" extra subfield in every block header
+        if len(header) == BGZF_HEADER_SIZE and header[3] & 4 and header[12:14] == b"BC":
+            return "bgzf"
+        return "gzip"
+    if header[:4] == ZSTD_MAGIC:
+        return "zstd"
+    return None
+
+
+def _inflate_bgzf_block(data: bytes, crc: int, size: int) -> bytes:
+    """Thread pool worker: decompress one BGZF block and check its CRC and size."""
+    block = zlib.decompress(data, -zlib.MAX_WBITS)
+    if len(block) != size or zlib.crc32(block) != crc:
+        raise ValueError("Corrupt BGZF block")
+    return block
+
+
+class BGZFReader(io.RawIOBase):
+    """
+    Read a BGZF file, decompressing blocks in parallel.
+
+    BGZF (as written by bgzip) is a series of independent gzip members of
+    at most 64 KB each, so blocks can be inflated on a thread pool while
+    the reader consumes them in order.
+    """
+
+    def __init__(self, file_path: str, threads: int = DEFAULT_DECOMPRESS_THREADS):
+        self._raw = open(file_path, "rb", buffering=READ_BUFFER_SIZE)
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._max_pending = threads * BGZF_BLOCKS_PER_THREAD
+        self._pending = deque()
+        self._eof = False
+        self._block = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _read_raw_block(self) -> Optional[tuple]:
+        header = self._raw.read(BGZF_HEADER_SIZE)
+        if not header:
+            return None
+        if len(header) < BGZF_HEADER_SIZE or header[:2] != GZIP_MAGIC or header[12:14] != b"BC":
+            raise ValueError("Not a BGZF file")
+
+        extra_length = struct.unpack("<H", header[10:12])[0]
+        block_size = struct.unpack("<H", header[16:18])[0] + 1
+
+        # Skip any extra subfields after BC, then read the deflate data and trailer
+        rest = self._raw.read(block_size - BGZF_HEADER_SIZE)
+        if len(rest) != block_size - BGZF_HEADER_SIZE:
+            raise ValueError("Truncated BGZF block")
+
+        data = rest[extra_length - 6:-8]
+        crc, size = struct.unpack("<II", rest[-8:])
+        return data, crc, size
+
+    def _next_block(self) -> Optional[bytes]:
+        while not self._eof and len(self._pending) < self._max_pending:
+            raw_block = self._read_raw_block()
+            if raw_block is None:
+                self._eof = True
+                break
+            self._pending.append(self._executor.submit(_inflate_bgzf_block, *raw_block))
+
+        if not self._pending:
+            return None
+        return self._pending.popleft().result()
+
+    def readinto(self, buffer) -> int:
+        # Empty blocks (like the EOF marker) are skipped
+        while self._offset >= len(self._block):
+            block = self._next_block()
+            if block is None:
+                return 0
+            self._block, self._offset = block, 0
+
+        n = min(len(buffer), len(self._block) - self._offset)
+        buffer[:n] = self._block[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            self._raw.close()
+        super().close()
+
+
+def open_decompressed(file_path: str, threads: int = DEFAULT_DECOMPRESS_THREADS):
+    """
+    Open a file for binary reading, decompressing it as a stream.
+
+    The codec is detected from the magic bytes, not the filename. BGZF is
+    inflated on a thread pool; plain gzip and zstd are streamed on one
+    thread. Nothing is decompressed to a temporary file.
+
+    Args:
+        file_path: path to the file
+        threads: threads used for BGZF decompression
+
+    Returns:
+        a buffered binary file object
+    """
+    compression = detect_compression(file_path)
+
+    if compression == "bgzf" and threads > 1:
+        return io.BufferedReader(BGZFReader(file_path, threads), buffer_size=READ_BUFFER_SIZE)
+
+    if compression in ("bgzf", "gzip"):
+        return gzip.open(file_path, "rb")
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Reading zstd-compressed files requires the zstandard package")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, "rb"),
+            read_size=READ_BUFFER_SIZE,
+            closefd=True
+        )
+        return io.BufferedReader(reader, buffer_size=READ_BUFFER_SIZE)
+
+    return open(file_path, "rb", buffering=READ_BUFFER_SIZE)
@@ -1,9 +1,27 @@
 import os
 import shutil
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 import hashlib
+import aiofiles
 from datetime import datetime
+from app.utils.compression import COMPRESSION_SUFFIXES
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload stream exceeds its size limit."""
+
+
+def get_file_extension(filename: str) -> str:
+    """
+    Get the lowercased extension of a filename, including a compression suffix.
+
+    "data.vcf.gz" gives ".vcf.gz" rather than ".gz".
+    """
+    suffixes = [suffix.lower() for suffix in Path(filename).suffixes]
+    if len(suffixes) >= 2 and suffixes[-1] in COMPRESSION_SUFFIXES:
+        return "".join(suffixes[-2:])
+    return suffixes[-1] if suffixes else ""
 
 
 def get_file_size_mb(file_path: str) -> float:
@@ -15,7 +33,7 @@ def get_file_size_mb(file_path: str) -> float:
 def generate_unique_filename(original_filename: str, user_id: int) -> str:
     """Generate unique filename using timestamp and hash."""
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    file_ext = Path(original_filename).suffix
+    file_ext = get_file_extension(original_filename)
     base_name = Path(original_filename).stem
 
     # Create hash from user_id and timestamp
@@ -25,6 +43,29 @@ def generate_unique_filename(original_filename: str, user_id: int) -> str:
     return f"{user_id}_{timestamp}_{file_hash}{file_ext}"
 
 
+def content_addressed_filename(content_hash: str, original_filename: str) -> str:
+    """Name a stored upload by its content hash, keeping the original extension."""
+    file_ext = get_file_extension(original_filename)
+    return f"{content_hash}{file_ext}"
+
+
+def adopt_blob(temp_path: str, blob_path: str) -> bool:
+    """
+    Move a freshly uploaded file to its content-addressed path.
+
+    If an identical blob is already stored, the new copy is dropped instead.
+
+    Returns:
+        True if the blob was newly stored, False if it already existed
+    """
+    if os.path.exists(blob_path):
+        delete_file(temp_path)
+        return False
+
+    os.replace(temp_path, blob_path)
+    return True
+
+
 def save_upload_file(file_content: bytes, filename: str, upload_dir: str) -> str:
     """Save uploaded file to disk."""
     os.makedirs(upload_dir, exist_ok=True)
@@ -36,6 +77,160 @@ def save_upload_file(file_content: bytes, filename: str, upload_dir: str) -> str
     return file_path
 
 
+async def save_upload_stream(
+    upload_file,
+    file_path: str,
+    max_bytes: int,
+    chunk_size: int = 1024 * 1024
+) -> Tuple[int, str]:
+    """
+    Stream an uploaded file to disk in chunks.
+
+    The running byte count is checked after every chunk, so a file over the
+    limit is never copied in full. Multipart uploads are already spooled by
+    Starlette at this point; upload_dataset rejects oversized requests on
+    their Content-Length before that. The SHA-256 digest is computed along
+    the way. A partially written file is removed on failure.
+
+    Args:
+        upload_file: FastAPI UploadFile
+        file_path: destination path
+        max_bytes: maximum accepted size in bytes
+        chunk_size: bytes read per chunk
+
+    Returns:
+        size in bytes, hex SHA-256 digest
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    hasher = hashlib.sha256()
+    size_bytes = 0
+
+    try:
+        async with aiofiles.open(file_path, "wb") as f:
+            while True:
+                chunk = await upload_file.read(chunk_size)
+                if not chunk:
+                    break
+
+                size_bytes += len(chunk)
+                if size_bytes > max_bytes:
+                    raise FileTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+                hasher.update(chunk)
+                await f.write(chunk)
+    except Exception:
+        delete_file(file_path)
+        raise
+
+    return size_bytes, hasher.hexdigest()
+
+
+def parse_content_range(header: Optional[str]) -> Tuple[int, int, int]:
+    """
+    Parse a "bytes start-end/total" Content-Range header.
+
+    Returns:
+        start offset, end offset (exclusive), total size
+    """
+    try:
+        unit, byte_range = header.strip().split(" ", 1)
+        span, total = byte_range.split("/")
+        start, end = span.split("-")
+        start, end, total = int(start), int(end) + 1, int(total)
+    except (AttributeError, ValueError):
+        raise ValueError("Content-Range must look like 'bytes start-end/total'")
+
+    if unit != "bytes" or start < 0 or end <= start or end > total:
+        raise ValueError("Content-Range is out of bounds")
+    return start, end, total
+
+
+def merge_byte_ranges(ranges: list, start: int, end: int) -> list:
+    """
+    Add the byte range [start, end) to a list of received ranges.
+
+    Overlapping and adjacent ranges are merged, so the result stays a
+    short sorted list of [start, end) pairs.
+    """
+    merged = []
+    for range_start, range_end in sorted(list(ranges) + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def missing_byte_ranges(ranges: list, total_size: int) -> list:
+    """Get the [start, end) ranges of a file not covered by the received ranges."""
+    missing = []
+    offset = 0
+    for range_start, range_end in sorted(ranges):
+        if range_start > offset:
+            missing.append([offset, range_start])
+        offset = max(offset, range_end)
+    if offset < total_size:
+        missing.append([offset, total_size])
+    return missing
+
+
+def preallocate_file(file_path: str, size_bytes: int) -> None:
+    """Create a file of the given size so chunks can be written at their offsets."""
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.truncate(size_bytes)
+
+
+async def write_stream_at(stream, file_path: str, offset: int, length: int) -> int:
+    """
+    Write an async byte stream into an existing file at the given offset.
+
+    Each chunk goes straight to its final position, so ranges of one file
+    can be written by concurrent requests. Bytes past length are rejected.
+
+    Args:
+        stream: async iterator of bytes (e.g. Request.stream())
+        file_path: preallocated destination file
+        offset: byte offset of the first chunk
+        length: expected number of bytes
+
+    Returns:
+        number of bytes written
+    """
+    written = 0
+    async with aiofiles.open(file_path, "r+b") as f:
+        await f.seek(offset)
+        async for chunk in stream:
+            if not chunk:
+                continue
+            written += len(chunk)
+            if written > length:
+                raise FileTooLargeError(f"Chunk exceeds its {length} byte range")
+            await f.write(chunk)
+    return written
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the hex SHA-256 digest of a file on disk."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def combine_hashes(file_hashes: list) -> str:
+    """
+    Combine the digests of a multi-file dataset into one content hash.
+
+    Digests are combined in the given order; callers sort them when the
+    order of the files does not matter.
+    """
+    if len(file_hashes) == 1:
+        return file_hashes[0]
+    return hashlib.sha256("".join(file_hashes).encode()).hexdigest()
+
+
 def delete_file(file_path: str) -> bool:
     """Delete a file from disk."""
     try:
@@ -48,6 +243,18 @@ def delete_file(file_path: str) -> bool:
         return False
 
 
+def delete_directory(directory_path: str) -> bool:
+    """Delete a directory and its contents from disk."""
+    try:
+        if directory_path and os.path.isdir(directory_path):
+            shutil.rmtree(directory_path)
+            return True
+        return False
+    except Exception as e:
+        print(f"Error deleting directory {directory_path}: {e}")
+        return False
+
+
 def create_results_directory(job_id: int, results_base_dir: str) -> str:
     """Create a directory for job results."""
     job_dir = os.path.join(results_base_dir, f"job_{job_id}")
@@ -63,19 +270,23 @@ def zip_directory(directory_path: str, output_path: str) -> str:
 
 def validate_file_extension(filename: str, allowed_extensions: list) -> bool:
     """Validate file extension."""
-    file_ext = Path(filename).suffix.lower()
+    file_ext = get_file_extension(filename)
     return file_ext in allowed_extensions
 
 
 def get_file_type(filename: str) -> Optional[str]:
-    """Determine file type from extension."""
-    file_ext = Path(filename).suffix.lower()
+    """Determine file type from extension, ignoring a compression suffix."""
+    file_ext = get_file_extension(filename)
+    base_ext = Path(file_ext).stem if file_ext.endswith(COMPRESSION_SUFFIXES) else file_ext
 
-    if file_ext in [".vcf", ".vcf.gz"]:
+    if base_ext == ".vcf":
         return "vcf"
-    elif file_ext == ".csv":
+    elif base_ext == ".csv":
         return "csv"
-    elif file_ext == ".txt":
+    elif base_ext == ".txt":
         return "txt"
+    elif file_ext == ".bed":
+        # The .bed is memory-mapped, so it can't be compressed
+        return "plink"
     else:
         return None
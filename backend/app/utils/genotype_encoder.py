@@ -1,97 +1,141 @@
 import numpy as np
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler
+from typing import Optional
+from app.utils.variant_stats import VariantStats, compute_variant_stats
 
 
-def encode_genotypes(genotype_matrix: np.ndarray, missing_value: int = -1) -> np.ndarray:
+# Variant columns imputed and standardized at a time
+PREPARE_BLOCK_SIZE = 4096
+
+
+def missing_mask(genotype_matrix: np.ndarray, missing_value: int = -1) -> np.ndarray:
+    """Mark missing genotypes: missing_value for hard calls, NaN for dosages."""
+    if np.issubdtype(genotype_matrix.dtype, np.floating):
+        return np.isnan(genotype_matrix) | (genotype_matrix == missing_value)
+    return genotype_matrix == missing_value
+
+
+def select_variants(variant_stats: VariantStats, min_maf: float = 0.0) -> np.ndarray:
     """
-    Encode genotypes for analysis.
+    Get the indices of variants usable for analysis according to their stats.
 
-    - Handles missing values by imputation (mean)
-    - Returns encoded matrix
+    Variants without any called genotype are dropped, as mean imputation
+    would drop them, and so are variants below min_maf.
     """
-    # Replace missing values with NaN for imputation
-    matrix = genotype_matrix.copy().astype(float)
-    matrix[matrix == missing_value] = np.nan
+    usable = variant_stats.called_counts > 0
+    if min_maf > 0:
+        usable &= variant_stats.maf >= min_maf
+    return np.flatnonzero(usable)
 
-    # Impute missing values with mean
-    imputer = SimpleImputer(strategy="mean")
-    matrix_imputed = imputer.fit_transform(matrix)
 
-    return matrix_imputed
+def select_variant_stats(
+    genotype_matrix: np.ndarray,
+    filter_maf: float = 0.0,
+    variant_stats: Optional[VariantStats] = None
+) -> tuple:
+    """
+    Select the variants to prepare and get their stats.
 
+    Stats are counted from the matrix in one block-wise pass when not given.
 
-def normalize_genotypes(genotype_matrix: np.ndarray) -> np.ndarray:
+    Returns:
+        kept variant indices (None when all are kept) and their VariantStats
     """
-    Normalize genotype matrix (standardize by variant).
+    if variant_stats is None:
+        n_variants = genotype_matrix.shape[1]
+        variant_stats = compute_variant_stats(
+            genotype_matrix[:, start:start + PREPARE_BLOCK_SIZE]
+            for start in range(0, n_variants, PREPARE_BLOCK_SIZE)
+        )
 
-    Each variant (column) is standardized to have mean=0 and std=1.
-    """
-    scaler = StandardScaler()
-    return scaler.fit_transform(genotype_matrix)
+    kept_indices = select_variants(variant_stats, filter_maf)
+    if len(kept_indices) == variant_stats.n_variants:
+        return None, variant_stats
+    return kept_indices, variant_stats.subset(kept_indices)
 
 
-def filter_low_maf_variants(
+def impute_and_standardize(
     genotype_matrix: np.ndarray,
-    min_maf: float = 0.01
-) -> tuple[np.ndarray, np.ndarray]:
+    variant_stats: VariantStats,
+    variant_indices: Optional[np.ndarray] = None,
+    normalize: bool = True,
+    block_size: int = PREPARE_BLOCK_SIZE,
+    dtype=np.float32
+) -> np.ndarray:
     """
-    Filter variants with low minor allele frequency.
+    Mean-impute and optionally standardize genotypes in one block-wise pass.
+
+    Each block of variant columns is cast once into the float32 output,
+    then centered, scaled and imputed in place, so peak memory is the
+    output plus one block rather than several float64 copies of the matrix.
 
     Args:
-        genotype_matrix: shape (n_samples, n_variants)
-        min_maf: minimum MAF threshold
+        genotype_matrix: raw (n_samples, n_variants) genotypes
+        variant_stats: stats of the selected variants, giving the means and
+            standard deviations over called genotypes
+        variant_indices: variant columns to prepare (all when None)
+        normalize: whether to standardize
+        block_size: variant columns processed at a time
+        dtype: output dtype
 
     Returns:
-        filtered_matrix: filtered genotype matrix
-        kept_indices: indices of kept variants
+        (n_samples, n_selected_variants) matrix
     """
-    n_samples = genotype_matrix.shape[0]
+    n_variants = variant_stats.n_variants
+    means = variant_stats.mean_dosages.astype(dtype)
+    if normalize:
+        stds = variant_stats.dosage_stds().astype(dtype)
+        stds[stds == 0] = 1.0  # as StandardScaler does for constant variants
 
-    # Calculate allele frequencies for each variant
-    allele_counts = np.sum(genotype_matrix, axis=0)
-    allele_freqs = allele_counts / (2 * n_samples)
+    matrix = np.empty((genotype_matrix.shape[0], n_variants), dtype=dtype)
 
-    # MAF is the minimum of freq and 1-freq
-    maf = np.minimum(allele_freqs, 1 - allele_freqs)
+    for start in range(0, n_variants, block_size):
+        stop = min(start + block_size, n_variants)
+        columns = slice(start, stop) if variant_indices is None else variant_indices[start:stop]
 
-    # Keep variants above MAF threshold
-    kept_indices = np.where(maf >= min_maf)[0]
-    filtered_matrix = genotype_matrix[:, kept_indices]
+        raw = genotype_matrix[:, columns]
+        block = matrix[:, start:stop]
+        block[:] = raw
+        missing = missing_mask(raw)
 
-    return filtered_matrix, kept_indices
+        if normalize:
+            block -= means[start:stop]
+            block /= stds[start:stop]
+            # Imputed means standardize to 0
+            block[missing] = 0
+        else:
+            np.copyto(block, np.broadcast_to(means[start:stop], block.shape), where=missing)
+
+    return matrix
 
 
 def prepare_genotype_matrix(
     genotype_matrix: np.ndarray,
     normalize: bool = True,
-    filter_maf: float = 0.0
+    filter_maf: float = 0.0,
+    variant_stats: Optional[VariantStats] = None
 ) -> np.ndarray:
     """
     Prepare genotype matrix for analysis.
 
     Steps:
-    1. Handle missing values
-    2. Filter low MAF variants (optional)
+    1. Drop variants without calls, and low MAF variants (optional)
+    2. Impute missing values with the variant mean
     3. Normalize (optional)
 
+    Steps 2 and 3 run as one float32 pass (see impute_and_standardize).
+    With variant_stats (computed at ingest), filtering, imputation means and
+    standardization scales are looked up; otherwise they are counted from
+    the matrix in a first block-wise pass. Results match mean imputation
+    followed by StandardScaler to float32 precision.
+
     Args:
         genotype_matrix: raw genotype matrix
         normalize: whether to normalize
         filter_maf: MAF threshold (0 = no filtering)
+        variant_stats: stats of the matrix's variants, if available
 
     Returns:
-        prepared genotype matrix
+        prepared float32 genotype matrix
     """
-    # Encode and impute
-    matrix = encode_genotypes(genotype_matrix)
-
-    # Filter low MAF variants
-    if filter_maf > 0:
-        matrix, _ = filter_low_maf_variants(matrix, min_maf=filter_maf)
-
-    # Normalize
-    if normalize:
-        matrix = normalize_genotypes(matrix)
-
-    return matrix
+    kept_indices, variant_stats = select_variant_stats(genotype_matrix, filter_maf, variant_stats)
+    return impute_and_standardize(genotype_matrix, variant_stats, kept_indices, normalize)
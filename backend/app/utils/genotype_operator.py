@@ -0,0 +1,130 @@
+import numpy as np
+from typing import Optional
+from scipy.sparse.linalg import LinearOperator
+from app.utils.genotype_encoder import PREPARE_BLOCK_SIZE, missing_mask, select_variant_stats
+from app.utils.variant_stats import VariantStats
+
+
+class StandardizedGenotypeOperator(LinearOperator):
+    """
+    Linear operator for the mean-imputed, standardized genotype matrix.
+
+    Wraps the raw (n_samples, n_variants) int8 genotypes (or float16
+    dosages) with per-variant means and standard deviations. Products are
+    computed block by block, standardizing one block of variant columns at
+    a time, so the float matrix is never materialized: the working set is
+    the raw genotypes plus one float32 block.
+
+    Imputed genotypes sit on the mean, so they standardize to 0. Without
+    stds the operator is only centered.
+    """
+
+    def __init__(
+        self,
+        genotypes: np.ndarray,
+        means: np.ndarray,
+        stds: Optional[np.ndarray] = None,
+        variant_indices: Optional[np.ndarray] = None,
+        block_size: int = PREPARE_BLOCK_SIZE,
+        dtype=np.float32
+    ):
+        self.genotypes = genotypes
+        self.means = np.asarray(means, dtype=dtype)
+        self.scales = None
+        if stds is not None:
+            scales = np.asarray(stds, dtype=dtype).copy()
+            scales[scales == 0] = 1.0  # as StandardScaler does for constant variants
+            self.scales = scales
+        self.variant_indices = variant_indices
+        self.block_size = block_size
+        super().__init__(dtype=np.dtype(dtype), shape=(genotypes.shape[0], len(self.means)))
+
+    def iter_blocks(self):
+        """Yield (start, stop, standardized float block) over the variant columns."""
+        n_variants = self.shape[1]
+        for start in range(0, n_variants, self.block_size):
+            stop = min(start + self.block_size, n_variants)
+            if self.variant_indices is None:
+                raw = self.genotypes[:, start:stop]
+            else:
+                raw = self.genotypes[:, self.variant_indices[start:stop]]
+
+            block = np.asarray(raw, dtype=self.dtype)
+            block -= self.means[start:stop]
+            if self.scales is not None:
+                block /= self.scales[start:stop]
+            block[missing_mask(raw)] = 0
+            yield start, stop, block
+
+    def _matmat(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X)
+        result = np.zeros((self.shape[0], X.shape[1]), dtype=np.result_type(self.dtype, X.dtype))
+        for start, stop, block in self.iter_blocks():
+            result += block @ X[start:stop]
+        return result
+
+    def _rmatmat(self, Y: np.ndarray) -> np.ndarray:
+        Y = np.asarray(Y)
+        result = np.empty((self.shape[1], Y.shape[1]), dtype=np.result_type(self.dtype, Y.dtype))
+        for start, stop, block in self.iter_blocks():
+            result[start:stop] = block.T @ Y
+        return result
+
+    def _matvec(self, x: np.ndarray) -> np.ndarray:
+        return self._matmat(np.asarray(x).reshape(-1, 1)).ravel()
+
+    def _rmatvec(self, y: np.ndarray) -> np.ndarray:
+        return self._rmatmat(np.asarray(y).reshape(-1, 1)).ravel()
+
+    def _adjoint(self) -> LinearOperator:
+        return LinearOperator(
+            shape=(self.shape[1], self.shape[0]),
+            matvec=self._rmatvec,
+            rmatvec=self._matvec,
+            matmat=self._rmatmat,
+            rmatmat=self._matmat,
+            dtype=self.dtype
+        )
+
+    def gram(self) -> np.ndarray:
+        """Z @ Z.T (samples x samples), accumulated in float64 over blocks."""
+        result = np.zeros((self.shape[0], self.shape[0]), dtype=np.float64)
+        for _, _, block in self.iter_blocks():
+            result += block @ block.T
+        return result
+
+    def column_sum_squares(self) -> np.ndarray:
+        """Sum of squares of each standardized column."""
+        result = np.empty(self.shape[1], dtype=np.float64)
+        for start, stop, block in self.iter_blocks():
+            result[start:stop] = np.square(block, dtype=np.float64).sum(axis=0)
+        return result
+
+    def to_dense(self) -> np.ndarray:
+        """Materialize the standardized matrix (for small inputs)."""
+        result = np.empty(self.shape, dtype=self.dtype)
+        for start, stop, block in self.iter_blocks():
+            result[:, start:stop] = block
+        return result
+
+
+def prepare_genotype_operator(
+    genotype_matrix: np.ndarray,
+    normalize: bool = True,
+    filter_maf: float = 0.0,
+    variant_stats: Optional[VariantStats] = None
+) -> StandardizedGenotypeOperator:
+    """
+    Lazy counterpart of prepare_genotype_matrix.
+
+    Selects variants the same way, but returns an operator over the raw
+    genotypes instead of the prepared float matrix. Without normalize the
+    operator is only centered, which is what PCA and the GRM use.
+    """
+    kept_indices, variant_stats = select_variant_stats(genotype_matrix, filter_maf, variant_stats)
+    return StandardizedGenotypeOperator(
+        genotype_matrix,
+        variant_stats.mean_dosages,
+        variant_stats.dosage_stds() if normalize else None,
+        kept_indices
+    )
@@ -0,0 +1,162 @@
+import numpy as np
+from typing import NamedTuple
+
+
+# Variants packed at a time (a multiple of 64, so blocks fill whole words)
+PACK_BLOCK_SIZE = 8192
+
+# Pair kernels work on tiles of samples x samples x words; a 16 x 16 x 256
+# tile keeps each temporary at 512 KB, within cache
+IBS_TILE_SAMPLES = 16
+IBS_TILE_WORDS = 256
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+class PackedGenotypes(NamedTuple):
+    """
+    Genotypes packed to 2 bits each, as two bit planes per sample.
+
+    Each genotype's 2-bit code is (high, low): 0 -> 00, 1 -> 01, 2 -> 11
+    and missing -> 10. Bit v of a sample's row in a plane holds variant v,
+    64 variants per uint64 word, so four genotypes take one byte. Padding
+    bits past the last variant are coded missing.
+    """
+    low: np.ndarray  # uint64 (n_samples, n_words): genotype is 1 or 2
+    high: np.ndarray  # uint64 (n_samples, n_words): genotype is 2 or missing
+    n_variants: int
+
+    @property
+    def n_samples(self) -> int:
+        return self.low.shape[0]
+
+
+class IBSCounts(NamedTuple):
+    """Pairwise identity-by-state counts over variants called in both samples."""
+    ibs0: np.ndarray  # int32 (n_samples, n_samples): no allele shared
+    ibs1: np.ndarray  # one allele shared
+    ibs2: np.ndarray  # both alleles shared
+
+    @property
+    def n_called(self) -> np.ndarray:
+        """Variants called in both samples of each pair."""
+        return self.ibs0 + self.ibs1 + self.ibs2
+
+
+def _pack_bits(mask: np.ndarray) -> np.ndarray:
+    """Pack a (n_samples, n_bits) bool mask, n_bits a multiple of 64, into uint64 words."""
+    packed = np.packbits(mask, axis=1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64, copy=False)
+
+
+def pack_genotypes(
+    genotype_matrix: np.ndarray,
+    block_size: int = PACK_BLOCK_SIZE
+) -> PackedGenotypes:
+    """
+    Pack a (n_samples, n_variants) genotype matrix to 2 bits per genotype.
+
+    Hard calls are int8 with -1 for missing; float dosages are rounded to
+    the nearest call, with NaN missing. Columns are packed a block at a
+    time, so only one block of masks is held alongside the packed planes.
+    """
+    n_samples, n_variants = genotype_matrix.shape
+    n_words = -(-n_variants // 64)
+    low = np.zeros((n_samples, n_words), dtype=np.uint64)
+    high = np.zeros((n_samples, n_words), dtype=np.uint64)
+
+    block_size = max(64, block_size // 64 * 64)
+    for start in range(0, n_words * 64, block_size):
+        stop = min(start + block_size, n_words * 64)
+        block = np.asarray(genotype_matrix[:, start:min(stop, n_variants)])
+        if np.issubdtype(block.dtype, np.floating):
+            missing = np.isnan(block)
+            block = np.rint(np.where(missing, -1, block))
+        else:
+            missing = block < 0
+
+        # Pad the last block with missing genotypes to a whole word
+        padding = ((0, 0), (0, stop - start - block.shape[1]))
+        has_alt = np.pad(block > 0, padding, constant_values=False)
+        hom_alt_or_missing = np.pad((block == 2) | missing, padding, constant_values=True)
+
+        words = slice(start // 64, stop // 64)
+        low[:, words] = _pack_bits(has_alt)
+        high[:, words] = _pack_bits(hom_alt_or_missing)
+
+    return PackedGenotypes(low, high, n_variants)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each uint64 word."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+
+    # SWAR popcount, for numpy versions without bitwise_count
+    words = words - ((words >> np.uint64(1)) & _M1)
+    words = (words & _M2) + ((words >> np.uint64(2)) & _M2)
+    words = (words + (words >> np.uint64(4))) & _M4
+    return (words * _H01) >> np.uint64(56)
+
+
+def ibs_counts(
+    packed: PackedGenotypes,
+    tile_samples: int = IBS_TILE_SAMPLES,
+    tile_words: int = IBS_TILE_WORDS
+) -> IBSCounts:
+    """
+    Count IBS0, IBS1 and IBS2 variants for every pair of samples.
+
+    Works on tiles of sample pairs and word ranges: each tile combines the
+    bit planes of two groups of samples with bitwise operations and counts
+    set bits, comparing 64 variants per word operation. Variants missing in
+    either sample of a pair are not counted for it. Only tiles on or above
+    the diagonal are computed; the result is symmetric.
+
+    Returns:
+        IBSCounts with (n_samples, n_samples) int32 count matrices
+    """
+    n_samples, n_words = packed.low.shape
+    counts = np.zeros((3, n_samples, n_samples), dtype=np.int32)
+
+    planes = (
+        packed.low | ~packed.high,  # called
+        packed.low,
+        packed.high,
+        ~(packed.low | packed.high),  # homozygous reference
+        packed.low & packed.high  # homozygous alternate
+    )
+
+    for i_start in range(0, n_samples, tile_samples):
+        rows = slice(i_start, min(i_start + tile_samples, n_samples))
+        for j_start in range(i_start, n_samples, tile_samples):
+            cols = slice(j_start, min(j_start + tile_samples, n_samples))
+            tile = counts[:, rows, cols]
+
+            for w_start in range(0, n_words, tile_words):
+                words = slice(w_start, w_start + tile_words)
+
+                called_i, low_i, high_i, ref_i, alt_i = [
+                    plane[rows, None, words] for plane in planes
+                ]
+                called_j, low_j, high_j, ref_j, alt_j = [
+                    plane[None, cols, words] for plane in planes
+                ]
+
+                both = called_i & called_j
+                ibs0 = (ref_i & alt_j) | (alt_i & ref_j)
+                ibs2 = both & ~((low_i ^ low_j) | (high_i ^ high_j))
+
+                n_both = popcount(both).sum(axis=-1, dtype=np.int32)
+                n_ibs0 = popcount(ibs0).sum(axis=-1, dtype=np.int32)
+                n_ibs2 = popcount(ibs2).sum(axis=-1, dtype=np.int32)
+                tile[0] += n_ibs0
+                tile[1] += n_both - n_ibs0 - n_ibs2
+                tile[2] += n_ibs2
+
+            counts[:, cols, rows] = tile.transpose(0, 2, 1)
+
+    return IBSCounts(*counts)
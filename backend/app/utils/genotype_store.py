@@ -0,0 +1,601 @@
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import struct
+import uuid
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+from app.utils.vcf_parser import (
+    DEFAULT_BLOCK_SIZE,
+    GenotypeBlock,
+    build_tabix_index,
+    genotype_dtype,
+    iter_genotype_blocks,
+    iter_vcf_genotype_blocks,
+    iter_vcf_set_genotype_blocks,
+    parse_regions,
+    tabix_index_path
+)
+from app.utils.variant_stats import (
+    VariantStats,
+    block_variant_stats,
+    concat_variant_stats,
+    load_variant_stats,
+    save_variant_stats
+)
+from app.utils.variant_table import VariantTable, VariantTableBuilder, concat_variant_tables
+
+try:
+    import zarr
+    from numcodecs import Blosc
+except ImportError:  # the Zarr backend is optional
+    zarr = None
+
+
+STORE_FORMAT_VERSION = 2
+
+GENOTYPES_FILE = "genotypes.bin"
+META_FILE = "meta.json"
+SAMPLES_FILE = "samples.npy"
+STATS_FILE = "variant_stats.npz"
+VARIANT_SOURCES_FILE = "variant_sources.npy"
+ZARR_GENOTYPES_DIR = "genotypes.zarr"
+
+STORE_BACKENDS = ("memmap", "zarr")
+
+# Samples per Zarr chunk; variants per chunk follow the ingest block size
+DEFAULT_ZARR_SAMPLE_CHUNK = 1000
+
+
+class GenotypeStore:
+    """
+    Binary genotype store built once at ingest.
+
+    Genotypes are kept variant-major as a raw int8 file, so a block of
+    consecutive variants is one contiguous slice of the memmap. Sample
+    names and the columnar VariantTable (chromosome codes, positions and
+    source IDs) live in sidecar .npy files, and per-variant allele,
+    missing and het counts in variant_stats.npz.
+
+    With the "zarr" backend the genotypes are instead a compressed Zarr
+    array chunked on both axes, so variant blocks and sample x variant
+    tiles are each read and decompressed independently.
+
+    Stores merged from other stores list them in meta "sources", each with
+    the range of sample columns it contributed, and keep a per-variant
+    bitmask of the sources that had each variant in variant_sources.npy.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+
+        self.n_samples = self.meta["n_samples"]
+        self.n_variants = self.meta["n_variants"]
+
+        self.backend = self.meta["backend"]
+
+        if self.backend == "zarr":
+            if zarr is None:
+                raise ValueError("Reading Zarr genotype stores requires the zarr package")
+            self.genotypes = zarr.open(os.path.join(store_dir, ZARR_GENOTYPES_DIR), mode="r")
+        else:
+            self.genotypes = np.memmap(
+                os.path.join(store_dir, GENOTYPES_FILE),
+                dtype=np.dtype(self.meta["dtype"]),
+                mode="r",
+                shape=(self.n_variants, self.n_samples)
+            )
+
+        self.samples = np.load(os.path.join(store_dir, SAMPLES_FILE)).tolist()
+        self.variants = VariantTable.load(store_dir, self.n_variants)
+        self.variant_stats = load_variant_stats(os.path.join(store_dir, STATS_FILE))
+
+    @property
+    def sources(self) -> list:
+        """Stores this one was merged from, empty for ingested stores."""
+        return self.meta.get("sources", [])
+
+    def get_variant_sources(self) -> Optional[np.ndarray]:
+        """Bitmask of the sources each variant came from (bit i for sources[i])."""
+        path = os.path.join(self.store_dir, VARIANT_SOURCES_FILE)
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def get_variants(self, variant_indices: Optional[np.ndarray] = None) -> VariantTable:
+        """Get the variant table, optionally for a subset of variants."""
+        if variant_indices is None:
+            return self.variants
+        return self.variants.subset(variant_indices)
+
+    def get_variant_stats(self, variant_indices: Optional[np.ndarray] = None) -> VariantStats:
+        """Get per-variant stats, optionally for a subset of variants."""
+        if variant_indices is None:
+            return self.variant_stats
+        return self.variant_stats.subset(variant_indices)
+
+    def region_indices(self, regions: list) -> np.ndarray:
+        """
+        Get the indices of variants inside any of the given regions.
+
+        Args:
+            regions: list of "chrom:start-end" strings
+
+        Returns:
+            sorted int64 array of variant indices
+        """
+        indices = [
+            self.variants.range_indices(chrom, start, end)
+            for chrom, start, end in parse_regions(regions)
+        ]
+        return np.unique(np.concatenate(indices)) if indices else np.empty(0, dtype=np.int64)
+
+    def iter_selected_blocks(
+        self,
+        variant_indices: Optional[np.ndarray] = None,
+        sample_indices: Optional[np.ndarray] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> Iterator[np.ndarray]:
+        """
+        Iterate over sample-major blocks of selected variants and samples.
+
+        Only the selected rows are read, one block at a time.
+        """
+        n_selected = self.n_variants if variant_indices is None else len(variant_indices)
+        for start in range(0, n_selected, block_size):
+            stop = min(start + block_size, n_selected)
+            rows = slice(start, stop) if variant_indices is None else variant_indices[start:stop]
+            if self.backend == "zarr":
+                columns = slice(None) if sample_indices is None else sample_indices
+                block = self.genotypes.oindex[rows, columns]
+            elif sample_indices is None:
+                block = self.genotypes[rows]
+            else:
+                block = self.genotypes[rows][:, sample_indices]
+            yield np.asarray(block).T
+
+    def to_matrix(
+        self,
+        variant_indices: Optional[np.ndarray] = None,
+        sample_indices: Optional[np.ndarray] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> np.ndarray:
+        """
+        Get a (n_samples, n_variants) view of the genotypes.
+
+        Without indices this is zero-copy; with variant_indices, only the
+        rows of the selected variants are read from disk. A sample
+        selection is applied block by block, so only the selected samples
+        are ever copied.
+        """
+        if sample_indices is None:
+            if self.backend == "zarr":
+                if variant_indices is None:
+                    return self.genotypes[:].T
+                return self.genotypes.oindex[variant_indices, :].T
+
+            if variant_indices is None:
+                return self.genotypes.T
+            return self.genotypes[variant_indices].T
+
+        n_selected = self.n_variants if variant_indices is None else len(variant_indices)
+        matrix = np.empty((len(sample_indices), n_selected), dtype=self.genotypes.dtype)
+        blocks = self.iter_selected_blocks(variant_indices, sample_indices, block_size)
+        for start, block in zip(range(0, n_selected, block_size), blocks):
+            matrix[:, start:start + block.shape[1]] = block
+
+        return matrix
+
+    @property
+    def chunks(self) -> tuple:
+        """(variants, samples) per independently readable chunk."""
+        if self.backend == "zarr":
+            return self.genotypes.chunks
+        return (self.n_variants, self.n_samples)
+
+    def read_tile(
+        self,
+        variant_start: int,
+        variant_stop: int,
+        sample_start: int = 0,
+        sample_stop: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Read a (samples, variants) tile of genotypes.
+
+        With the Zarr backend only the chunks overlapping the tile are
+        decompressed, so tiles aligned to chunks can be read in parallel.
+        """
+        tile = self.genotypes[variant_start:variant_stop, sample_start:sample_stop]
+        return np.asarray(tile).T
+
+    def iter_blocks(self, block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[GenotypeBlock]:
+        """Iterate over zero-copy sample-major blocks of consecutive variants."""
+        for start in range(0, self.n_variants, block_size):
+            stop = min(start + block_size, self.n_variants)
+            variants = self.variants.slice(start, stop)
+            yield GenotypeBlock(
+                genotypes=self.genotypes[start:stop].T,
+                chroms=variants.chroms,
+                positions=variants.positions,
+                variant_ids=variants.ids
+            )
+
+
+def _write_meta(
+    out_dir: str,
+    file_type: str,
+    n_samples: int,
+    n_variants: int,
+    backend: str = "memmap",
+    dtype: str = "int8",
+    sources: Optional[list] = None
+) -> None:
+    meta = {
+        "format_version": STORE_FORMAT_VERSION,
+        "source_file_type": file_type,
+        "backend": backend,
+        "dtype": dtype,
+        "n_samples": n_samples,
+        "n_variants": n_variants,
+    }
+    if sources:
+        meta["sources"] = sources
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+class _GenotypeWriter:
+    """Append variant-major blocks to a store's raw genotype file or Zarr array."""
+
+    def __init__(
+        self,
+        out_dir: str,
+        n_samples: int,
+        backend: str = "memmap",
+        chunk_variants: int = DEFAULT_BLOCK_SIZE,
+        chunk_samples: int = DEFAULT_ZARR_SAMPLE_CHUNK,
+        dtype: str = "int8"
+    ):
+        self.backend = backend
+        self.dtype = np.dtype(dtype)
+
+        if backend == "zarr":
+            if zarr is None:
+                raise ValueError("The Zarr store backend requires the zarr package")
+            self.array = zarr.open(
+                os.path.join(out_dir, ZARR_GENOTYPES_DIR),
+                mode="w",
+                shape=(0, n_samples),
+                chunks=(chunk_variants, min(chunk_samples, max(n_samples, 1))),
+                dtype=self.dtype,
+                compressor=Blosc(cname="zstd", clevel=5, shuffle=Blosc.BITSHUFFLE)
+            )
+        else:
+            self.file = open(os.path.join(out_dir, GENOTYPES_FILE), "wb")
+
+    def write(self, variant_major_block: np.ndarray) -> None:
+        if self.backend == "zarr":
+            self.array.append(np.asarray(variant_major_block, dtype=self.dtype), axis=0)
+        else:
+            self.file.write(np.ascontiguousarray(variant_major_block, dtype=self.dtype).tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.backend != "zarr":
+            self.file.close()
+
+
+def _write_store(
+    sample_names: list,
+    blocks: Iterator[GenotypeBlock],
+    out_dir: str,
+    file_type: str,
+    backend: str = "memmap",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    dtype: str = "int8"
+) -> int:
+    """Write streamed blocks and their sidecars into out_dir, returning the variant count."""
+    variants = VariantTableBuilder()
+    stats = []
+    n_variants = 0
+
+    with _GenotypeWriter(out_dir, len(sample_names), backend, block_size, dtype=dtype) as writer:
+        for block in blocks:
+            writer.write(block.genotypes.T)
+            n_variants += block.genotypes.shape[1]
+
+            # Summary stats are counted while the block is in memory
+            stats.append(block_variant_stats(block.genotypes))
+
+            variants.append(
+                block.chroms, block.positions, block.variant_ids, block.genotypes.shape[1]
+            )
+
+    np.save(os.path.join(out_dir, SAMPLES_FILE), np.asarray(sample_names, dtype=str))
+    variants.build().save(out_dir)
+
+    if stats:
+        save_variant_stats(os.path.join(out_dir, STATS_FILE), concat_variant_stats(stats))
+
+    _write_meta(out_dir, file_type, len(sample_names), n_variants, backend, dtype)
+    return n_variants
+
+
+def read_tabix_contigs(vcf_path: str) -> Optional[list]:
+    """
+    Read the contig names listed in a VCF's tabix (.tbi) index.
+
+    Contigs are returned in index order, which is the order they appear in
+    the file. Returns None when there is no index.
+    """
+    index_path = tabix_index_path(vcf_path)
+    if not os.path.exists(index_path):
+        return None
+
+    with gzip.open(index_path, "rb") as f:
+        header = f.read(36)
+        if len(header) < 36 or header[:4] != b"TBI\x01":
+            return None
+        names_length = struct.unpack("<i", header[32:36])[0]
+        names = f.read(names_length)
+
+    return [name.decode() for name in names.split(b"\x00") if name]
+
+
+def _build_vcf_part(
+    vcf_path: str,
+    region: Optional[str],
+    part_dir: str,
+    block_size: int,
+    tabix: str,
+    genotype_field: str = "GT"
+) -> int:
+    """Process pool worker: write one VCF, or one contig of it, into a part store."""
+    os.makedirs(part_dir)
+    regions = [region] if region else None
+    sample_names, blocks = iter_vcf_genotype_blocks(
+        vcf_path, block_size, regions, tabix, genotype_field
+    )
+    return _write_store(
+        sample_names, blocks, part_dir, "vcf", dtype=genotype_dtype(genotype_field)
+    )
+
+
+def process_pool_available() -> bool:
+    """
+    Check whether this process may start a process pool.
+
+    Daemonic processes, such as the children of Celery's prefork pool, may
+    not start child processes. Ingest tasks are routed to a solo-pool
+    worker, which runs them in its main process.
+    """
+    return not multiprocessing.current_process().daemon
+
+
+def _build_vcf_parts_parallel(
+    parts: list,
+    out_dir: str,
+    block_size: int,
+    n_workers: int,
+    tabix: str,
+    backend: str = "memmap",
+    genotype_field: str = "GT"
+) -> int:
+    """
+    Decode one part per worker process and stitch the parts in order.
+
+    Args:
+        parts: (vcf_path, region) pairs in output order; region is a contig
+            of an indexed VCF, or None for a whole file of a multi-file dataset
+
+    All parts must list the same samples in the same order, so the result
+    is the same as with the serial path.
+    """
+    parts_dir = os.path.join(out_dir, "parts")
+    part_dirs = [os.path.join(parts_dir, str(i)) for i in range(len(parts))]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = [
+            executor.submit(
+                _build_vcf_part, vcf_path, region, part_dir, block_size, tabix, genotype_field
+            )
+            for (vcf_path, region), part_dir in zip(parts, part_dirs)
+        ]
+        part_sizes = [future.result() for future in futures]
+
+    dtype = genotype_dtype(genotype_field)
+    sample_names = np.load(os.path.join(part_dirs[0], SAMPLES_FILE))
+    variants = []
+    stats = []
+
+    with _GenotypeWriter(out_dir, len(sample_names), backend, block_size, dtype=dtype) as writer:
+        for part_dir, part_size in zip(part_dirs, part_sizes):
+            if not np.array_equal(np.load(os.path.join(part_dir, SAMPLES_FILE)), sample_names):
+                raise ValueError("Sample order differs between parts")
+            if part_size == 0:
+                continue
+
+            part_path = os.path.join(part_dir, GENOTYPES_FILE)
+            if backend == "memmap":
+                with open(part_path, "rb") as f:
+                    shutil.copyfileobj(f, writer.file)
+            else:
+                part = np.memmap(part_path, dtype=dtype, mode="r", shape=(part_size, len(sample_names)))
+                for start in range(0, part_size, block_size):
+                    writer.write(part[start:start + block_size])
+            variants.append(VariantTable.load(part_dir, part_size))
+            stats.append(load_variant_stats(os.path.join(part_dir, STATS_FILE)))
+
+    n_variants = sum(part_sizes)
+    np.save(os.path.join(out_dir, SAMPLES_FILE), sample_names)
+    if variants:
+        concat_variant_tables(variants).save(out_dir)
+    if stats:
+        save_variant_stats(os.path.join(out_dir, STATS_FILE), concat_variant_stats(stats))
+
+    _write_meta(out_dir, "vcf", len(sample_names), n_variants, backend, dtype)
+
+    shutil.rmtree(parts_dir)
+    return n_variants
+
+
+def build_genotype_store(
+    file_path: str,
+    file_type: str,
+    store_dir: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    n_workers: int = 1,
+    tabix: str = "tabix",
+    variant_major: bool = False,
+    csv_engine: str = "c",
+    file_paths: Optional[list] = None,
+    backend: str = "memmap",
+    genotype_field: str = "GT"
+) -> GenotypeStore:
+    """
+    Convert a genotype file into a GenotypeStore.
+
+    The source is streamed block by block and appended to the variant-major
+    genotype file, so the full matrix is never held in memory. The store is
+    written to a temporary directory and moved into place when complete; if
+    another ingest already created store_dir, that store is returned.
+
+    Bgzipped VCFs are tabix-indexed first (when tabix is on the PATH), so
+    later region queries on the source file can seek instead of scan.
+
+    Datasets made of several VCFs (file_paths, in contig order) are read
+    as one sequence of blocks. With n_workers > 1 they are decoded one file
+    per process, and a single indexed VCF is decoded one contig per
+    process; parts are stitched in order. Anything else, and any ingest in
+    a process that may not start a process pool, is ingested serially.
+
+    Args:
+        file_path: path to source file
+        file_type: "vcf", "csv" or "plink"
+        store_dir: directory to create the store in
+        block_size: number of variants decoded at a time
+        n_workers: number of processes for parallel VCF ingest
+        tabix: tabix executable used to seek to each contig
+        variant_major: True for CSVs with variants as rows
+        csv_engine: pandas parser engine for CSVs, "c" or "pyarrow"
+        file_paths: all files of a multi-file VCF dataset, in contig order
+        backend: "memmap" (raw int8 file) or "zarr" (chunked, compressed)
+        genotype_field: VCF field to read, "GT" for int8 hard calls or "DS" /
+            "GP" for dosages stored as float16 (NaN for missing)
+
+    Returns:
+        the opened GenotypeStore
+    """
+    # A private temporary directory lets concurrent ingests of the same
+    # content race safely; the first one to finish wins
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown store backend: {backend}")
+    dtype = genotype_dtype(genotype_field)
+
+    tmp_dir = f"{store_dir}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp_dir)
+
+    try:
+        is_file_set = file_paths is not None and len(file_paths) > 1
+        if file_type == "vcf":
+            for path in file_paths or [file_path]:
+                build_tabix_index(path, tabix)
+
+        if not process_pool_available():
+            n_workers = 1
+
+        parts = None
+        if is_file_set and n_workers > 1:
+            parts = [(path, None) for path in file_paths]
+        elif file_type == "vcf" and n_workers > 1 and tabix and shutil.which(tabix):
+            contigs = read_tabix_contigs(file_path)
+            if contigs and len(contigs) > 1:
+                parts = [(file_path, contig) for contig in contigs]
+
+        if parts:
+            n_variants = _build_vcf_parts_parallel(
+                parts,
+                tmp_dir,
+                block_size,
+                min(n_workers, len(parts)),
+                tabix,
+                backend,
+                genotype_field
+            )
+        elif is_file_set:
+            sample_names, blocks = iter_vcf_set_genotype_blocks(
+                file_paths, block_size, genotype_field
+            )
+            n_variants = _write_store(
+                sample_names, blocks, tmp_dir, file_type, backend, block_size, dtype
+            )
+        else:
+            sample_names, blocks = iter_genotype_blocks(
+                file_path, file_type, block_size, variant_major, csv_engine, genotype_field
+            )
+            n_variants = _write_store(
+                sample_names, blocks, tmp_dir, file_type, backend, block_size, dtype
+            )
+
+        if n_variants == 0:
+            raise ValueError("No genotype data found in file")
+
+        publish_store(tmp_dir, store_dir)
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return GenotypeStore(store_dir)
+
+
+def publish_store(tmp_dir: str, store_dir: str) -> None:
+    """
+    Move a completed store from its temporary directory into place.
+
+    If a concurrent build already created store_dir, that store is kept
+    and the temporary one removed.
+    """
+    try:
+        os.rename(tmp_dir, store_dir)
+    except OSError:
+        if open_genotype_store(store_dir) is None:
+            raise
+        shutil.rmtree(tmp_dir)
+
+
+def store_key(
+    content_hash: str,
+    variant_major: bool = False,
+    backend: str = "memmap",
+    genotype_field: str = "GT"
+) -> str:
+    """
+    Name the store of a dataset by its content hash.
+
+    Identical uploads share a store. The parse options and backend that
+    change the store contents are part of the key.
+    """
+    key = f"{content_hash}-variant-major" if variant_major else content_hash
+    if genotype_field != "GT":
+        key = f"{key}-{genotype_field.lower()}"
+    return key if backend == "memmap" else f"{key}-{backend}"
+
+
+def zarr_available() -> bool:
+    """Check whether the optional Zarr backend can be used."""
+    return zarr is not None
+
+
+def open_genotype_store(store_dir: Optional[str]) -> Optional[GenotypeStore]:
+    """Open a store if it exists, else return None."""
+    if not store_dir or not os.path.exists(os.path.join(store_dir, META_FILE)):
+        return None
+    return GenotypeStore(store_dir)
@@ -0,0 +1,119 @@
+import numpy as np
+from typing import Optional
+from app.utils.genotype_encoder import impute_and_standardize, select_variant_stats
+from app.utils.variant_stats import VariantStats
+from app.utils.variant_table import VariantTable
+
+
+DEFAULT_LD_WINDOW = 50  # variants per window
+DEFAULT_LD_STEP = 5  # variants the window advances by
+DEFAULT_LD_R2 = 0.2  # pairs above this r² are pruned
+
+# Variants standardized at a time; windows inside a chunk reuse its columns
+LD_CHUNK_SIZE = 2048
+
+
+def contig_runs(variants: Optional[VariantTable], n_variants: int) -> list:
+    """
+    Split the variant axis into (start, stop) runs of one contig each.
+
+    Without CHROM information the whole axis is one run.
+    """
+    if variants is None or variants.chrom_codes is None:
+        return [(0, n_variants)]
+
+    codes = np.asarray(variants.chrom_codes)
+    boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [n_variants]))
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+def _prune_window(r2: np.ndarray, maf: np.ndarray, r2_threshold: float) -> np.ndarray:
+    """
+    Greedily prune one window.
+
+    Pairs above the threshold are visited in order and the variant with the
+    lower MAF is dropped (the later one on ties), as PLINK's
+    --indep-pairwise does. Only linked pairs are visited.
+
+    Returns:
+        bool mask of the window's variants to keep
+    """
+    keep = np.ones(len(maf), dtype=bool)
+    for i, j in np.argwhere(np.triu(r2 > r2_threshold, k=1)):
+        if keep[i] and keep[j]:
+            keep[j if maf[j] <= maf[i] else i] = False
+    return keep
+
+
+def ld_prune(
+    genotype_matrix: np.ndarray,
+    variant_stats: Optional[VariantStats] = None,
+    variants: Optional[VariantTable] = None,
+    window_size: int = DEFAULT_LD_WINDOW,
+    step: int = DEFAULT_LD_STEP,
+    r2_threshold: float = DEFAULT_LD_R2,
+    chunk_size: int = LD_CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Select approximately unlinked variants with sliding-window LD pruning.
+
+    Windows of window_size variants advance by step within each contig.
+    In each window, r² between all still-kept variants comes from one
+    matrix product of their standardized genotypes (Z.T @ Z / n), and
+    linked pairs are pruned. Genotypes are standardized once per chunk of
+    variants, which the overlapping windows inside it share.
+
+    Variants without calls are dropped, as in preparation.
+
+    Args:
+        genotype_matrix: raw (n_samples, n_variants) genotypes
+        variant_stats: stats of the matrix's variants (counted if not given)
+        variants: variant table, used to keep windows within contigs
+        window_size: variants per window
+        step: variants the window advances by
+        r2_threshold: maximum r² between kept variants in a window
+        chunk_size: variants standardized at a time
+
+    Returns:
+        sorted int64 array of kept variant indices
+    """
+    n_samples, n_variants = genotype_matrix.shape
+    usable, variant_stats = select_variant_stats(genotype_matrix, 0.0, variant_stats)
+    if usable is None:
+        usable = np.arange(n_variants)
+
+    keep = np.zeros(n_variants, dtype=bool)
+    keep[usable] = True
+    maf = np.zeros(n_variants, dtype=np.float32)
+    maf[usable] = variant_stats.maf
+
+    # Whole steps per chunk, so window starts stay on one grid across chunks
+    chunk_size = max(step, chunk_size // step * step)
+
+    for run_start, run_stop in contig_runs(variants, n_variants):
+        for chunk_start in range(run_start, run_stop, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size + window_size, run_stop)
+            chunk_indices = np.arange(chunk_start, chunk_stop)
+            chunk_indices = chunk_indices[keep[chunk_indices]]
+            if len(chunk_indices) < 2:
+                continue
+
+            # Positions of the chunk's columns within usable, for their stats
+            stats = variant_stats.subset(np.searchsorted(usable, chunk_indices))
+            standardized = impute_and_standardize(genotype_matrix, stats, chunk_indices)
+
+            last_start = min(chunk_start + chunk_size, run_stop)
+            for start in range(chunk_start, last_start, step):
+                window = np.arange(start, min(start + window_size, run_stop))
+                window = window[keep[window]]
+                if len(window) < 2:
+                    continue
+
+                block = standardized[:, np.searchsorted(chunk_indices, window)]
+                r = (block.T @ block) / n_samples
+                window_keep = _prune_window(r * r, maf[window], r2_threshold)
+                keep[window[~window_keep]] = False
+
+    return np.flatnonzero(keep)
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+import os
+from typing import Iterator, Tuple
+from app.utils.vcf_parser import DEFAULT_BLOCK_SIZE, GenotypeBlock, count_lines, open_binary
+from app.utils.variant_table import VariantTable, VariantTableBuilder
+
+
+# Magic number and SNP-major mode byte of a PLINK 1 .bed file
+BED_MAGIC = b"\x6c\x1b\x01"
+
+# 2-bit .bed codes mapped to A1 allele counts: 00 hom A1, 01 missing,
+# 10 het, 11 hom A2
+BED_CODES = np.array([2, -1, 1, 0], dtype=np.int8)
+
+# Lookup table decoding one packed byte into its four genotypes
+BED_LUT = BED_CODES[(np.arange(256)[:, None] >> np.arange(0, 8, 2)) & 3]
+
+
+def plink_fileset_paths(bed_path: str) -> Tuple[str, str, str]:
+    """Get the .bed, .bim and .fam paths of a PLINK fileset."""
+    prefix = os.path.splitext(bed_path)[0]
+    return f"{prefix}.bed", f"{prefix}.bim", f"{prefix}.fam"
+
+
+def read_fam(fam_path: str) -> list:
+    """
+    Read sample IDs from a .fam file.
+
+    Returns:
+        list of within-family sample IDs (IID column)
+    """
+    fam = pd.read_csv(fam_path, sep=r"\s+", header=None, usecols=[1], dtype=str)
+    return fam[1].tolist()
+
+
+def read_bim(bim_path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read variant metadata from a .bim file.
+
+    Returns:
+        chroms, positions and variant IDs as arrays
+    """
+    bim = pd.read_csv(
+        bim_path,
+        sep=r"\s+",
+        header=None,
+        usecols=[0, 1, 3],
+        dtype={0: str, 1: str, 3: np.int64}
+    )
+    return bim[0].to_numpy(dtype=str), bim[3].to_numpy(), bim[1].to_numpy(dtype=str)
+
+
+def check_bed_file(bed_path: str, n_samples: int, n_variants: int) -> None:
+    """Check the .bed magic number and that its size matches the .fam/.bim counts."""
+    with open(bed_path, "rb") as f:
+        magic = f.read(len(BED_MAGIC))
+    if magic != BED_MAGIC:
+        raise ValueError("Error parsing PLINK fileset: not a SNP-major PLINK .bed file")
+
+    expected_size = len(BED_MAGIC) + n_variants * ((n_samples + 3) // 4)
+    if os.path.getsize(bed_path) != expected_size:
+        raise ValueError(
+            "Error parsing PLINK fileset: .bed size does not match .bim/.fam dimensions"
+        )
+
+
+def probe_plink_dimensions(bed_path: str) -> Tuple[int, int]:
+    """
+    Get the sample and variant counts of a PLINK fileset.
+
+    Counts .fam and .bim lines and checks that the .bed header and size
+    agree with them, without decoding any genotypes.
+
+    Returns:
+        n_samples, n_variants
+    """
+    bed_path, bim_path, fam_path = plink_fileset_paths(bed_path)
+
+    try:
+        with open_binary(fam_path) as f:
+            n_samples = count_lines(f)
+        with open_binary(bim_path) as f:
+            n_variants = count_lines(f)
+    except OSError as e:
+        raise ValueError(f"Error parsing PLINK fileset: {str(e)}")
+
+    check_bed_file(bed_path, n_samples, n_variants)
+    return n_samples, n_variants
+
+
+def decode_bed_block(packed: np.ndarray, n_samples: int) -> np.ndarray:
+    """
+    Decode packed .bed rows into an int8 sample-major block.
+
+    Args:
+        packed: uint8 array of shape (n_variants, bytes_per_variant)
+        n_samples: number of samples (drops the padding in the last byte)
+
+    Returns:
+        int8 array of shape (n_samples, n_variants), -1 for missing
+    """
+    decoded = BED_LUT[packed].reshape(packed.shape[0], -1)[:, :n_samples]
+    return np.ascontiguousarray(decoded.T)
+
+
+def iter_plink_genotype_blocks(
+    bed_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE
+) -> Tuple[list, Iterator[GenotypeBlock]]:
+    """
+    Stream a PLINK .bed/.bim/.fam fileset as blocks of variants.
+
+    The .bed file is memory-mapped and decoded one block at a time through
+    a byte lookup table, so there is no text parsing of genotypes.
+
+    Args:
+        bed_path: path to the .bed file (.bim and .fam share its prefix)
+        block_size: number of variants per block
+
+    Returns:
+        sample_names: list of sample IDs
+        blocks: iterator of GenotypeBlock
+    """
+    bed_path, bim_path, fam_path = plink_fileset_paths(bed_path)
+
+    try:
+        sample_names = read_fam(fam_path)
+        chroms, positions, variant_ids = read_bim(bim_path)
+    except Exception as e:
+        raise ValueError(f"Error parsing PLINK fileset: {str(e)}")
+
+    n_samples = len(sample_names)
+    n_variants = len(variant_ids)
+    bytes_per_variant = (n_samples + 3) // 4
+
+    check_bed_file(bed_path, n_samples, n_variants)
+
+    def blocks():
+        if n_variants == 0:
+            return
+
+        bed = np.memmap(
+            bed_path,
+            dtype=np.uint8,
+            mode="r",
+            offset=len(BED_MAGIC),
+            shape=(n_variants, bytes_per_variant)
+        )
+        for start in range(0, n_variants, block_size):
+            stop = min(start + block_size, n_variants)
+            yield GenotypeBlock(
+                genotypes=decode_bed_block(bed[start:stop], n_samples),
+                chroms=chroms[start:stop],
+                positions=positions[start:stop],
+                variant_ids=variant_ids[start:stop]
+            )
+
+    return sample_names, blocks()
+
+
+def parse_plink_fileset(
+    bed_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE
+) -> Tuple[np.ndarray, list, VariantTable]:
+    """
+    Parse a PLINK fileset into a genotype matrix.
+
+    Returns:
+        genotype_matrix: int8 array of shape (n_samples, n_variants)
+        sample_names: list of sample IDs
+        variants: VariantTable with CHROM, POS and variant IDs
+    """
+    sample_names, blocks = iter_plink_genotype_blocks(bed_path, block_size)
+
+    genotype_blocks = []
+    variants = VariantTableBuilder()
+    for block in blocks:
+        genotype_blocks.append(block.genotypes)
+        variants.append(block.chroms, block.positions, block.variant_ids)
+
+    if not genotype_blocks:
+        raise ValueError("Error parsing PLINK fileset: no variants found")
+
+    return np.concatenate(genotype_blocks, axis=1), sample_names, variants.build()
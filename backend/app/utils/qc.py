@@ -0,0 +1,157 @@
+import numpy as np
+from typing import Iterator, NamedTuple, Optional
+from scipy.stats import chi2
+
+
+# Job "qc" parameters and their (min, max) values; unset thresholds are not applied
+QC_THRESHOLDS = {
+    # variants called in fewer samples than this fraction are dropped
+    "min_call_rate": (0.0, 1.0),
+    # variants below this minor allele frequency are dropped
+    "min_maf": (0.0, 0.5),
+    # variants with a Hardy-Weinberg p-value below this are dropped
+    "min_hwe_p": (0.0, 1.0),
+    # samples missing more than this fraction of calls are dropped
+    "max_sample_missing": (0.0, 1.0),
+    # samples this many SDs from the mean heterozygosity are dropped
+    "max_het_deviation": (0.0, None),
+}
+
+
+class QCResult(NamedTuple):
+    """Keep-masks and summary of a QC pass."""
+    variant_mask: np.ndarray  # bool, per variant
+    sample_mask: np.ndarray  # bool, per sample
+    summary: dict
+
+
+def hwe_chi2_pvalues(hom_ref: np.ndarray, het: np.ndarray, hom_alt: np.ndarray) -> np.ndarray:
+    """
+    Hardy-Weinberg equilibrium p-values from genotype counts.
+
+    Uses the 1-df chi-square test on observed vs expected genotype counts,
+    vectorized over variants. Monomorphic and uncalled variants get 1.
+    """
+    n = (hom_ref + het + hom_alt).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = (2 * hom_alt + het) / (2 * n)
+        q = 1 - p
+        expected = np.stack([n * q * q, 2 * n * p * q, n * p * p])
+        observed = np.stack([hom_ref, het, hom_alt]).astype(np.float64)
+        statistic = ((observed - expected) ** 2 / expected).sum(axis=0)
+
+    pvalues = chi2.sf(statistic, df=1)
+    pvalues[~np.isfinite(statistic)] = 1.0
+    return pvalues
+
+
+def _genotype_counts(genotypes: np.ndarray) -> tuple:
+    """Per-block missing mask and het / hom-alt masks; dosages are rounded to calls."""
+    if np.issubdtype(genotypes.dtype, np.floating):
+        missing = np.isnan(genotypes)
+        calls = np.rint(np.where(missing, -1, genotypes))
+    else:
+        missing = genotypes < 0
+        calls = genotypes
+    return missing, calls == 1, calls == 2
+
+
+def run_qc(
+    blocks: Iterator[np.ndarray],
+    n_samples: int,
+    min_call_rate: Optional[float] = None,
+    min_maf: Optional[float] = None,
+    min_hwe_p: Optional[float] = None,
+    max_sample_missing: Optional[float] = None,
+    max_het_deviation: Optional[float] = None
+) -> QCResult:
+    """
+    Run variant and sample QC in one pass over sample-major genotype blocks.
+
+    Each block is read once; per-variant genotype counts and per-sample
+    missing and heterozygous counts are accumulated, and the thresholds are
+    applied at the end. Nothing is copied beyond the current block. Variant
+    metrics are computed over all samples and sample metrics over all
+    variants, so the filters do not depend on each other's order.
+
+    Args:
+        blocks: sample-major (n_samples, block_variants) genotype blocks
+        n_samples: number of samples
+        min_call_rate, min_maf, min_hwe_p, max_sample_missing,
+            max_het_deviation: thresholds (see QC_THRESHOLDS); None skips one
+
+    Returns:
+        QCResult with keep-masks and a summary of what was removed
+    """
+    sample_missing = np.zeros(n_samples, dtype=np.int64)
+    sample_het = np.zeros(n_samples, dtype=np.int64)
+    variant_counts = []
+
+    for genotypes in blocks:
+        missing, het, hom_alt = _genotype_counts(np.asarray(genotypes))
+        sample_missing += missing.sum(axis=1)
+        sample_het += het.sum(axis=1)
+        variant_counts.append(
+            np.stack([missing.sum(axis=0), het.sum(axis=0), hom_alt.sum(axis=0)])
+        )
+
+    if variant_counts:
+        counts = np.concatenate(variant_counts, axis=1)
+    else:
+        counts = np.zeros((3, 0), dtype=np.int64)
+    n_missing, n_het, n_hom_alt = counts
+    n_variants = counts.shape[1]
+    n_called = n_samples - n_missing
+    n_hom_ref = n_called - n_het - n_hom_alt
+
+    variant_mask = n_called > 0
+    removed = {}
+
+    call_rate = n_called / max(n_samples, 1)
+    if min_call_rate is not None:
+        failed = call_rate < min_call_rate
+        removed["call_rate"] = int(failed.sum())
+        variant_mask &= ~failed
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alt_freqs = (2 * n_hom_alt + n_het) / (2 * n_called)
+    maf = np.minimum(alt_freqs, 1 - alt_freqs)
+    if min_maf is not None:
+        failed = ~(maf >= min_maf)
+        removed["maf"] = int(failed.sum())
+        variant_mask &= ~failed
+
+    if min_hwe_p is not None:
+        failed = hwe_chi2_pvalues(n_hom_ref, n_het, n_hom_alt) < min_hwe_p
+        removed["hwe"] = int(failed.sum())
+        variant_mask &= ~failed
+
+    sample_mask = np.ones(n_samples, dtype=bool)
+    sample_called = n_variants - sample_missing
+    missing_rate = sample_missing / max(n_variants, 1)
+    if max_sample_missing is not None:
+        failed = missing_rate > max_sample_missing
+        removed["sample_missing"] = int(failed.sum())
+        sample_mask &= ~failed
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        het_rate = sample_het / sample_called
+    if max_het_deviation is not None:
+        called = sample_called > 0
+        failed = ~called
+        if called.any():
+            mean, sd = het_rate[called].mean(), het_rate[called].std()
+            failed |= called & (np.abs(het_rate - mean) > max_het_deviation * sd)
+        removed["sample_heterozygosity"] = int(failed.sum())
+        sample_mask &= ~failed
+
+    summary = {
+        "n_variants": n_variants,
+        "n_samples": n_samples,
+        "n_variants_kept": int(variant_mask.sum()),
+        "n_samples_kept": int(sample_mask.sum()),
+        "removed": removed,
+        "mean_call_rate": float(call_rate.mean()) if n_variants else 0.0,
+        "mean_sample_missing": float(missing_rate.mean()) if n_samples else 0.0,
+    }
+    return QCResult(variant_mask, sample_mask, summary)
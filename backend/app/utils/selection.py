@@ -0,0 +1,132 @@
+import numpy as np
+from typing import Optional
+from app.utils.variant_table import VariantTable
+
+
+# Job parameters that select part of a dataset, each a list of IDs
+SELECTION_PARAMETERS = ("samples", "exclude_samples", "variants")
+
+# How preview jobs pick their variants
+PREVIEW_SAMPLINGS = ("random", "even")
+
+# Largest preview seed: default_rng takes any non-negative integer, but
+# seeds are kept to 32 bits so they round-trip exactly through JSON clients
+PREVIEW_MAX_SEED = 2 ** 32 - 1
+
+
+def resolve_sample_indices(
+    sample_names: list,
+    samples: Optional[list] = None,
+    exclude_samples: Optional[list] = None
+) -> Optional[np.ndarray]:
+    """
+    Resolve sample ID selections to sample indices.
+
+    Args:
+        sample_names: sample IDs of the dataset, in column order
+        samples: IDs to keep (all samples when None)
+        exclude_samples: IDs to drop
+
+    Returns:
+        sorted int64 array of sample indices, or None when nothing is
+        selected so the full sample axis can be used as is
+    """
+    if samples is None and not exclude_samples:
+        return None
+
+    names = np.asarray(sample_names, dtype=str)
+
+    keep = np.ones(len(names), dtype=bool)
+    if samples is not None:
+        missing = set(samples) - set(sample_names)
+        if missing:
+            raise ValueError(f"Unknown sample IDs: {', '.join(sorted(missing)[:10])}")
+        keep = np.isin(names, np.asarray(samples, dtype=str))
+    if exclude_samples:
+        keep &= ~np.isin(names, np.asarray(exclude_samples, dtype=str))
+
+    indices = np.flatnonzero(keep)
+    if len(indices) == 0:
+        raise ValueError("The sample selection is empty")
+    return indices
+
+
+def preview_variant_count(
+    n_samples: int,
+    n_variants: int,
+    target_genotypes: int,
+    min_variants: int,
+    max_variants: int
+) -> int:
+    """
+    Number of variants a preview uses.
+
+    Aims for about target_genotypes genotypes, so wide cohorts get fewer
+    variants, within [min_variants, max_variants] and never more than the
+    dataset has.
+    """
+    n_keep = target_genotypes // max(n_samples, 1)
+    return min(n_variants, max(min_variants, min(n_keep, max_variants)))
+
+
+def subsample_variants(
+    variant_indices: np.ndarray,
+    n_keep: int,
+    sampling: str = "random",
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Pick a reproducible subsample of variants for a preview.
+
+    Args:
+        variant_indices: sorted indices to choose from
+        n_keep: number of variants to keep
+        sampling: "random" (seeded, so repeat runs match) or "even"
+            (evenly spaced along the genome)
+        seed: random seed
+
+    Returns:
+        sorted subset of variant_indices, so the store is read in order
+    """
+    if n_keep >= len(variant_indices):
+        return variant_indices
+
+    if sampling == "even":
+        positions = np.linspace(0, len(variant_indices) - 1, n_keep).round().astype(np.int64)
+    elif sampling == "random":
+        rng = np.random.default_rng(seed)
+        positions = np.sort(rng.choice(len(variant_indices), size=n_keep, replace=False))
+    else:
+        raise ValueError(f"Unknown preview sampling: {sampling}")
+
+    return variant_indices[positions]
+
+
+def resolve_variant_indices(
+    variants: VariantTable,
+    variant_ids: Optional[list] = None,
+    variant_indices: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """
+    Resolve a variant ID list to variant indices.
+
+    Args:
+        variants: variant table of the dataset
+        variant_ids: IDs to keep, as source IDs or CHROM_POS
+        variant_indices: an existing selection (e.g. from regions) to
+            intersect with
+
+    Returns:
+        sorted int64 array of variant indices, or None when nothing is
+        selected
+    """
+    if variant_ids is None:
+        return variant_indices
+
+    indices = variants.id_indices(variant_ids)
+    if variant_indices is not None:
+        indices = np.intersect1d(indices, variant_indices, assume_unique=True)
+
+    if len(indices) == 0:
+        raise ValueError("No variants found matching the requested variant IDs")
+    return indices
@@ -0,0 +1,232 @@
+import os
+import shutil
+import uuid
+import numpy as np
+from typing import Tuple
+from app.utils.genotype_store import (
+    DEFAULT_BLOCK_SIZE,
+    SAMPLES_FILE,
+    STATS_FILE,
+    STORE_BACKENDS,
+    VARIANT_SOURCES_FILE,
+    GenotypeStore,
+    _GenotypeWriter,
+    _write_meta,
+    publish_store
+)
+from app.utils.variant_stats import save_variant_stats, stack_variant_stats
+from app.utils.variant_table import VariantTable, _code_dtype
+from app.utils.vcf_parser import contig_sort_key
+
+
+# How the variants of merged datasets are combined
+VARIANT_JOINS = ("intersect", "union")
+
+
+def _variant_keys(table: VariantTable, contig_ranks: dict, stride: int) -> np.ndarray:
+    """
+    One int64 (contig rank, POS) key per variant.
+
+    Ranks follow karyotype order over the contigs of all merged tables, so
+    sorting by key sorts by (chrom, pos) in the same order for every table.
+    """
+    ranks = np.array([contig_ranks[name] for name in table.contigs.tolist()], dtype=np.int64)
+    return ranks[table.chrom_codes] * stride + np.asarray(table.positions, dtype=np.int64)
+
+
+def _number_duplicates(sorted_keys: np.ndarray) -> np.ndarray:
+    """Number repeated keys (e.g. split multi-allelic sites) 0, 1, 2, ... in order."""
+    n = len(sorted_keys)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    run_starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    run_lengths = np.diff(np.concatenate((run_starts, [n])))
+    return np.arange(n) - np.repeat(run_starts, run_lengths)
+
+
+def merge_variant_tables(tables: list, how: str = "intersect") -> Tuple[VariantTable, list]:
+    """
+    Merge-join the variants of several tables by (chrom, pos).
+
+    Each table is sorted once by an integer (contig, pos, occurrence) key;
+    the key arrays are then intersected or unioned with sorted set
+    operations and every table is located in the result by binary search.
+    Variants at the same position are matched by their order within it.
+
+    Args:
+        tables: VariantTables with CHROM and POS
+        how: "intersect" keeps variants present in every table, "union"
+            keeps variants present in any
+
+    Returns:
+        the merged table, in karyotype and position order, and for each
+        input table an int64 array giving the index of each merged variant
+        in that table (-1 where the table does not have it)
+    """
+    if how not in VARIANT_JOINS:
+        raise ValueError(f"Unknown variant join: {how}")
+    if not all(table.has_positions for table in tables):
+        raise ValueError("Merging datasets requires CHROM/POS for every variant")
+
+    contigs = sorted(
+        {name for table in tables for name in table.contigs.tolist()},
+        key=contig_sort_key
+    )
+    contig_ranks = {name: rank for rank, name in enumerate(contigs)}
+    stride = max(int(np.max(table.positions, initial=0)) for table in tables) + 1
+
+    orders, sorted_keys = [], []
+    for table in tables:
+        keys = _variant_keys(table, contig_ranks, stride)
+        order = np.argsort(keys, kind="stable")
+        orders.append(order)
+        sorted_keys.append(keys[order])
+
+    duplicates = [_number_duplicates(keys) for keys in sorted_keys]
+    n_occurrences = max(int(np.max(occurrences, initial=0)) for occurrences in duplicates) + 1
+    sorted_keys = [
+        keys * n_occurrences + occurrences for keys, occurrences in zip(sorted_keys, duplicates)
+    ]
+
+    merged_keys = sorted_keys[0]
+    for keys in sorted_keys[1:]:
+        if how == "intersect":
+            merged_keys = np.intersect1d(merged_keys, keys, assume_unique=True)
+        else:
+            merged_keys = np.union1d(merged_keys, keys)
+
+    variant_indices = []
+    for keys, order in zip(sorted_keys, orders):
+        located = np.searchsorted(keys, merged_keys)
+        present = located < len(keys)
+        present[present] = keys[located[present]] == merged_keys[present]
+
+        indices = np.full(len(merged_keys), -1, dtype=np.int64)
+        indices[present] = order[located[present]]
+        variant_indices.append(indices)
+
+    site_keys = merged_keys // n_occurrences
+    ids = None
+    if all(table.ids is not None for table in tables):
+        # Take each ID from the first table that has the variant
+        ids = np.empty(len(merged_keys), dtype=np.result_type(*[table.ids for table in tables]))
+        filled = np.zeros(len(merged_keys), dtype=bool)
+        for table, indices in zip(tables, variant_indices):
+            take = (indices >= 0) & ~filled
+            ids[take] = table.ids[indices[take]]
+            filled |= take
+
+    merged = VariantTable(
+        n_variants=len(merged_keys),
+        contigs=np.array(contigs, dtype=str),
+        chrom_codes=(site_keys // stride).astype(_code_dtype(len(contigs))),
+        positions=(site_keys % stride).astype(np.asarray(tables[0].positions).dtype),
+        ids=ids
+    )
+    return merged, variant_indices
+
+
+def merge_genotype_stores(
+    stores: list,
+    store_dir: str,
+    how: str = "intersect",
+    backend: str = "memmap",
+    block_size: int = DEFAULT_BLOCK_SIZE
+) -> GenotypeStore:
+    """
+    Merge genotype stores of disjoint sample sets into a new store.
+
+    Samples are concatenated in store order, so the first store's samples
+    keep their columns and the others' follow. Variants are merge-joined by
+    (chrom, pos); with how="union", samples of a store that lacks a variant
+    are missing for it. Per-variant stats are summed from the sources'
+    stats rather than recounted, and the result records its sources and
+    which of them had each variant, so downstream caches can tell the new
+    samples and variants apart.
+
+    Args:
+        stores: source GenotypeStores
+        store_dir: directory to create the merged store in
+        how: "intersect" or "union" of the variants
+        backend: "memmap" or "zarr"
+        block_size: number of merged variants written at a time
+
+    Returns:
+        the opened merged GenotypeStore
+    """
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown store backend: {backend}")
+
+    dtypes = {store.genotypes.dtype for store in stores}
+    if len(dtypes) > 1:
+        raise ValueError("Cannot merge hard-call and dosage datasets")
+    dtype = dtypes.pop()
+    missing_value = np.nan if dtype.kind == "f" else -1
+
+    sample_names = [name for store in stores for name in store.samples]
+    if len(set(sample_names)) != len(sample_names):
+        raise ValueError("Datasets to merge share sample IDs")
+
+    merged, variant_indices = merge_variant_tables([store.variants for store in stores], how)
+    if merged.n_variants == 0:
+        raise ValueError("The merged dataset has no variants")
+
+    sample_offsets = np.cumsum([0] + [store.n_samples for store in stores])
+
+    tmp_dir = f"{store_dir}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp_dir)
+
+    try:
+        writer = _GenotypeWriter(tmp_dir, len(sample_names), backend, block_size, dtype=dtype.name)
+        with writer:
+            for start in range(0, merged.n_variants, block_size):
+                stop = min(start + block_size, merged.n_variants)
+                block = np.full((stop - start, len(sample_names)), missing_value, dtype=dtype)
+
+                for store, indices, offset in zip(stores, variant_indices, sample_offsets):
+                    rows = indices[start:stop]
+                    present = rows >= 0
+                    if not present.any():
+                        continue
+                    if store.backend == "zarr":
+                        values = store.genotypes.oindex[rows[present], :]
+                    else:
+                        values = store.genotypes[rows[present]]
+                    block[present, offset:offset + store.n_samples] = values
+
+                writer.write(block)
+
+        np.save(os.path.join(tmp_dir, SAMPLES_FILE), np.asarray(sample_names, dtype=str))
+        merged.save(tmp_dir)
+
+        source_bits = np.min_scalar_type(2 ** len(stores) - 1)
+        variant_sources = np.zeros(merged.n_variants, dtype=source_bits)
+        for i, indices in enumerate(variant_indices):
+            variant_sources[indices >= 0] |= 1 << i
+        np.save(os.path.join(tmp_dir, VARIANT_SOURCES_FILE), variant_sources)
+
+        save_variant_stats(
+            os.path.join(tmp_dir, STATS_FILE),
+            stack_variant_stats([store.get_variant_stats() for store in stores], variant_indices)
+        )
+
+        sources = [
+            {
+                "store": os.path.basename(os.path.normpath(store.store_dir)),
+                "sample_start": int(sample_offsets[i]),
+                "sample_stop": int(sample_offsets[i + 1]),
+                "n_variants": store.n_variants
+            }
+            for i, store in enumerate(stores)
+        ]
+        _write_meta(
+            tmp_dir, "merged", len(sample_names), merged.n_variants, backend, dtype.name, sources
+        )
+
+        publish_store(tmp_dir, store_dir)
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return GenotypeStore(store_dir)
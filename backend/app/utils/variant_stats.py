@@ -0,0 +1,184 @@
+import os
+import uuid
+import numpy as np
+from typing import Iterator, NamedTuple, Optional
+
+
+class VariantStats(NamedTuple):
+    """
+    Per-variant summary counts of a genotype matrix.
+
+    Counts only cover called genotypes, so missing values (-1, or NaN for
+    dosages) never count as alleles. For dosage data, allele counts are
+    expected counts and hets are dosages that round to 1.
+    """
+    alt_counts: np.ndarray  # alternate alleles among called genotypes (int64, float64 for dosages)
+    missing_counts: np.ndarray  # int32, samples with a missing call
+    het_counts: np.ndarray  # int32, heterozygous calls
+    sum_squares: np.ndarray  # float64, sum of squared dosages of called genotypes
+    maf: np.ndarray  # float32, minor allele frequency (NaN if no calls)
+    n_samples: int
+
+    @property
+    def n_variants(self) -> int:
+        return len(self.alt_counts)
+
+    @property
+    def called_counts(self) -> np.ndarray:
+        return self.n_samples - self.missing_counts
+
+    @property
+    def alt_freqs(self) -> np.ndarray:
+        """Alternate allele frequency of each variant (NaN if no calls)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.alt_counts / (2 * self.called_counts)
+
+    @property
+    def mean_dosages(self) -> np.ndarray:
+        """Mean dosage over called genotypes, i.e. the mean-imputation value."""
+        return 2 * self.alt_freqs
+
+    def dosage_stds(self) -> np.ndarray:
+        """
+        Standard deviation of each variant after mean imputation.
+
+        Imputed values sit on the mean, so only called genotypes contribute
+        to the variance.
+        """
+        mean = self.mean_dosages
+        with np.errstate(invalid="ignore"):
+            variance = (self.sum_squares - self.called_counts * mean ** 2) / self.n_samples
+        return np.sqrt(np.clip(variance, 0, None))
+
+    def subset(self, variant_indices: np.ndarray) -> "VariantStats":
+        """Get the stats of a subset of variants."""
+        return VariantStats(
+            alt_counts=self.alt_counts[variant_indices],
+            missing_counts=self.missing_counts[variant_indices],
+            het_counts=self.het_counts[variant_indices],
+            sum_squares=self.sum_squares[variant_indices],
+            maf=self.maf[variant_indices],
+            n_samples=self.n_samples
+        )
+
+
+def _maf(alt_counts: np.ndarray, missing_counts: np.ndarray, n_samples: int) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alt_freqs = alt_counts / (2 * (n_samples - missing_counts))
+    return np.minimum(alt_freqs, 1 - alt_freqs).astype(np.float32)
+
+
+def block_variant_stats(genotypes: np.ndarray) -> VariantStats:
+    """
+    Count alleles, missing and heterozygous calls of a sample-major block.
+
+    Args:
+        genotypes: array of shape (n_samples, n_variants), int8 with -1 for
+            missing or float dosages with NaN for missing
+    """
+    n_samples = genotypes.shape[0]
+
+    if np.issubdtype(genotypes.dtype, np.floating):
+        dosages = genotypes.astype(np.float64)
+        missing = np.isnan(dosages)
+        called = np.where(missing, 0.0, dosages)
+        alt_counts = called.sum(axis=0)
+        het_counts = np.count_nonzero((called >= 0.5) & (called < 1.5), axis=0)
+    else:
+        missing = genotypes < 0
+        called = np.clip(genotypes, 0, None)
+        alt_counts = called.sum(axis=0, dtype=np.int64)
+        het_counts = np.count_nonzero(genotypes == 1, axis=0)
+
+    missing_counts = np.count_nonzero(missing, axis=0).astype(np.int32)
+
+    return VariantStats(
+        alt_counts=alt_counts,
+        missing_counts=missing_counts,
+        het_counts=het_counts.astype(np.int32),
+        sum_squares=np.square(called, dtype=np.float64).sum(axis=0),
+        maf=_maf(alt_counts, missing_counts, n_samples),
+        n_samples=n_samples
+    )
+
+
+def concat_variant_stats(parts: list) -> VariantStats:
+    """Join the stats of consecutive blocks of variants."""
+    return VariantStats(
+        alt_counts=np.concatenate([part.alt_counts for part in parts]),
+        missing_counts=np.concatenate([part.missing_counts for part in parts]),
+        het_counts=np.concatenate([part.het_counts for part in parts]),
+        sum_squares=np.concatenate([part.sum_squares for part in parts]),
+        maf=np.concatenate([part.maf for part in parts]),
+        n_samples=parts[0].n_samples
+    )
+
+
+def stack_variant_stats(parts: list, variant_indices: list) -> VariantStats:
+    """
+    Combine the stats of disjoint sets of samples over a merged variant axis.
+
+    Counts are additive across samples, so merged stats need no pass over
+    the genotypes. Variants a part does not have count as missing for all
+    of its samples.
+
+    Args:
+        parts: VariantStats of each sample set
+        variant_indices: for each part, the index of each merged variant in
+            that part, -1 where the part does not have the variant
+    """
+    n_variants = len(variant_indices[0])
+    n_samples = sum(part.n_samples for part in parts)
+    is_float = any(part.alt_counts.dtype.kind == "f" for part in parts)
+
+    alt_counts = np.zeros(n_variants, dtype=np.float64 if is_float else np.int64)
+    missing_counts = np.zeros(n_variants, dtype=np.int32)
+    het_counts = np.zeros(n_variants, dtype=np.int32)
+    sum_squares = np.zeros(n_variants, dtype=np.float64)
+
+    for part, indices in zip(parts, variant_indices):
+        present = indices >= 0
+        part = part.subset(indices[present])
+        alt_counts[present] += part.alt_counts
+        missing_counts[present] += part.missing_counts
+        missing_counts[~present] += part.n_samples
+        het_counts[present] += part.het_counts
+        sum_squares[present] += part.sum_squares
+
+    return VariantStats(
+        alt_counts=alt_counts,
+        missing_counts=missing_counts,
+        het_counts=het_counts,
+        sum_squares=sum_squares,
+        maf=_maf(alt_counts, missing_counts, n_samples),
+        n_samples=n_samples
+    )
+
+
+def compute_variant_stats(blocks: Iterator[np.ndarray]) -> Optional[VariantStats]:
+    """Compute stats over sample-major genotype blocks in one pass."""
+    parts = [block_variant_stats(np.asarray(genotypes)) for genotypes in blocks]
+    return concat_variant_stats(parts) if parts else None
+
+
+def save_variant_stats(path: str, stats: VariantStats) -> None:
+    """Write stats to an .npz file, atomically replacing any existing one."""
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}.npz"
+    np.savez(tmp_path, n_samples=np.int64(stats.n_samples), **{
+        field: getattr(stats, field)
+        for field in ("alt_counts", "missing_counts", "het_counts", "sum_squares", "maf")
+    })
+    os.replace(tmp_path, path)
+
+
+def load_variant_stats(path: str) -> VariantStats:
+    """Read stats written by save_variant_stats."""
+    with np.load(path) as data:
+        return VariantStats(
+            alt_counts=data["alt_counts"],
+            missing_counts=data["missing_counts"],
+            het_counts=data["het_counts"],
+            sum_squares=data["sum_squares"],
+            maf=data["maf"],
+            n_samples=int(data["n_samples"])
+        )
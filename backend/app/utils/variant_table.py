@@ -0,0 +1,321 @@
+import os
+import numpy as np
+from typing import Optional
+
+
+CONTIGS_FILE = "contigs.npy"
+CHROM_CODES_FILE = "chrom_codes.npy"
+POSITIONS_FILE = "positions.npy"
+VARIANT_IDS_FILE = "variant_ids.npy"
+
+POSITION_DTYPE_LIMIT = np.iinfo(np.int32).max
+
+
+def _code_dtype(n_contigs: int) -> np.dtype:
+    """Smallest unsigned integer type that can index n_contigs contigs."""
+    return np.min_scalar_type(max(n_contigs - 1, 0))
+
+
+def _compact_positions(positions: np.ndarray) -> np.ndarray:
+    positions = np.asarray(positions)
+    if positions.size and positions.max() > POSITION_DTYPE_LIMIT:
+        return positions.astype(np.int64)
+    return positions.astype(np.int32)
+
+
+def _compact_ids(ids: np.ndarray) -> np.ndarray:
+    """Store IDs as UTF-8 bytes (one byte per ASCII character, not four)."""
+    ids = np.asarray(ids)
+    if ids.dtype.kind == "S":
+        return ids
+    return np.char.encode(ids.astype(str), "utf-8")
+
+
+class VariantTable:
+    """
+    Columnar per-variant metadata.
+
+    Chromosomes are stored as small integer codes into a list of contig
+    names, positions as int32 (int64 only past 2^31) and source IDs, when
+    the input has them, as a byte string array. IDs are only formatted as
+    Python strings when something needs them, e.g. for an export.
+
+    CSV inputs have IDs but no CHROM/POS, so contigs, chrom_codes and
+    positions may all be None.
+    """
+
+    def __init__(
+        self,
+        n_variants: int,
+        contigs: Optional[np.ndarray] = None,
+        chrom_codes: Optional[np.ndarray] = None,
+        positions: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None
+    ):
+        self.n_variants = n_variants
+        self.contigs = contigs
+        self.chrom_codes = chrom_codes
+        self.positions = positions
+        self.ids = ids
+        self._contig_spans = None
+
+    @classmethod
+    def from_columns(
+        cls,
+        chroms: Optional[np.ndarray] = None,
+        positions: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None
+    ) -> "VariantTable":
+        """Build a table from per-variant CHROM, POS and ID columns."""
+        builder = VariantTableBuilder()
+        builder.append(chroms, positions, ids)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return self.n_variants
+
+    @property
+    def has_positions(self) -> bool:
+        return self.chrom_codes is not None and self.positions is not None
+
+    @property
+    def chroms(self) -> Optional[np.ndarray]:
+        """Decoded CHROM column."""
+        if self.chrom_codes is None:
+            return None
+        return self.contigs[self.chrom_codes]
+
+    def subset(self, variant_indices: np.ndarray) -> "VariantTable":
+        """Get the rows of a subset of variants."""
+        return VariantTable(
+            n_variants=len(variant_indices),
+            contigs=self.contigs,
+            chrom_codes=None if self.chrom_codes is None else self.chrom_codes[variant_indices],
+            positions=None if self.positions is None else self.positions[variant_indices],
+            ids=None if self.ids is None else self.ids[variant_indices]
+        )
+
+    def slice(self, start: int, stop: int) -> "VariantTable":
+        """Get the rows of consecutive variants, without copying."""
+        return VariantTable(
+            n_variants=stop - start,
+            contigs=self.contigs,
+            chrom_codes=None if self.chrom_codes is None else self.chrom_codes[start:stop],
+            positions=None if self.positions is None else self.positions[start:stop],
+            ids=None if self.ids is None else self.ids[start:stop]
+        )
+
+    def format_ids(self, variant_indices: Optional[np.ndarray] = None) -> list:
+        """
+        Get variant IDs as Python strings.
+
+        Source IDs are used when present, else IDs are formatted as
+        CHROM_POS. Only call this for output that needs the strings.
+        """
+        table = self if variant_indices is None else self.subset(variant_indices)
+
+        if table.ids is not None:
+            return np.char.decode(table.ids, "utf-8").tolist()
+        if not table.has_positions:
+            return [str(i) for i in range(table.n_variants)]
+
+        chroms = np.char.add(table.chroms.astype(str), "_")
+        return np.char.add(chroms, table.positions.astype(str)).tolist()
+
+    def id_indices(self, variant_ids: list) -> np.ndarray:
+        """
+        Get the indices of variants with the given IDs.
+
+        IDs are matched against source IDs when present, else against
+        CHROM_POS, which is compared as (chrom code, POS) integers rather
+        than by formatting every variant's ID.
+
+        Returns:
+            sorted int64 array of variant indices
+        """
+        if self.ids is not None:
+            wanted = _compact_ids(np.asarray(variant_ids, dtype=str))
+            return np.flatnonzero(np.isin(self.ids, wanted))
+        if not self.has_positions:
+            raise ValueError("Dataset has no variant IDs to select by")
+
+        codes, positions = [], []
+        for variant_id in variant_ids:
+            chrom, _, pos = variant_id.rpartition("_")
+            code = self.contig_code(chrom)
+            if code is not None and pos.isdigit():
+                codes.append(code)
+                positions.append(int(pos))
+
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+
+        # One integer key per (chrom, pos), with room for every position
+        stride = max(int(np.max(self.positions)), max(positions)) + 1
+        keys = np.asarray(self.chrom_codes, dtype=np.int64) * stride + self.positions
+        wanted = np.asarray(codes, dtype=np.int64) * stride + np.asarray(positions)
+        return np.flatnonzero(np.isin(keys, wanted))
+
+    def contig_code(self, chrom: str) -> Optional[int]:
+        """Get the code of a contig name, or None if no variant is on it."""
+        matches = np.flatnonzero(self.contigs == chrom) if self.contigs is not None else []
+        return int(matches[0]) if len(matches) else None
+
+    def _spans(self) -> Optional[dict]:
+        """
+        Map each contig code to its (start, stop) row range, if every
+        contig is one contiguous run of rows sorted by position.
+
+        Returns None for unsorted tables, which are searched with masks.
+        """
+        if self._contig_spans is None:
+            codes = np.asarray(self.chrom_codes)
+            positions = np.asarray(self.positions)
+
+            boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [len(codes)]))
+            run_codes = codes[starts]
+
+            position_steps = np.diff(positions)
+            position_steps[boundaries - 1] = 0
+
+            if len(np.unique(run_codes)) == len(run_codes) and (position_steps >= 0).all():
+                self._contig_spans = {
+                    int(code): (int(start), int(stop))
+                    for code, start, stop in zip(run_codes, starts, stops)
+                }
+            else:
+                self._contig_spans = False
+
+        return self._contig_spans or None
+
+    def range_indices(self, chrom: str, start: int, end: Optional[int] = None) -> np.ndarray:
+        """
+        Get the indices of variants on chrom with start <= POS <= end.
+
+        Sorted tables are searched with binary search within the contig's
+        rows; others with a vectorized mask.
+
+        Returns:
+            sorted int64 array of variant indices
+        """
+        if not self.has_positions:
+            raise ValueError("Dataset has no CHROM/POS information for region filtering")
+
+        code = self.contig_code(chrom)
+        if code is None or self.n_variants == 0:
+            return np.empty(0, dtype=np.int64)
+
+        spans = self._spans()
+        if spans is not None:
+            first, last = spans[code]
+            positions = self.positions[first:last]
+            lo = first + np.searchsorted(positions, start, side="left")
+            hi = last if end is None else first + np.searchsorted(positions, end, side="right")
+            return np.arange(lo, hi, dtype=np.int64)
+
+        mask = (self.chrom_codes == code) & (self.positions >= start)
+        if end is not None:
+            mask &= self.positions <= end
+        return np.flatnonzero(mask)
+
+    def save(self, out_dir: str) -> None:
+        """Write the columns as .npy files into a store directory."""
+        for filename, values in (
+            (CONTIGS_FILE, self.contigs),
+            (CHROM_CODES_FILE, self.chrom_codes),
+            (POSITIONS_FILE, self.positions),
+            (VARIANT_IDS_FILE, self.ids),
+        ):
+            if values is not None:
+                np.save(os.path.join(out_dir, filename), values)
+
+    @classmethod
+    def load(cls, store_dir: str, n_variants: int) -> "VariantTable":
+        """Read a table written by save, memory-mapping the per-variant columns."""
+        def load_column(filename):
+            path = os.path.join(store_dir, filename)
+            return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+        return cls(
+            n_variants=n_variants,
+            contigs=load_column(CONTIGS_FILE),
+            chrom_codes=load_column(CHROM_CODES_FILE),
+            positions=load_column(POSITIONS_FILE),
+            ids=load_column(VARIANT_IDS_FILE)
+        )
+
+
+class VariantTableBuilder:
+    """Accumulate per-block CHROM, POS and ID columns into a VariantTable."""
+
+    def __init__(self):
+        self.contigs = {}
+        self.n_variants = 0
+        self.chrom_codes = []
+        self.positions = []
+        self.ids = []
+
+    def _encode_chroms(self, chroms: np.ndarray) -> np.ndarray:
+        names, inverse = np.unique(np.asarray(chroms).astype(str), return_inverse=True)
+        codes = np.array(
+            [self.contigs.setdefault(name, len(self.contigs)) for name in names.tolist()],
+            dtype=np.int64
+        )
+        return codes[inverse]
+
+    def append(
+        self,
+        chroms: Optional[np.ndarray] = None,
+        positions: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None,
+        n_variants: Optional[int] = None
+    ) -> None:
+        """Add the columns of a block of variants; absent columns are None."""
+        for values in (chroms, positions, ids):
+            if values is not None:
+                n_variants = len(values)
+        self.n_variants += n_variants or 0
+
+        if chroms is not None:
+            self.chrom_codes.append(self._encode_chroms(chroms))
+        if positions is not None:
+            self.positions.append(np.asarray(positions))
+        if ids is not None:
+            self.ids.append(_compact_ids(ids))
+
+    def extend(self, table: VariantTable) -> None:
+        """Add the rows of another table, re-coding its contigs."""
+        if table.chrom_codes is not None:
+            codes = np.array(
+                [self.contigs.setdefault(name, len(self.contigs)) for name in table.contigs.tolist()],
+                dtype=np.int64
+            )
+            self.chrom_codes.append(codes[table.chrom_codes])
+        if table.positions is not None:
+            self.positions.append(np.asarray(table.positions))
+        if table.ids is not None:
+            self.ids.append(np.asarray(table.ids))
+        self.n_variants += table.n_variants
+
+    def build(self) -> VariantTable:
+        chrom_codes = contigs = positions = ids = None
+
+        if self.chrom_codes:
+            contigs = np.array(list(self.contigs), dtype=str)
+            chrom_codes = np.concatenate(self.chrom_codes).astype(_code_dtype(len(contigs)))
+        if self.positions:
+            positions = _compact_positions(np.concatenate(self.positions))
+        if self.ids:
+            ids = np.concatenate(self.ids)
+
+        return VariantTable(self.n_variants, contigs, chrom_codes, positions, ids)
+
+
+def concat_variant_tables(tables: list) -> VariantTable:
+    """Join the tables of consecutive blocks of variants."""
+    builder = VariantTableBuilder()
+    for table in tables:
+        builder.extend(table)
+    return builder.build()
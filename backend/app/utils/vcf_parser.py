@@ -1,61 +1,587 @@
+import os
+import shutil
+import subprocess
+import uuid
 import allel
 import numpy as np
 import pandas as pd
-from typing import Tuple, Optional
-import gzip
+from typing import Iterator, NamedTuple, Tuple, Optional
+from app.utils.compression import detect_compression, open_decompressed
+from app.utils.variant_table import VariantTable, VariantTableBuilder
 
 
-def parse_vcf_file(vcf_path: str) -> Tuple[np.ndarray, list, list]:
+DEFAULT_BLOCK_SIZE = 10000
+
+# Rows inspected to tell genotype columns from annotation columns
+CSV_PROBE_ROWS = 100
+
+# Target number of genotype cells parsed per sample-major CSV chunk
+CSV_CHUNK_CELLS = 10_000_000
+
+# Bytes read per chunk when counting lines during a dimension probe
+PROBE_BUFFER_SIZE = 1024 * 1024
+
+VCF_FIXED_COLUMNS = ["#CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER", "INFO", "FORMAT"]
+
+# Sort order of non-numeric human contigs, after the autosomes
+NAMED_CONTIG_ORDER = {"X": 1, "Y": 2, "XY": 3, "M": 4, "MT": 4}
+
+
+# VCF FORMAT fields genotypes can be read from: hard calls or imputed dosages
+GENOTYPE_FIELDS = ("GT", "DS", "GP")
+
+
+def genotype_dtype(genotype_field: str = "GT") -> str:
+    """Block dtype for a genotype field: int8 hard calls, float16 dosages."""
+    return "int8" if genotype_field == "GT" else "float16"
+
+
+class GenotypeBlock(NamedTuple):
+    """A block of consecutive variants for all samples."""
+    genotypes: np.ndarray  # shape (n_samples, n_block_variants); int8 (-1 missing) or float16 dosages (NaN missing)
+    chroms: Optional[np.ndarray] = None
+    positions: Optional[np.ndarray] = None
+    variant_ids: Optional[np.ndarray] = None
+
+
+def parse_region(region: str) -> Tuple[str, int, Optional[int]]:
     """
-    Parse VCF file and extract genotype matrix.
+    Parse a tabix-style region string.
+
+    Accepts "chrom", "chrom:start-end" or "chrom:start-" with 1-based,
+    inclusive coordinates.
 
     Returns:
-        genotype_matrix: numpy array of shape (n_samples, n_variants) with values 0, 1, 2
-        sample_names: list of sample IDs
-        variant_ids: list of variant IDs
+        chrom, start, end (None for an open end)
+    """
+    chrom, sep, span = region.strip().rpartition(":")
+    if not sep:
+        chrom, span = span, ""
+    if not chrom:
+        raise ValueError(f"Invalid region: {region!r}")
+    if not span:
+        return chrom, 1, None
+
+    start_str, dash, end_str = span.replace(",", "").partition("-")
+    try:
+        start = int(start_str)
+        end = int(end_str) if end_str else None
+    except ValueError:
+        raise ValueError(f"Invalid region: {region!r}")
+
+    # A bare "chrom:pos" selects a single position
+    if not dash:
+        end = start
+
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"Invalid region: {region!r}")
+
+    return chrom, start, end
+
+
+def parse_regions(regions: list) -> list:
+    """
+    Parse and merge a list of region strings.
+
+    Overlapping regions on the same chromosome are merged so no variant is
+    read twice. Chromosomes keep the order in which they were first given.
+
+    Returns:
+        list of (chrom, start, end) tuples
+    """
+    by_chrom = {}
+    for region in regions:
+        chrom, start, end = parse_region(region)
+        by_chrom.setdefault(chrom, []).append((start, end))
+
+    merged = []
+    for chrom, spans in by_chrom.items():
+        spans.sort()
+        current_start, current_end = spans[0]
+        for start, end in spans[1:]:
+            if current_end is None or start <= current_end + 1:
+                if current_end is not None:
+                    current_end = None if end is None else max(current_end, end)
+            else:
+                merged.append((chrom, current_start, current_end))
+                current_start, current_end = start, end
+        merged.append((chrom, current_start, current_end))
+
+    return merged
+
+
+def format_region(chrom: str, start: int, end: Optional[int]) -> str:
+    """Format a parsed region back into a tabix-style string."""
+    if start <= 1 and end is None:
+        return chrom
+    return f"{chrom}:{start}-{'' if end is None else end}"
+
+
+def gt_to_dosage(gt: np.ndarray) -> np.ndarray:
+    """
+    Convert a GT chunk to an int8 sample-major dosage block.
+
+    Counts non-reference alleles per call, so multi-allelic calls still
+    land in 0..ploidy. Any missing allele marks the whole call as -1.
+
+    Args:
+        gt: array of shape (n_variants, n_samples, ploidy)
+
+    Returns:
+        int8 array of shape (n_samples, n_variants) with values 0, 1, 2 or -1
+    """
+    dosage = np.count_nonzero(gt > 0, axis=2).astype(np.int8)
+    dosage[np.any(gt < 0, axis=2)] = -1
+
+    return np.ascontiguousarray(dosage.T)
+
+
+def ds_to_dosage(ds: np.ndarray) -> np.ndarray:
+    """
+    Convert a DS chunk to a float16 sample-major dosage block.
+
+    Args:
+        ds: array of shape (n_variants, n_samples), NaN for missing
+
+    Returns:
+        float16 array of shape (n_samples, n_variants)
+    """
+    if ds.ndim != 2:
+        raise ValueError(f"Expected one DS value per call, got a block of shape {ds.shape}")
+    return np.ascontiguousarray(ds.T, dtype=np.float16)
+
+
+def gp_to_dosage(gp: np.ndarray) -> np.ndarray:
+    """
+    Convert a GP chunk to a float16 sample-major dosage block.
+
+    The dosage is the expected alternate allele count P(het) + 2 P(hom alt).
+    A call with any missing probability is missing (NaN).
+
+    Args:
+        gp: array of shape (n_variants, n_samples, 3)
+
+    Returns:
+        float16 array of shape (n_samples, n_variants)
     """
+    dosage = gp[:, :, 1] + 2 * gp[:, :, 2]
+    return np.ascontiguousarray(dosage.T, dtype=np.float16)
+
+
+# allel field to read and its converter to a sample-major block, per genotype field
+VCF_GENOTYPE_READERS = {
+    "GT": ("calldata/GT", gt_to_dosage),
+    "DS": ("calldata/DS", ds_to_dosage),
+    "GP": ("calldata/GP", gp_to_dosage),
+}
+
+
+def tabix_index_path(vcf_path: str) -> str:
+    """Path of the tabix index of a bgzipped VCF."""
+    return f"{vcf_path}.tbi"
+
+
+def build_tabix_index(vcf_path: str, tabix: Optional[str] = "tabix") -> bool:
+    """
+    Index a bgzipped VCF with tabix, unless it already has an index.
+
+    The index is built under a temporary name and moved into place, so
+    concurrent ingests of the same file never see a partial index. Plain
+    gzip and uncompressed VCFs cannot be indexed and are left to scanning.
+
+    Returns:
+        True when the VCF has an index afterwards
+    """
+    index_path = tabix_index_path(vcf_path)
+    if os.path.exists(index_path):
+        return True
+    if not tabix or shutil.which(tabix) is None or detect_compression(vcf_path) != "bgzf":
+        return False
+
+    tmp_path = f"{vcf_path}.tmp-{uuid.uuid4().hex}"
+    os.symlink(os.path.abspath(vcf_path), tmp_path)
     try:
-        # Read VCF file using scikit-allel with specific fields
-        vcf_data = allel.read_vcf(
-            vcf_path,
-            fields=['samples', 'calldata/GT', 'variants/CHROM', 'variants/POS']
+        result = subprocess.run([tabix, "-p", "vcf", tmp_path], capture_output=True)
+        if result.returncode != 0:
+            return False
+        os.replace(tabix_index_path(tmp_path), index_path)
+    finally:
+        os.remove(tmp_path)
+        if os.path.exists(tabix_index_path(tmp_path)):
+            os.remove(tabix_index_path(tmp_path))
+
+    return True
+
+
+def _iter_vcf_chunks(
+    vcf_path: str,
+    block_size: int,
+    region: Optional[str] = None,
+    tabix: Optional[str] = "tabix",
+    genotype_field: str = "GT"
+):
+    # Compressed files are decompressed as a stream (BGZF in parallel),
+    # except for indexed region queries, which tabix reads from the path;
+    # ingest builds the index for bgzipped uploads.
+    # DS is read as one value per call even when declared Number=A (Beagle),
+    # which keeps the first alternate allele's dosage
+    compression = detect_compression(vcf_path)
+    use_tabix = (
+        compression == "bgzf"
+        and region is not None
+        and tabix
+        and os.path.exists(tabix_index_path(vcf_path))
+    )
+    stream = None if compression is None or use_tabix else open_decompressed(vcf_path)
+
+    try:
+        _, samples, _, chunks = allel.iter_vcf_chunks(
+            vcf_path if stream is None else stream,
+            fields=[VCF_GENOTYPE_READERS[genotype_field][0], 'variants/CHROM', 'variants/POS'],
+            numbers={'calldata/DS': 1, 'calldata/GP': 3},
+            region=region,
+            tabix=tabix,
+            chunk_length=block_size
         )
+    except Exception as e:
+        if stream is not None:
+            stream.close()
+        raise ValueError(f"Error parsing VCF file: {str(e)}")
 
-        if vcf_data is None:
-            raise ValueError("Failed to parse VCF file - file may be empty or invalid")
+    if samples is None or len(samples) == 0:
+        if stream is not None:
+            stream.close()
+        raise ValueError("Error parsing VCF file: No sample names found in VCF file")
 
-        # Check if GT field exists
-        if 'calldata/GT' not in vcf_data:
-            raise ValueError("VCF file does not contain genotype (GT) data in FORMAT field")
+    def closing_chunks():
+        try:
+            yield from chunks
+        finally:
+            if stream is not None:
+                stream.close()
 
-        # Extract genotypes
-        gt = vcf_data["calldata/GT"]  # Shape: (n_variants, n_samples, ploidy)
+    return samples, closing_chunks()
 
-        if gt is None or len(gt) == 0:
-            raise ValueError("No genotype data found in VCF file")
 
-        # Convert to genotype counts (0, 1, 2 for diploid)
-        # Sum across ploidy dimension (axis=2)
-        genotype_matrix = np.sum(gt, axis=2).T  # Shape: (n_samples, n_variants)
+def iter_vcf_genotype_blocks(
+    vcf_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    regions: Optional[list] = None,
+    tabix: Optional[str] = "tabix",
+    genotype_field: str = "GT"
+) -> Tuple[list, Iterator[GenotypeBlock]]:
+    """
+    Stream a VCF file as blocks of variants.
+
+    Only one block of calls is decoded at a time, so memory stays bounded
+    by block_size rather than by the size of the file.
+
+    When regions are given and the VCF is bgzipped with a tabix index, each
+    region is read by seeking through the index instead of scanning the
+    whole file. Other files fall back to scanning.
+
+    Args:
+        vcf_path: path to VCF file
+        block_size: number of variants per block
+        regions: optional list of "chrom:start-end" region strings
+        tabix: tabix executable used for indexed region queries
+        genotype_field: "GT" for int8 hard calls, or "DS" / "GP" for
+            float16 dosages of imputed data
+
+    Returns:
+        sample_names: list of sample IDs
+        blocks: iterator of GenotypeBlock with CHROM and POS filled in
+    """
+    if genotype_field not in VCF_GENOTYPE_READERS:
+        raise ValueError(f"Unsupported genotype field: {genotype_field}")
+    field, to_block = VCF_GENOTYPE_READERS[genotype_field]
+
+    region_strings = [format_region(*region) for region in parse_regions(regions or [])]
+
+    if not region_strings:
+        samples, chunks = _iter_vcf_chunks(vcf_path, block_size, genotype_field=genotype_field)
+    else:
+        samples, chunks = _iter_vcf_chunks(
+            vcf_path, block_size, region_strings[0], tabix, genotype_field
+        )
+
+    def region_chunks():
+        yield from chunks
+        for region in region_strings[1:]:
+            _, next_chunks = _iter_vcf_chunks(vcf_path, block_size, region, tabix, genotype_field)
+            yield from next_chunks
+
+    def blocks():
+        for chunk, _, _, _ in region_chunks():
+            if field not in chunk:
+                raise ValueError(
+                    f"VCF file does not contain {genotype_field} data in FORMAT field"
+                )
+
+            yield GenotypeBlock(
+                genotypes=to_block(chunk[field]),
+                chroms=chunk['variants/CHROM'],
+                positions=chunk['variants/POS']
+            )
+
+    return samples.tolist(), blocks()
+
+
+def parse_vcf_file(
+    vcf_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    regions: Optional[list] = None,
+    tabix: Optional[str] = "tabix",
+    genotype_field: str = "GT"
+) -> Tuple[np.ndarray, list, VariantTable]:
+    """
+    Parse VCF file and extract genotype matrix.
+
+    Args:
+        vcf_path: path to VCF file
+        block_size: number of variants decoded at a time
+        regions: optional list of "chrom:start-end" strings to restrict to
+        tabix: tabix executable used for indexed region queries
+        genotype_field: "GT", "DS" or "GP"
 
-        # Get sample names
-        if 'samples' not in vcf_data or vcf_data['samples'] is None:
-            raise ValueError("No sample names found in VCF file")
+    Returns:
+        genotype_matrix: int8 array of shape (n_samples, n_variants) with values
+            0, 1, 2 and -1 for missing calls (float16 dosages with NaN for
+            missing when reading DS or GP)
+        sample_names: list of sample IDs
+        variants: VariantTable with CHROM and POS
+    """
+    try:
+        sample_names, blocks = iter_vcf_genotype_blocks(
+            vcf_path, block_size, regions, tabix, genotype_field
+        )
 
-        sample_names = vcf_data["samples"].tolist()
+        genotype_blocks = []
+        variants = VariantTableBuilder()
+        for block in blocks:
+            genotype_blocks.append(block.genotypes)
+            variants.append(block.chroms, block.positions)
 
-        # Create variant IDs
-        chroms = vcf_data["variants/CHROM"]
-        positions = vcf_data["variants/POS"]
-        variant_ids = [f"{chrom}_{pos}" for chrom, pos in zip(chroms, positions)]
+        if not genotype_blocks:
+            raise ValueError("No genotype data found in VCF file")
 
-        return genotype_matrix, sample_names, variant_ids
+        genotype_matrix = np.concatenate(genotype_blocks, axis=1)
+
+        return genotype_matrix, sample_names, variants.build()
 
     except Exception as e:
         raise ValueError(f"Error parsing VCF file: {str(e)}")
 
 
-def parse_csv_genotypes(csv_path: str) -> Tuple[np.ndarray, list, list]:
+def contig_sort_key(chrom: str) -> tuple:
+    """
+    Sort key putting contigs in karyotype order.
+
+    "chr2" sorts before "chr10", autosomes before X, Y and MT, and other
+    contigs after those by name.
+    """
+    name = chrom[3:] if chrom.lower().startswith("chr") else chrom
+    if name.isdigit():
+        return (0, int(name), "")
+    if name.upper() in NAMED_CONTIG_ORDER:
+        return (1, NAMED_CONTIG_ORDER[name.upper()], "")
+    return (2, 0, name)
+
+
+def read_first_contig(vcf_path: str) -> Optional[str]:
+    """Get the CHROM of a VCF's first record, or None if it has no records."""
+    with open_binary(vcf_path) as f:
+        for line in f:
+            if not line.startswith(b"#"):
+                return line.split(b"\t", 1)[0].decode()
+    return None
+
+
+def order_vcf_files(vcf_paths: list) -> list:
+    """Order the files of a multi-file VCF dataset by their first contig."""
+    first_contigs = {path: read_first_contig(path) for path in vcf_paths}
+    return sorted(
+        vcf_paths,
+        key=lambda path: (first_contigs[path] is None, contig_sort_key(first_contigs[path] or ""))
+    )
+
+
+def probe_vcf_set_dimensions(vcf_paths: list) -> Tuple[int, int]:
+    """
+    Get the dimensions of a dataset made of several VCFs (e.g. one per chromosome).
+
+    All files must have the same number of samples; variants are summed.
+
+    Returns:
+        n_samples, n_variants
+    """
+    dimensions = [probe_vcf_dimensions(path) for path in vcf_paths]
+
+    n_samples = dimensions[0][0]
+    if any(file_samples != n_samples for file_samples, _ in dimensions):
+        raise ValueError("Error parsing VCF files: all files must have the same samples")
+
+    return n_samples, sum(file_variants for _, file_variants in dimensions)
+
+
+def iter_vcf_set_genotype_blocks(
+    vcf_paths: list,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    genotype_field: str = "GT"
+) -> Tuple[list, Iterator[GenotypeBlock]]:
+    """
+    Stream several VCFs with a shared sample set as one sequence of blocks.
+
+    Files are read one after another in the given order (see order_vcf_files),
+    and each must list the same samples in the same order.
+
+    Returns:
+        sample_names, iterator of GenotypeBlock
+    """
+    sample_names, first_blocks = iter_vcf_genotype_blocks(
+        vcf_paths[0], block_size, genotype_field=genotype_field
+    )
+
+    def blocks():
+        yield from first_blocks
+        for vcf_path in vcf_paths[1:]:
+            file_samples, file_blocks = iter_vcf_genotype_blocks(
+                vcf_path, block_size, genotype_field=genotype_field
+            )
+            if file_samples != sample_names:
+                raise ValueError(f"Samples of {vcf_path} differ from the first file")
+            yield from file_blocks
+
+    return sample_names, blocks()
+
+
+def _csv_genotype_columns(csv_path: str) -> Tuple[str, list]:
+    """
+    Find the index column and the genotype columns of a CSV file.
+
+    Genotype columns are the numeric ones in the first rows; annotation
+    columns such as "population" are skipped.
+    """
+    with open_decompressed(csv_path) as f:
+        head = pd.read_csv(f, nrows=CSV_PROBE_ROWS)
+    genotype_columns = head.iloc[:, 1:].select_dtypes(include="number").columns.tolist()
+
+    if not genotype_columns:
+        raise ValueError("No numeric genotype columns found")
+
+    return head.columns[0], genotype_columns
+
+
+def _genotype_frame_to_int8(df: pd.DataFrame) -> np.ndarray:
+    """Convert a nullable Int8 frame to int8, mapping NA to -1 without a float copy."""
+    return df.to_numpy(dtype=np.int8, na_value=-1)
+
+
+def _read_csv_chunks(csv_path: str, rows_per_chunk: int, engine: str):
+    """Read a genotype CSV as typed chunks of (index, int8 values, genotype columns)."""
+    index_column, genotype_columns = _csv_genotype_columns(csv_path)
+    dtype = {column: "Int8" for column in genotype_columns}
+    dtype[index_column] = str
+
+    read_kwargs = dict(
+        index_col=0,
+        usecols=[index_column] + genotype_columns,
+        dtype=dtype
+    )
+
+    # Compressed CSVs are decompressed as a stream while pandas parses them
+    with open_decompressed(csv_path) as f:
+        if engine == "pyarrow":
+            # The pyarrow engine parses the whole file with multiple threads but
+            # does not support chunked reading
+            df = pd.read_csv(f, engine="pyarrow", **read_kwargs)
+            chunks = [df]
+        else:
+            chunks = pd.read_csv(f, chunksize=rows_per_chunk, **read_kwargs)
+
+        for chunk in chunks:
+            yield chunk.index.astype(str).tolist(), _genotype_frame_to_int8(chunk), genotype_columns
+
+
+def iter_csv_genotype_blocks(
+    csv_path: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    variant_major: bool = False,
+    engine: str = "c"
+) -> Tuple[list, Iterator[GenotypeBlock]]:
+    """
+    Stream a genotype CSV as blocks of variants.
+
+    Values are parsed straight into nullable 8-bit integers and NA becomes
+    -1 as each chunk is converted, so no float64 copy is ever made.
+
+    Sample-major files (rows are samples) are read in row chunks into a
+    single int8 matrix, then sliced into variant blocks. Variant-major files
+    (rows are variants, columns are samples) are streamed: each chunk of
+    rows is one block, and only a transposed view is taken.
+
+    Args:
+        csv_path: path to CSV file
+        block_size: number of variants per block
+        variant_major: True if rows are variants and columns are samples
+        engine: pandas parser engine, "c" or "pyarrow"
+
+    Returns:
+        sample_names: list of sample IDs
+        blocks: iterator of GenotypeBlock with variant IDs filled in
+    """
+    if engine == "pyarrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            engine = "c"
+
+    try:
+        if variant_major:
+            chunks = _read_csv_chunks(csv_path, block_size, engine)
+            variant_ids, genotypes, sample_names = next(chunks)
+        else:
+            _, genotype_columns = _csv_genotype_columns(csv_path)
+            rows_per_chunk = max(1, CSV_CHUNK_CELLS // len(genotype_columns))
+
+            sample_names = []
+            sample_chunks = []
+            for index, values, _ in _read_csv_chunks(csv_path, rows_per_chunk, engine):
+                sample_names.extend(index)
+                sample_chunks.append(values)
+
+            if not sample_chunks:
+                raise ValueError("no genotype rows found")
+            genotype_matrix = np.concatenate(sample_chunks, axis=0)
+            variant_ids = np.asarray(genotype_columns, dtype=str)
+    except StopIteration:
+        raise ValueError("Error parsing CSV file: no genotype rows found")
+    except Exception as e:
+        raise ValueError(f"Error parsing CSV file: {str(e)}")
+
+    def variant_major_blocks():
+        yield GenotypeBlock(genotypes=genotypes.T, variant_ids=np.asarray(variant_ids, dtype=str))
+        for index, values, _ in chunks:
+            yield GenotypeBlock(genotypes=values.T, variant_ids=np.asarray(index, dtype=str))
+
+    def sample_major_blocks():
+        for start in range(0, genotype_matrix.shape[1], block_size):
+            stop = start + block_size
+            yield GenotypeBlock(
+                genotypes=genotype_matrix[:, start:stop],
+                variant_ids=variant_ids[start:stop]
+            )
+
+    if variant_major:
+        return [str(name) for name in sample_names], variant_major_blocks()
+    return sample_names, sample_major_blocks()
+
+
+def parse_csv_genotypes(
+    csv_path: str,
+    variant_major: bool = False,
+    engine: str = "c"
+) -> Tuple[np.ndarray, list, VariantTable]:
     """
     Parse CSV file with genotype matrix.
 
@@ -64,46 +590,203 @@ def parse_csv_genotypes(csv_path: str) -> Tuple[np.ndarray, list, list]:
     - First row: variant IDs
     - Values: 0, 1, 2 (or NA/missing)
 
+    With variant_major=True the layout is transposed: first column variant
+    IDs, first row sample IDs.
+
     Returns:
-        genotype_matrix: numpy array
+        genotype_matrix: int8 array of shape (n_samples, n_variants), -1 for missing
         sample_names: list of sample IDs
-        variant_ids: list of variant IDs
+        variants: VariantTable with the variant IDs
+    """
+    sample_names, blocks = iter_csv_genotype_blocks(
+        csv_path,
+        variant_major=variant_major,
+        engine=engine
+    )
+
+    genotype_blocks = []
+    variants = VariantTableBuilder()
+    for block in blocks:
+        genotype_blocks.append(block.genotypes)
+        variants.append(ids=block.variant_ids)
+
+    return np.concatenate(genotype_blocks, axis=1), sample_names, variants.build()
+
+
+def open_binary(file_path: str):
+    """Open a file for binary reading, decompressing gzip, BGZF or zstd transparently."""
+    return open_decompressed(file_path)
+
+
+def count_lines(stream) -> int:
+    """Count the remaining lines of a binary stream by scanning raw buffers for newlines."""
+    n_lines = 0
+    last_byte = b"\n"
+    while True:
+        buffer = stream.read(PROBE_BUFFER_SIZE)
+        if not buffer:
+            break
+        n_lines += buffer.count(b"\n")
+        last_byte = buffer[-1:]
+
+    # A final line without a trailing newline still counts
+    if last_byte != b"\n":
+        n_lines += 1
+    return n_lines
+
+
+def probe_vcf_dimensions(vcf_path: str) -> Tuple[int, int]:
+    """
+    Get the sample and variant counts of a VCF without decoding genotypes.
+
+    Samples come from the #CHROM header line; variants are counted by
+    scanning the remaining bytes for newlines.
+
+    Returns:
+        n_samples, n_variants
     """
     try:
-        # Read CSV
-        df = pd.read_csv(csv_path, index_col=0)
+        with open_binary(vcf_path) as f:
+            for line in f:
+                if line.startswith(b"##"):
+                    continue
+                if not line.startswith(b"#CHROM"):
+                    raise ValueError("missing #CHROM header line")
 
-        # Extract data
-        sample_names = df.index.tolist()
-        variant_ids = df.columns.tolist()
+                columns = line.rstrip(b"\r\n").decode().split("\t")
+                if columns[:len(VCF_FIXED_COLUMNS)] != VCF_FIXED_COLUMNS:
+                    raise ValueError("header must contain the fixed columns and FORMAT")
 
-        # Convert to numpy array and handle missing values
-        genotype_matrix = df.values
+                n_samples = len(columns) - len(VCF_FIXED_COLUMNS)
+                return n_samples, count_lines(f)
 
-        # Replace NaN with -1 (missing)
-        genotype_matrix = np.nan_to_num(genotype_matrix, nan=-1)
+        raise ValueError("missing #CHROM header line")
 
-        return genotype_matrix, sample_names, variant_ids
+    except (OSError, EOFError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Error parsing VCF file: {str(e)}")
+
+
+def probe_csv_dimensions(csv_path: str, variant_major: bool = False) -> Tuple[int, int]:
+    """
+    Get the sample and variant counts of a genotype CSV without parsing it.
 
+    The header and first rows identify the genotype columns; data rows are
+    counted by scanning raw bytes for newlines.
+
+    Returns:
+        n_samples, n_variants
+    """
+    try:
+        _, genotype_columns = _csv_genotype_columns(csv_path)
+        with open_binary(csv_path) as f:
+            f.readline()
+            n_rows = count_lines(f)
     except Exception as e:
         raise ValueError(f"Error parsing CSV file: {str(e)}")
 
+    if variant_major:
+        return len(genotype_columns), n_rows
+    return n_rows, len(genotype_columns)
+
 
-def get_genotype_matrix(file_path: str, file_type: str) -> Tuple[np.ndarray, list, list]:
+def probe_dimensions(file_path: str, file_type: str, variant_major: bool = False) -> Tuple[int, int]:
+    """
+    Get the sample and variant counts of a genotype file from its headers.
+
+    Args:
+        file_path: path to file
+        file_type: "vcf", "csv" or "plink" (file_path is the .bed file)
+        variant_major: True for CSVs with variants as rows
+
+    Returns:
+        n_samples, n_variants
+    """
+    if file_type == "vcf":
+        return probe_vcf_dimensions(file_path)
+    elif file_type == "csv":
+        return probe_csv_dimensions(file_path, variant_major)
+    elif file_type == "plink":
+        from app.utils.plink_reader import probe_plink_dimensions
+        return probe_plink_dimensions(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def get_genotype_matrix(
+    file_path: str,
+    file_type: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    regions: Optional[list] = None,
+    tabix: Optional[str] = "tabix",
+    variant_major: bool = False,
+    genotype_field: str = "GT"
+) -> Tuple[np.ndarray, list, VariantTable]:
     """
     Parse genotype file and return matrix.
 
     Args:
         file_path: path to file
-        file_type: "vcf" or "csv"
+        file_type: "vcf", "csv" or "plink" (file_path is the .bed file)
+        block_size: number of variants decoded at a time (VCF and PLINK)
+        regions: optional list of "chrom:start-end" strings (VCF only)
+        tabix: tabix executable used for indexed region queries
+        variant_major: True for CSVs with variants as rows
+        genotype_field: VCF FORMAT field to read, "GT", "DS" or "GP"
 
     Returns:
-        genotype_matrix, sample_names, variant_ids
+        genotype_matrix, sample_names, and a VariantTable of the variants
     """
+    if regions and file_type != "vcf":
+        raise ValueError(f"Region filtering is not supported for {file_type} files")
+    if genotype_field != "GT" and file_type != "vcf":
+        raise ValueError("Dosage fields are only supported for VCF files")
+
+    if file_type == "vcf":
+        return parse_vcf_file(file_path, block_size, regions, tabix, genotype_field)
+    elif file_type == "plink":
+        from app.utils.plink_reader import parse_plink_fileset
+        return parse_plink_fileset(file_path, block_size)
+    elif file_type == "csv":
+        return parse_csv_genotypes(file_path, variant_major=variant_major)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def iter_genotype_blocks(
+    file_path: str,
+    file_type: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    variant_major: bool = False,
+    csv_engine: str = "c",
+    genotype_field: str = "GT"
+) -> Tuple[list, Iterator[GenotypeBlock]]:
+    """
+    Stream a genotype file as sample-major blocks of variants.
+
+    Blocks are int8 hard calls, or float16 dosages for VCFs read from the
+    DS or GP field.
+
+    Args:
+        file_path: path to file
+        file_type: "vcf", "csv" or "plink" (file_path is the .bed file)
+        block_size: number of variants per block
+        variant_major: True for CSVs with variants as rows
+        csv_engine: pandas parser engine for CSVs, "c" or "pyarrow"
+        genotype_field: VCF FORMAT field to read, "GT", "DS" or "GP"
+
+    Returns:
+        sample_names, iterator of GenotypeBlock
+    """
+    if genotype_field != "GT" and file_type != "vcf":
+        raise ValueError("Dosage fields are only supported for VCF files")
+
     if file_type == "vcf":
-        return parse_vcf_file(file_path)
+        return iter_vcf_genotype_blocks(file_path, block_size, genotype_field=genotype_field)
+    elif file_type == "plink":
+        from app.utils.plink_reader import iter_plink_genotype_blocks
+        return iter_plink_genotype_blocks(file_path, block_size)
     elif file_type == "csv":
-        return parse_csv_genotypes(file_path)
+        return iter_csv_genotype_blocks(file_path, block_size, variant_major, csv_engine)
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
 
@@ -1,6 +1,11 @@
 from celery import Celery
 from app.core.config import settings
 
+# Queue of dataset ingest tasks. Its worker runs the solo pool, so ingest
+# can start the process pool that decodes VCF contigs and files in parallel
+# (prefork children are daemonic and may not start processes)
+INGEST_QUEUE = "ingest"
+
 # Create Celery app
 celery_app = Celery(
     "popstruct",
@@ -21,4 +26,13 @@ celery_app.conf.update(
     task_soft_time_limit=3000,  # 50 minutes soft limit
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=10,
+    task_routes={
+        "app.worker.tasks.ingest_dataset": {"queue": INGEST_QUEUE},
+    },
+    beat_schedule={
+        "expire-upload-sessions": {
+            "task": "app.worker.tasks.expire_upload_sessions",
+            "schedule": settings.UPLOAD_SESSION_CLEANUP_MINUTES * 60,
+        },
+    },
 )
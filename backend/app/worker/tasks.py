@@ -2,17 +2,35 @@ from celery import Task
 from app.worker.celery import celery_app
 from app.core.database import SessionLocal
 from app.models.job import Job, JobStatus
-from app.models.dataset import Dataset
+from app.models.dataset import Dataset, DatasetStatus
 from app.models.result import Result
+from app.models.upload_session import UploadSession, UploadSessionStatus
 from app.utils.vcf_parser import get_genotype_matrix
-from app.utils.genotype_encoder import prepare_genotype_matrix
+from app.utils.file_utils import delete_file
+from app.utils.genotype_store import build_genotype_store, open_genotype_store
+from app.utils.genotype_encoder import select_variants
+from app.utils.genotype_operator import prepare_genotype_operator
+from app.utils.genotype_packing import pack_genotypes
+from app.utils.ld_pruning import DEFAULT_LD_R2, DEFAULT_LD_STEP, DEFAULT_LD_WINDOW, ld_prune
+from app.utils.qc import QCResult, run_qc
+from app.utils.store_merge import merge_genotype_stores
+from app.utils.selection import (
+    preview_variant_count,
+    resolve_sample_indices,
+    resolve_variant_indices,
+    subsample_variants
+)
+from app.utils.variant_stats import compute_variant_stats
 from app.services.pca_service import PCAService
 from app.services.clustering_service import ClusteringService
 from app.services.kinship_service import KinshipService
 from app.services.report_service import ReportService
 from app.core.config import settings
 import os
-from datetime import datetime
+import numpy as np
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Optional
 import traceback
 
 
@@ -32,6 +50,400 @@ class DatabaseTask(Task):
             self._db = None
 
 
+@celery_app.task(base=DatabaseTask, bind=True)
+def ingest_dataset(
+    self,
+    dataset_id: int,
+    variant_major: bool = False,
+    store_backend: str = "memmap",
+    genotype_field: str = "GT"
+):
+    """
+    Ingest an uploaded dataset.
+
+    Parses and validates the file, builds the binary genotype store and
+    fills in the dataset dimensions, then marks the dataset ready.
+    """
+    db = self.db
+
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        raise ValueError(f"Dataset {dataset_id} not found")
+
+    store_path = dataset.store_path or os.path.join(
+        settings.STORE_DIR, Path(dataset.file_path).stem
+    )
+
+    try:
+        # Identical content may already have been ingested for another dataset
+        store = open_genotype_store(store_path) or build_genotype_store(
+            dataset.file_path,
+            dataset.file_type.value,
+            store_path,
+            block_size=settings.GENOTYPE_BLOCK_SIZE,
+            n_workers=settings.INGEST_WORKERS,
+            tabix=settings.TABIX_PATH,
+            variant_major=variant_major,
+            csv_engine=settings.CSV_ENGINE,
+            file_paths=dataset.file_paths,
+            backend=store_backend,
+            genotype_field=genotype_field
+        )
+
+        dataset.store_path = store_path
+        dataset.n_samples = store.n_samples
+        dataset.n_variants = store.n_variants
+        dataset.status = DatasetStatus.READY
+        dataset.error_message = None
+        db.commit()
+
+        return {"status": "success", "dataset_id": dataset_id}
+
+    except Exception as e:
+        dataset.status = DatasetStatus.FAILED
+        dataset.error_message = f"Failed to parse file: {str(e)}"
+        db.commit()
+
+        raise
+
+
+def delete_expired_upload_sessions(db, user_id: Optional[int] = None) -> int:
+    """
+    Delete active upload sessions past their expiry, with their partial files.
+
+    Sessions being written to are skipped rather than waited for.
+
+    Returns:
+        number of sessions deleted
+    """
+    query = db.query(UploadSession).filter(
+        UploadSession.status == UploadSessionStatus.ACTIVE,
+        UploadSession.expires_at < datetime.now(timezone.utc)
+    )
+    if user_id is not None:
+        query = query.filter(UploadSession.user_id == user_id)
+
+    expired = query.with_for_update(skip_locked=True).all()
+    for upload in expired:
+        delete_file(upload.temp_path)
+        db.delete(upload)
+    db.commit()
+
+    return len(expired)
+
+
+@celery_app.task(base=DatabaseTask, bind=True)
+def expire_upload_sessions(self):
+    """Periodic task: delete abandoned resumable uploads (see UPLOAD_SESSION_TTL_HOURS)."""
+    n_deleted = delete_expired_upload_sessions(self.db)
+    return {"status": "success", "deleted": n_deleted}
+
+
+@celery_app.task(base=DatabaseTask, bind=True)
+def merge_datasets(
+    self,
+    dataset_id: int,
+    source_dataset_ids: list,
+    variant_join: str = "intersect",
+    store_backend: str = "memmap"
+):
+    """
+    Build the genotype store of a dataset merged from other datasets.
+
+    The sources' stores are merged directly, so none of the original
+    files are parsed again.
+    """
+    db = self.db
+
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        raise ValueError(f"Dataset {dataset_id} not found")
+
+    try:
+        sources = {
+            source.id: source
+            for source in db.query(Dataset).filter(Dataset.id.in_(source_dataset_ids))
+        }
+        stores = []
+        for source_id in source_dataset_ids:
+            source = sources.get(source_id)
+            store = open_genotype_store(source.store_path) if source else None
+            if store is None:
+                raise ValueError(f"Dataset {source_id} has no genotype store")
+            stores.append(store)
+
+        store = open_genotype_store(dataset.store_path) or merge_genotype_stores(
+            stores,
+            dataset.store_path,
+            how=variant_join,
+            backend=store_backend,
+            block_size=settings.GENOTYPE_BLOCK_SIZE
+        )
+
+        dataset.n_samples = store.n_samples
+        dataset.n_variants = store.n_variants
+        dataset.status = DatasetStatus.READY
+        dataset.error_message = None
+        db.commit()
+
+        return {"status": "success", "dataset_id": dataset_id}
+
+    except Exception as e:
+        dataset.status = DatasetStatus.FAILED
+        dataset.error_message = f"Failed to merge datasets: {str(e)}"
+        db.commit()
+
+        raise
+
+
+def select_preview_variants(
+    params: dict,
+    n_samples: int,
+    n_variants: int,
+    variant_indices=None
+):
+    """
+    Subsample variants for a preview job ("preview": true).
+
+    Returns the variant indices unchanged when the job is not a preview.
+    """
+    if not params.get("preview"):
+        return variant_indices
+
+    if variant_indices is None:
+        variant_indices = np.arange(n_variants)
+
+    n_keep = params.get("preview_variants") or preview_variant_count(
+        n_samples,
+        len(variant_indices),
+        settings.PREVIEW_TARGET_GENOTYPES,
+        settings.PREVIEW_MIN_VARIANTS,
+        settings.PREVIEW_MAX_VARIANTS
+    )
+    return subsample_variants(
+        variant_indices,
+        n_keep,
+        params.get("preview_sampling", "random"),
+        params.get("preview_seed", 0)
+    )
+
+
+def result_summary(
+    params: dict,
+    dataset: Dataset,
+    variants,
+    qc_summary: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    Result summary labelling a preview job's output as approximate and
+    recording what QC removed.
+    """
+    summary = {}
+    if params.get("preview"):
+        summary.update({
+            "approximate": True,
+            "n_variants_used": len(variants),
+            "n_variants_total": dataset.n_variants
+        })
+    if qc_summary is not None:
+        summary["qc"] = qc_summary
+    return summary or None
+
+
+def run_job_qc(params: dict, blocks, n_samples: int) -> Optional[QCResult]:
+    """
+    Run the job's QC filters ("qc") over sample-major genotype blocks.
+
+    "qc" maps thresholds (see QC_THRESHOLDS) to values; only the given ones
+    are applied. Returns None when the job has no QC.
+    """
+    thresholds = params.get("qc")
+    if not thresholds:
+        return None
+
+    qc = run_qc(blocks, n_samples, **thresholds)
+    if not qc.variant_mask.any():
+        raise ValueError("QC removed every variant")
+    if not qc.sample_mask.any():
+        raise ValueError("QC removed every sample")
+    return qc
+
+
+def apply_ld_pruning(params: dict, genotype_matrix, variants, variant_stats):
+    """
+    LD-prune the variants used for PCA and clustering ("ld_prune").
+
+    "ld_prune" is true for the default window, step and r² threshold, or a
+    dict overriding window_size, step and r2_threshold.
+
+    Returns:
+        the pruned genotype matrix and its VariantStats (None if none were
+        given), or the inputs unchanged when pruning is off
+    """
+    options = params.get("ld_prune")
+    if not options:
+        return genotype_matrix, variant_stats
+    if not isinstance(options, dict):
+        options = {}
+
+    kept_indices = ld_prune(
+        genotype_matrix,
+        variant_stats,
+        variants,
+        window_size=options.get("window_size", DEFAULT_LD_WINDOW),
+        step=options.get("step", DEFAULT_LD_STEP),
+        r2_threshold=options.get("r2_threshold", DEFAULT_LD_R2)
+    )
+    if len(kept_indices) < 2:
+        raise ValueError("LD pruning left fewer than 2 variants")
+
+    pruned_stats = None if variant_stats is None else variant_stats.subset(kept_indices)
+    return genotype_matrix[:, kept_indices], pruned_stats
+
+
+def prepare_kinship_matrix(method: str, genotype_matrix, variant_stats=None):
+    """
+    Prepare genotypes for KinshipService.
+
+    The GRM takes a centered StandardizedGenotypeOperator. IBS takes the
+    raw genotypes packed to 2 bits, with missing calls left missing rather
+    than imputed (uncalled variants then count for no pair).
+    """
+    if method == "grm":
+        return prepare_genotype_operator(
+            genotype_matrix, normalize=False, variant_stats=variant_stats
+        )
+    return pack_genotypes(genotype_matrix)
+
+
+def load_genotypes(dataset: Dataset, params: dict):
+    """
+    Load a dataset as an int8 genotype matrix.
+
+    Uses the memory-mapped genotype store built at upload when available,
+    and falls back to decoding the original file block by block. Merged
+    datasets have no original file, so their store must exist. An optional
+    "regions" parameter restricts the load to those chrom:start-end regions.
+    "samples", "exclude_samples" and "variants" select samples and variants
+    by ID; they are resolved to indices once and applied while reading the
+    store, so the full matrix is never copied. With "preview", only a
+    reproducible subsample of the selected variants is read. With "qc",
+    the selection is filtered in one pass over the store before the
+    matrix is read, so every analysis runs on the QC'd data.
+
+    Returns:
+        genotype matrix, sample names, the VariantTable of the variants,
+        the per-variant VariantStats from the store (None when loading
+        from the file) and the QC summary (None without QC)
+    """
+    regions = params.get("regions")
+
+    store = open_genotype_store(dataset.store_path)
+    if store is not None:
+        variant_indices = store.region_indices(regions) if regions else None
+        if variant_indices is not None and len(variant_indices) == 0:
+            raise ValueError("No variants found in the requested regions")
+
+        variant_indices = resolve_variant_indices(
+            store.variants, params.get("variants"), variant_indices
+        )
+        sample_indices = resolve_sample_indices(
+            store.samples, params.get("samples"), params.get("exclude_samples")
+        )
+        variant_indices = select_preview_variants(
+            params,
+            store.n_samples if sample_indices is None else len(sample_indices),
+            store.n_variants,
+            variant_indices
+        )
+
+        qc = run_job_qc(
+            params,
+            store.iter_selected_blocks(
+                variant_indices, sample_indices, settings.GENOTYPE_BLOCK_SIZE
+            ),
+            store.n_samples if sample_indices is None else len(sample_indices)
+        )
+        if qc is not None:
+            if variant_indices is None:
+                variant_indices = np.flatnonzero(qc.variant_mask)
+            else:
+                variant_indices = variant_indices[qc.variant_mask]
+            if not qc.sample_mask.all():
+                if sample_indices is None:
+                    sample_indices = np.flatnonzero(qc.sample_mask)
+                else:
+                    sample_indices = sample_indices[qc.sample_mask]
+
+        genotype_matrix = store.to_matrix(
+            variant_indices, sample_indices, settings.GENOTYPE_BLOCK_SIZE
+        )
+        if sample_indices is None:
+            variant_stats = store.get_variant_stats(variant_indices)
+            sample_names = store.samples
+        else:
+            # Stored stats cover all samples, so recount for the selection,
+            # a block of columns at a time to keep the float temporaries small
+            block_size = settings.GENOTYPE_BLOCK_SIZE
+            variant_stats = compute_variant_stats(
+                genotype_matrix[:, start:start + block_size]
+                for start in range(0, genotype_matrix.shape[1], block_size)
+            )
+            sample_names = [store.samples[i] for i in sample_indices]
+
+        return (
+            genotype_matrix,
+            sample_names,
+            store.get_variants(variant_indices),
+            variant_stats,
+            None if qc is None else qc.summary
+        )
+
+    if dataset.file_path is None:
+        # Merged datasets have no file to fall back to
+        raise ValueError(f"Dataset {dataset.id} was merged and its genotype store is missing")
+
+    genotype_matrix, sample_names, variants = get_genotype_matrix(
+        dataset.file_path,
+        dataset.file_type.value,
+        block_size=settings.GENOTYPE_BLOCK_SIZE,
+        regions=regions,
+        tabix=settings.TABIX_PATH
+    )
+
+    variant_indices = resolve_variant_indices(variants, params.get("variants"))
+    variant_indices = select_preview_variants(
+        params, len(sample_names), len(variants), variant_indices
+    )
+    if variant_indices is not None:
+        genotype_matrix = genotype_matrix[:, variant_indices]
+        variants = variants.subset(variant_indices)
+
+    sample_indices = resolve_sample_indices(
+        sample_names, params.get("samples"), params.get("exclude_samples")
+    )
+    if sample_indices is not None:
+        genotype_matrix = genotype_matrix[sample_indices]
+        sample_names = [sample_names[i] for i in sample_indices]
+
+    block_size = settings.GENOTYPE_BLOCK_SIZE
+    qc = run_job_qc(
+        params,
+        (
+            genotype_matrix[:, start:start + block_size]
+            for start in range(0, genotype_matrix.shape[1], block_size)
+        ),
+        len(sample_names)
+    )
+    if qc is None:
+        return genotype_matrix, sample_names, variants, None, None
+
+    variant_indices = np.flatnonzero(qc.variant_mask)
+    genotype_matrix = genotype_matrix[qc.sample_mask][:, variant_indices]
+    sample_names = [name for name, keep in zip(sample_names, qc.sample_mask) if keep]
+    return genotype_matrix, sample_names, variants.subset(variant_indices), None, qc.summary
+
+
 @celery_app.task(base=DatabaseTask, bind=True)
 def run_pca_analysis(self, job_id: int):
     """Run PCA analysis task."""
@@ -54,9 +466,8 @@ def run_pca_analysis(self, job_id: int):
         db.commit()
 
         # Load genotype data
-        genotype_matrix, sample_names, variant_ids = get_genotype_matrix(
-            dataset.file_path,
-            dataset.file_type.value
+        genotype_matrix, sample_names, variants, variant_stats, qc_summary = load_genotypes(
+            dataset, job.parameters or {}
         )
 
         job.progress_percent = 30
@@ -67,7 +478,14 @@ def run_pca_analysis(self, job_id: int):
         n_components = params.get("n_components", 10)
         normalize = params.get("normalize", True)
 
-        prepared_matrix = prepare_genotype_matrix(genotype_matrix, normalize=normalize)
+        # Optionally drop linked variants, then PCA only needs products
+        # with the standardized matrix
+        genotype_matrix, variant_stats = apply_ld_pruning(
+            params, genotype_matrix, variants, variant_stats
+        )
+        prepared_matrix = prepare_genotype_operator(
+            genotype_matrix, normalize=normalize, variant_stats=variant_stats
+        )
 
         job.progress_percent = 50
         db.commit()
@@ -101,7 +519,8 @@ def run_pca_analysis(self, job_id: int):
             job_id=job_id,
             pca_variance_explained=pca_service.get_variance_explained(),
             pca_components_path=components_path,
-            pca_plot_path=plot_path
+            pca_plot_path=plot_path,
+            summary_data=result_summary(params, dataset, variants, qc_summary)
         )
         db.add(result)
 
@@ -139,16 +558,20 @@ def run_clustering_analysis(self, job_id: int):
         db.commit()
 
         # Load genotype data
-        genotype_matrix, sample_names, variant_ids = get_genotype_matrix(
-            dataset.file_path,
-            dataset.file_type.value
+        genotype_matrix, sample_names, variants, variant_stats, qc_summary = load_genotypes(
+            dataset, job.parameters or {}
         )
 
         job.progress_percent = 30
         db.commit()
 
         # Prepare matrix (run PCA first for dimensionality reduction)
-        prepared_matrix = prepare_genotype_matrix(genotype_matrix, normalize=True)
+        genotype_matrix, variant_stats = apply_ld_pruning(
+            job.parameters or {}, genotype_matrix, variants, variant_stats
+        )
+        prepared_matrix = prepare_genotype_operator(
+            genotype_matrix, normalize=True, variant_stats=variant_stats
+        )
 
         # Run PCA for clustering (use first 10 PCs)
         pca_service = PCAService(n_components=10)
@@ -187,7 +610,8 @@ def run_clustering_analysis(self, job_id: int):
             n_clusters=n_clusters,
             cluster_labels_path=labels_path,
             cluster_plot_path=plot_path,
-            silhouette_score=clustering_service.get_silhouette_score()
+            silhouette_score=clustering_service.get_silhouette_score(),
+            summary_data=result_summary(params, dataset, variants, qc_summary)
         )
         db.add(result)
 
@@ -224,26 +648,31 @@ def run_kinship_analysis(self, job_id: int):
         db.commit()
 
         # Load genotype data
-        genotype_matrix, sample_names, variant_ids = get_genotype_matrix(
-            dataset.file_path,
-            dataset.file_type.value
+        genotype_matrix, sample_names, variants, variant_stats, qc_summary = load_genotypes(
+            dataset, job.parameters or {}
         )
 
         job.progress_percent = 30
         db.commit()
 
-        # Prepare matrix
-        prepared_matrix = prepare_genotype_matrix(genotype_matrix, normalize=False)
+        params = job.parameters or {}
+        method = params.get("method", "ibs")
+
+        # Prepare matrix; the GRM accumulates blocks of a centered operator,
+        # IBS counts on the raw calls packed to 2 bits
+        prepared_matrix = prepare_kinship_matrix(method, genotype_matrix, variant_stats)
+
+        # Allele frequencies of the variants kept by preparation
+        allele_freqs = None
+        if variant_stats is not None:
+            allele_freqs = variant_stats.subset(select_variants(variant_stats)).alt_freqs
 
         job.progress_percent = 50
         db.commit()
 
         # Run kinship
-        params = job.parameters or {}
-        method = params.get("method", "ibs")
-
         kinship_service = KinshipService(method=method)
-        kinship_service.fit(prepared_matrix)
+        kinship_service.fit(prepared_matrix, allele_freqs)
 
         job.progress_percent = 70
         db.commit()
@@ -265,7 +694,8 @@ def run_kinship_analysis(self, job_id: int):
         result = Result(
             job_id=job_id,
             kinship_matrix_path=matrix_path,
-            kinship_heatmap_path=heatmap_path
+            kinship_heatmap_path=heatmap_path,
+            summary_data=result_summary(params, dataset, variants, qc_summary)
         )
         db.add(result)
 
@@ -302,12 +732,18 @@ def run_full_analysis(self, job_id: int):
         db.commit()
 
         # Load genotype data
-        genotype_matrix, sample_names, variant_ids = get_genotype_matrix(
-            dataset.file_path,
-            dataset.file_type.value
+        genotype_matrix, sample_names, variants, variant_stats, qc_summary = load_genotypes(
+            dataset, job.parameters or {}
         )
 
-        prepared_matrix = prepare_genotype_matrix(genotype_matrix, normalize=True)
+        # PCA and clustering run on LD-pruned variants if requested;
+        # kinship uses all of them
+        pca_matrix, pca_variant_stats = apply_ld_pruning(
+            job.parameters or {}, genotype_matrix, variants, variant_stats
+        )
+        prepared_matrix = prepare_genotype_operator(
+            pca_matrix, normalize=True, variant_stats=pca_variant_stats
+        )
 
         job.progress_percent = 15
         db.commit()
@@ -381,8 +817,15 @@ def run_full_analysis(self, job_id: int):
         kinship_params = params.get("kinship", {})
         method = kinship_params.get("method", "ibs")
 
+        # The GRM accumulates blocks of a centered operator; IBS counts on
+        # the raw calls packed to 2 bits
+        kinship_matrix = prepare_kinship_matrix(method, genotype_matrix, variant_stats)
+        allele_freqs = None
+        if variant_stats is not None:
+            allele_freqs = variant_stats.subset(select_variants(variant_stats)).alt_freqs
+
         kinship_service = KinshipService(method=method)
-        kinship_service.fit(genotype_matrix)  # Use original matrix
+        kinship_service.fit(kinship_matrix, allele_freqs)
 
         matrix_path = os.path.join(job_dir, "kinship_matrix.csv")
         kinship_service.save_matrix(matrix_path, sample_names)
@@ -403,11 +846,12 @@ def run_full_analysis(self, job_id: int):
         import json
         summary_data = {
             "n_samples": len(sample_names),
-            "n_variants": len(variant_ids),
+            "n_variants": len(variants),
             "variance_explained": results_data["pca"]["variance_explained"],
             "n_clusters": n_clusters,
             "silhouette_score": results_data["clustering"]["silhouette_score"],
-            "dataset_name": dataset.name
+            "dataset_name": dataset.name,
+            **(result_summary(params, dataset, variants, qc_summary) or {})
         }
         summary_path = os.path.join(job_dir, "analysis_summary.json")
         with open(summary_path, "w") as f:
@@ -421,7 +865,7 @@ def run_full_analysis(self, job_id: int):
                 "name": dataset.name,
                 "file_type": dataset.file_type.value,
                 "n_samples": len(sample_names),
-                "n_variants": len(variant_ids)
+                "n_variants": len(variants)
             },
             pca_results=results_data["pca"],
             clustering_results=results_data["clustering"],
@@ -7,7 +7,7 @@ import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { getUser } from '@/lib/auth';
 import { datasetsAPI, analysisAPI } from '@/lib/api';
 import { Database, Plus, FileText, Calendar, ArrowLeft, Play, Trash2, Dna } from 'lucide-react';
-import { formatDate } from '@/lib/utils';
+import { formatDate, getStatusColor } from '@/lib/utils';
 
 export default function DatasetsPage() {
   const router = useRouter();
@@ -38,6 +38,11 @@ export default function DatasetsPage() {
       return response.data;
     },
     enabled: !!user,
+    // Poll while uploads are still being ingested
+    refetchInterval: (query) => {
+      const datasets = query.state.data?.datasets || [];
+      return datasets.some((d: any) => d.status === 'ingesting') ? 3000 : false;
+    },
   });
 
   const deleteMutation = useMutation({
@@ -211,7 +216,21 @@ export default function DatasetsPage() {
                           <h3 className="text-lg font-semibold text-gray-900 dark:text-white">
                             {dataset.name}
                           </h3>
+                          {dataset.status !== 'ready' && (
+                            <span
+                              className={`px-3 py-1 rounded-full text-xs font-semibold ${getStatusColor(
+                                dataset.status
+                              )}`}
+                            >
+                              {dataset.status}
+                            </span>
+                          )}
                         </div>
+                        {dataset.status === 'failed' && dataset.error_message && (
+                          <p className="text-sm text-red-600 dark:text-red-400 mb-3">
+                            {dataset.error_message}
+                          </p>
+                        )}
                         {dataset.description && (
                           <p className="text-gray-600 dark:text-gray-400 mb-3">
                             {dataset.description}
@@ -234,7 +253,14 @@ export default function DatasetsPage() {
                     </div>
                     <button
                       onClick={() => handleRunAnalysis(dataset.id, dataset.name)}
-                      disabled={processing === dataset.id}
+                      disabled={processing === dataset.id || dataset.status !== 'ready'}
+                      title={
+                        dataset.status === 'ingesting'
+                          ? 'The dataset is still being processed'
+                          : dataset.status === 'failed'
+                            ? 'The dataset could not be processed'
+                            : undefined
+                      }
                       className="flex items-center px-4 py-2 bg-gradient-to-r from-teal-600 to-emerald-600 text-white rounded-full hover:shadow-lg transform hover:scale-105 transition-all duration-200 font-semibold disabled:opacity-50 disabled:cursor-not-allowed"
                     >
                       {processing === dataset.id ? (
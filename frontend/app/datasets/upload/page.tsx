@@ -33,7 +33,7 @@ export default function UploadDatasetPage() {
     if (e.target.files && e.target.files[0]) {
       setFile(e.target.files[0]);
       if (!name) {
-        setName(e.target.files[0].name.replace(/\.(vcf|csv)$/i, ''));
+        setName(e.target.files[0].name.replace(/\.(vcf|csv)(\.(gz|bgz|zst))?$/i, ''));
       }
     }
   };
@@ -57,8 +57,13 @@ export default function UploadDatasetPage() {
         formData.append('description', description);
       }
 
-      await datasetsAPI.upload(formData);
-      setSuccess('Dataset uploaded successfully!');
+      const response = await datasetsAPI.upload(formData);
+      // New uploads come back "ingesting" (202) and become ready once parsed
+      setSuccess(
+        response.data?.status === 'ingesting'
+          ? 'Dataset uploaded! It is being processed and can be analysed once ready.'
+          : 'Dataset uploaded successfully!'
+      );
       setName('');
       setDescription('');
       setFile(null);
@@ -215,7 +220,7 @@ export default function UploadDatasetPage() {
                             id="file-upload"
                             name="file-upload"
                             type="file"
-                            accept=".vcf,.csv"
+                            accept=".vcf,.vcf.gz,.vcf.bgz,.vcf.zst,.csv,.csv.gz,.csv.zst"
                             onChange={handleFileChange}
                             className="sr-only"
                           />
@@ -223,7 +228,7 @@ export default function UploadDatasetPage() {
                         <p className="pl-1">or drag and drop</p>
                       </div>
                       <p className="text-xs text-gray-500 dark:text-gray-400">
-                        VCF or CSV files up to 100MB
+                        VCF or CSV files (optionally gzip/bgzip/zstd compressed) up to 100MB
                       </p>
                     </>
                   )}
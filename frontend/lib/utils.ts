@@ -29,8 +29,10 @@ export function formatDate(dateString: string): string {
 export function getStatusColor(status: string): string {
   switch (status) {
     case 'completed':
+    case 'ready':
       return 'text-green-600 bg-green-100';
     case 'running':
+    case 'ingesting':
       return 'text-blue-600 bg-blue-100';
     case 'pending':
       return 'text-yellow-600 bg-yellow-100';